@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+daemon-archon 配置序列化基准测试
+
+在临时目录中按每种可用格式（storage.serializer）写入并读取 N 份任务配置，
+输出保存/加载吞吐量和占用空间。不会访问 ~/.claude/daemon-archon。
+
+用法：
+    cd scripts && python3 bench_serializer.py [--count 10000]
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+
+
+def sample_config(i: int) -> dict:
+    """与 Cron 任务结构一致的示例配置"""
+    task_id = f"20260201_{i:06d}_cron"
+    return {
+        "task_id": task_id,
+        "mode": "cron",
+        "name": f"每日依赖检查 #{i}",
+        "description": "检查项目依赖是否有安全更新，并在发现问题时通知",
+        "project_path": f"/home/user/projects/service-{i % 50}",
+        "created_at": "2026-02-01T14:30:00Z",
+        "schedule": {
+            "cron_expression": "0 9 * * *",
+            "check_interval_minutes": 60,
+            "next_run": "2026-02-02T09:00:00"
+        },
+        "execution": {
+            "timeout_minutes": 30,
+            "last_run": "2026-02-01T09:00:00Z",
+            "last_result": "success",
+            "run_count": i,
+            "consecutive_failures": 0,
+            "max_consecutive_failures": 3
+        },
+        "notification": {
+            "notify_on_error": True,
+            "notify_on_success": False,
+            "notify_on_status": ["error"],
+            "suspicious_status": ["warning"],
+            "enable_claude_analysis": True,
+            "quiet_hours": None
+        },
+        "state": {"status": "active", "last_check": None},
+        "cron_state": {
+            "next_run_at_ms": 1769994000000,
+            "last_run_at_ms": 1769907600000,
+            "last_run_duration_ms": 41234,
+            "run_count": i,
+            "error_count": 0,
+            "last_error": None
+        }
+    }
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="配置序列化基准测试")
+    parser.add_argument("--count", type=int, default=10000, help="配置数量（默认 10000）")
+    args = parser.parse_args()
+
+    # 在导入 state_store 前切换 HOME，所有读写都落在临时目录
+    work_dir = tempfile.mkdtemp(prefix="archon-bench-")
+    os.environ["HOME"] = work_dir
+    sys.path.insert(0, str(Path(__file__).parent))
+
+    configs = [sample_config(i) for i in range(args.count)]
+
+    try:
+        run_benchmark(configs, work_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return 0
+
+
+def run_benchmark(configs: list, work_dir: str) -> None:
+    """逐个格式测量保存/加载吞吐量"""
+    from server.state_store import (
+        load_global_settings, save_global_settings,
+        _write_config_snapshot, _read_config_file
+    )
+    from server.serializers import available_serializers
+
+    count = len(configs)
+    print()
+    print(f"配置数量: {count}")
+    print()
+    print(f"{'格式':<10} {'保存 (条/秒)':>14} {'加载 (条/秒)':>14} {'平均大小':>10}")
+    print("-" * 52)
+
+    for serializer in available_serializers():
+        settings = load_global_settings()
+        settings.setdefault("storage", {})["serializer"] = serializer
+        save_global_settings(settings)
+
+        base = Path(work_dir) / serializer
+        paths = []
+        for config in configs:
+            task_dir = base / config["task_id"]
+            task_dir.mkdir(parents=True, exist_ok=True)
+            paths.append(task_dir / "config.json")
+
+        start = time.perf_counter()
+        for path, config in zip(paths, configs):
+            _write_config_snapshot(path, config)
+        save_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for path in paths:
+            _read_config_file(path)
+        load_elapsed = time.perf_counter() - start
+
+        avg_size = sum(p.stat().st_size for p in paths) / len(paths)
+        print(f"{serializer:<10} {count / save_elapsed:>14,.0f} "
+              f"{count / load_elapsed:>14,.0f} {avg_size:>8,.0f} B")
+
+    print()
+    print("未列出的格式缺少依赖：msgpack 需要安装 msgpack；安装 orjson 后 compact 与读取均会加速")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
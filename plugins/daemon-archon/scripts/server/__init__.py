@@ -3,10 +3,20 @@ daemon-archon server package
 """
 
 from .types import *
+from .log_writer import *
+from .task_lock import *
+from .durability import *
+from .serializers import *
 from .state_store import *
+from .jobstore import *
+from .transcript_watcher import *
 from .scheduler import *
 from .notifier import *
 from .analyzer import *
 from .stuck_detector import *
 from .probe_executor import *
 from .cron_executor import *
+from .sqlite_store import *
+from .workers import *
+from .archive import *
+from .run_history import *
@@ -302,6 +302,111 @@ class CronResultAnalyzer:
         return False
 
 
+class IncrementalOutputAnalyzer(CronResultAnalyzer):
+    """
+    增量 Cron 结果分析器
+
+    逐块接收 Claude CLI 输出，在输出过程中识别 ```json 代码块；
+    只保留开头 HEAD_CHARS 和末尾 tail_chars 个字符，内存占用与输出总量无关。
+    输出未超过 tail_chars 时，finish() 的结果与 analyze_output() 完全一致
+    """
+
+    HEAD_CHARS = 1024
+
+    # 单个 JSON 代码块的最大长度，超过后放弃该代码块
+    MAX_BLOCK_CHARS = 256 * 1024
+
+    def __init__(self, config: Dict[str, Any], tail_chars: int = 64 * 1024):
+        super().__init__(config)
+        self.tail_chars = max(self.HEAD_CHARS, tail_chars)
+        self.total_chars = 0
+        self.json_result: Optional[Dict[str, Any]] = None
+        self._head = ""
+        self._tail = ""
+        self._line = ""
+        self._block: Optional[List[str]] = None
+        self._block_chars = 0
+
+    def feed(self, text: str) -> Optional[AnalysisResult]:
+        """
+        接收一段输出
+
+        Returns:
+            本段输出中首次解析出 JSON 结果时返回分析结果，否则返回 None
+        """
+        if not text:
+            return None
+
+        self.total_chars += len(text)
+        if len(self._head) < self.HEAD_CHARS:
+            self._head += text[:self.HEAD_CHARS - len(self._head)]
+        self._tail = (self._tail + text)[-self.tail_chars:]
+
+        *lines, self._line = (self._line + text).split("\n")
+        # 超长的单行不可能是代码块围栏，只保留末尾
+        self._line = self._line[-self.MAX_BLOCK_CHARS:]
+
+        found = None
+        for line in lines:
+            found = self._feed_line(line) or found
+        return found
+
+    def _feed_line(self, line: str) -> Optional[AnalysisResult]:
+        """逐行识别 JSON 代码块，只采用第一个能解析的代码块"""
+        if self.json_result is not None:
+            return None
+
+        stripped = line.strip()
+        if self._block is None:
+            if stripped.startswith("```json"):
+                self._block = []
+                self._block_chars = 0
+            return None
+
+        if stripped.startswith("```"):
+            block = "\n".join(self._block)
+            self._block = None
+            try:
+                result = json.loads(block)
+            except json.JSONDecodeError:
+                return None
+            if not isinstance(result, dict):
+                return None
+            self.json_result = result
+            return self._analyze_json_result(result)
+
+        self._block_chars += len(line) + 1
+        if self._block_chars > self.MAX_BLOCK_CHARS:
+            self._block = None
+        else:
+            self._block.append(line)
+        return None
+
+    @property
+    def output(self) -> str:
+        """保留的输出：未截断时为完整输出，否则为开头 + 省略标记 + 末尾"""
+        if self.total_chars <= self.tail_chars:
+            return self._tail
+
+        tail = self._tail[-(self.total_chars - len(self._head)):]
+        omitted = self.total_chars - len(self._head) - len(tail)
+        if omitted <= 0:
+            return self._head + tail
+        return f"{self._head}\n... (省略 {omitted} 字符) ...\n{tail}"
+
+    def finish(self) -> AnalysisResult:
+        """输出结束，返回最终分析结果"""
+        if self.total_chars <= self.tail_chars:
+            return self.analyze_output(self._tail)
+
+        if self._line:
+            self._feed_line(self._line)
+            self._line = ""
+        if self.json_result is not None:
+            return self._analyze_json_result(self.json_result)
+        return self._analyze_text_result(self.output)
+
+
 def read_transcript_incremental(
     transcript_path: str,
     last_offset: int = 0
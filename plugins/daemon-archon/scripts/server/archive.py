@@ -0,0 +1,299 @@
+"""
+daemon-archon 任务归档
+
+已停止 / 已完成且超过 archive.after_days 天未变动的任务被移入冷存储：
+配置和整个任务目录（打包为 tar.gz）写入单个 SQLite 文件 archive.db，
+随后从工作目录和任务索引中删除，不再参与任务列表、卡住检测等扫描。
+
+归档任务仍可通过 GET /tasks?include_archived=true 查询，
+也可以用 restore_task 恢复到工作目录。
+"""
+
+import io
+import json
+import time
+import tarfile
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import Optional, List, Dict, Any
+
+from .state_store import (
+    get_base_dir, get_task_dir, get_settings_section, get_storage_engine, get_task_mtime_ns,
+    load_task_config, save_task_config, set_task_status, delete_task_config,
+    list_task_summaries, read_log, load_corrections
+)
+from .run_history import get_run_history, record_run
+
+logger = logging.getLogger(__name__)
+
+# 可归档的终态
+TERMINAL_STATUSES = ("stopped", "completed")
+
+# 执行历史（runs.db 中的记录）在目录包中的文件名，恢复时写回 runs.db
+RUN_HISTORY_MEMBER = "run_history.json"
+
+ARCHIVE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS archived_tasks (
+    task_id TEXT PRIMARY KEY,
+    mode TEXT,
+    status TEXT,
+    name TEXT,
+    created_at TEXT,
+    archived_at REAL NOT NULL,
+    config TEXT NOT NULL,
+    bundle BLOB
+);
+CREATE INDEX IF NOT EXISTS idx_archived_mode_status ON archived_tasks (mode, status);
+"""
+
+
+class TaskArchive:
+    """归档存储"""
+
+    def __init__(self, db_path: Path):
+        """
+        初始化归档存储
+
+        Args:
+            db_path: 归档数据库路径
+        """
+        self.db_path = db_path
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        """获取当前线程的连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), timeout=30)
+            conn.executescript(ARCHIVE_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def put(self, task_id: str, config: Dict[str, Any], bundle: bytes) -> None:
+        """写入（或覆盖）一个归档任务"""
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO archived_tasks "
+                "(task_id, mode, status, name, created_at, archived_at, config, bundle) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    task_id,
+                    config.get("mode"),
+                    (config.get("state") or {}).get("status"),
+                    config.get("name", ""),
+                    config.get("created_at", ""),
+                    time.time(),
+                    json.dumps(config, ensure_ascii=False),
+                    bundle,
+                )
+            )
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """读取归档任务的配置"""
+        row = self._conn().execute(
+            "SELECT config, archived_at FROM archived_tasks WHERE task_id = ?", (task_id,)
+        ).fetchone()
+        if not row:
+            return None
+        return dict(json.loads(row[0]), archived_at=row[1])
+
+    def get_bundle(self, task_id: str) -> Optional[bytes]:
+        """读取归档任务的目录包"""
+        row = self._conn().execute(
+            "SELECT bundle FROM archived_tasks WHERE task_id = ?", (task_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def list_configs(self, mode: Optional[str] = None, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """列出归档任务配置，按创建时间倒序"""
+        clauses, params = [], []
+        if mode:
+            clauses.append("mode = ?")
+            params.append(mode)
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        rows = self._conn().execute(
+            f"SELECT config, archived_at FROM archived_tasks{where} ORDER BY created_at DESC",
+            params
+        ).fetchall()
+        return [dict(json.loads(config), archived_at=archived_at) for config, archived_at in rows]
+
+    def delete(self, task_id: str) -> None:
+        """删除归档任务"""
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM archived_tasks WHERE task_id = ?", (task_id,))
+
+
+_archive: Optional[TaskArchive] = None
+
+
+def get_archive() -> TaskArchive:
+    """获取归档存储单例"""
+    global _archive
+    if _archive is None:
+        path = get_settings_section("archive").get("path") or get_base_dir() / "archive.db"
+        _archive = TaskArchive(Path(path).expanduser())
+    return _archive
+
+
+def _add_text(tar: tarfile.TarFile, name: str, content: str) -> None:
+    """向 tar 包中写入一个文本文件"""
+    data = content.encode('utf-8')
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = time.time()
+    tar.addfile(info, io.BytesIO(data))
+
+
+def _bundle_task(task_id: str, config: Dict[str, Any]) -> bytes:
+    """
+    把任务目录打包为 tar.gz
+
+    SQLite 存储引擎下配置、日志和纠偏记录不在目录中，一并导出为文件
+    """
+    buffer = io.BytesIO()
+    task_dir = get_task_dir(task_id)
+
+    with tarfile.open(fileobj=buffer, mode="w:gz") as tar:
+        if task_dir.exists():
+            for path in sorted(task_dir.rglob("*")):
+                if path.is_file() and not path.name.endswith((".lock", ".tmp")):
+                    tar.add(str(path), arcname=str(path.relative_to(task_dir)))
+
+        if get_storage_engine():
+            _add_text(tar, "config.json", json.dumps(config, indent=2, ensure_ascii=False))
+            _add_text(tar, "archon.log", "".join(read_log(task_id, lines=1_000_000)))
+            corrections = load_corrections(task_id)
+            if corrections:
+                _add_text(tar, "corrections.md", corrections)
+
+        history = get_run_history()
+        runs = history.list_runs(task_id, limit=history.keep)
+        if runs:
+            _add_text(tar, RUN_HISTORY_MEMBER, json.dumps(runs, ensure_ascii=False))
+
+    return buffer.getvalue()
+
+
+def archive_task(task_id: str) -> bool:
+    """
+    归档单个任务
+
+    先写入归档再删除工作目录，中途失败时任务仍在工作目录，下次归档时覆盖重写
+    """
+    config = load_task_config(task_id)
+    if not config:
+        logger.error(f"归档任务失败 [{task_id}]: 配置不存在")
+        return False
+
+    try:
+        get_archive().put(task_id, config, _bundle_task(task_id, config))
+    except Exception as e:
+        logger.error(f"归档任务失败 [{task_id}]: {e}")
+        return False
+
+    return delete_task_config(task_id)
+
+
+def archive_stale_tasks(after_days: Optional[float] = None) -> int:
+    """
+    归档超过 after_days 天未变动的终态任务
+
+    Args:
+        after_days: 天数，默认读取 archive.after_days
+
+    Returns:
+        归档的任务数
+    """
+    if after_days is None:
+        after_days = float(get_settings_section("archive").get("after_days", 30))
+    cutoff_ns = (time.time() - after_days * 86400) * 1e9
+
+    archived = 0
+    for status in TERMINAL_STATUSES:
+        for summary in list_task_summaries(status=status):
+            mtime = summary.get("mtime")
+            if mtime is None or mtime >= cutoff_ns:
+                continue
+            # 索引中的 mtime 可能滞后（最多 CATALOG_MTIME_SLACK_NS），以配置的实际修改时间为准
+            actual = get_task_mtime_ns(summary["task_id"])
+            if actual is not None and actual >= cutoff_ns:
+                continue
+            if archive_task(summary["task_id"]):
+                archived += 1
+
+    if archived:
+        logger.info(f"已归档 {archived} 个任务")
+    return archived
+
+
+def list_archived_tasks(
+    mode: Optional[str] = None,
+    status: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """列出归档任务（配置中附带 archived_at 字段）"""
+    try:
+        return get_archive().list_configs(mode, status)
+    except Exception as e:
+        logger.error(f"读取归档任务失败: {e}")
+        return []
+
+
+def load_archived_task(task_id: str) -> Optional[Dict[str, Any]]:
+    """读取归档任务的配置"""
+    try:
+        return get_archive().get(task_id)
+    except Exception as e:
+        logger.error(f"读取归档任务失败 [{task_id}]: {e}")
+        return None
+
+
+def restore_task(task_id: str) -> bool:
+    """把归档任务恢复到工作目录，恢复后状态保持归档前的终态"""
+    archive = get_archive()
+    config = archive.get(task_id)
+    if config is None:
+        return False
+    config.pop("archived_at", None)
+
+    try:
+        bundle = archive.get_bundle(task_id)
+        task_dir = get_task_dir(task_id)
+        runs = []
+        if bundle:
+            with tarfile.open(fileobj=io.BytesIO(bundle), mode="r:gz") as tar:
+                members = [
+                    m for m in tar.getmembers()
+                    if m.isfile() and not m.name.startswith(("/", "..")) and ".." not in Path(m.name).parts
+                ]
+                history = next((m for m in members if m.name == RUN_HISTORY_MEMBER), None)
+                if history is not None:
+                    members.remove(history)
+                    runs = json.loads(tar.extractfile(history).read().decode("utf-8"))
+                tar.extractall(str(task_dir), members=members)
+
+        for run in reversed(runs):
+            record_run(
+                task_id, run.pop("run_id"), run.pop("started_at_ms"),
+                duration_ms=run.get("duration_ms"), status=run.get("status"),
+                returncode=run.get("returncode"), summary=run.get("summary") or "",
+                metrics=run.get("metrics")
+            )
+
+        if not save_task_config(task_id, config):
+            return False
+        set_task_status(task_id, (config.get("state") or {}).get("status", "stopped"))
+    except Exception as e:
+        logger.error(f"恢复归档任务失败 [{task_id}]: {e}")
+        return False
+
+    archive.delete(task_id)
+    return True
@@ -4,40 +4,355 @@ daemon-archon Cron 执行器
 负责 Cron 模式的任务执行和结果分析
 """
 
+import os
 import json
+import uuid
+import shlex
+import hashlib
+import codecs
+import signal
+import time
+import asyncio
 import logging
 import subprocess
+import threading
+from collections import OrderedDict
+from dataclasses import asdict
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable, Tuple
 
-from .types import AnalysisResult
+from .types import AnalysisResult, CronTaskConfig, MemoizeConfig
 from .state_store import (
-    load_task_config, save_task_config, get_task_dir,
+    load_task_model, save_task_config, get_task_dir,
     ensure_task_dir, set_task_status, append_log,
     load_workflow, load_task_md, ensure_workflow_dir,
     save_workflow, save_task_md, acquire_task_lock,
-    release_task_lock
+    release_task_lock, patch_task_config, apply_config_patch,
+    get_settings_section, get_run_log_path, prune_run_logs,
+    cron_inputs_signature
 )
-from .analyzer import CronResultAnalyzer
+from .analyzer import CronResultAnalyzer, IncrementalOutputAnalyzer
+from .run_history import record_run, FAILURE_STATUSES
 from .notifier import notify_task_error, notify_task_completed
 from .stuck_detector import mark_check_start, mark_check_end
 
 logger = logging.getLogger(__name__)
 
+# 超时或取消时，SIGTERM 后等待进程组退出的时间（秒），超过后 SIGKILL
+KILL_GRACE_SECONDS = 5
+
+# 读取子进程输出的块大小
+_READ_CHUNK = 64 * 1024
+
+# 执行输出先缓冲在内存中，攒够字节数或距上次写入超过秒数后在线程池中写入 runs/<run_id>.log
+RUN_LOG_FLUSH_BYTES = 256 * 1024
+RUN_LOG_FLUSH_SECONDS = 1.0
+
+# 提示词缓存容量（任务数）
+PROMPT_CACHE_SIZE = 256
+
+# 计算输入指纹时单个命令的超时时间（秒）
+FINGERPRINT_COMMAND_TIMEOUT = 60
+
+# 提示词的固定部分，放在最前面：所有任务、所有执行的提示词前缀逐字节相同，
+# 便于 Claude 的提示词缓存复用
+PROMPT_PREAMBLE = """# 输出要求
+
+请按照下文的工作流程执行任务描述中的任务，并按以下 JSON 格式输出结果：
+
+```json
+{
+  "status": "success | warning | error",
+  "summary": "一句话总结",
+  "findings": [
+    {"level": "info|warning|error", "message": "具体发现"}
+  ],
+  "metrics": {
+    "key": value
+  }
+}
+```
+"""
+
+
+# ============ 提示词 ============
+#
+# 提示词由固定说明、workflow.md、task.md 依次拼接，变化越少的部分越靠前。
+# 按 cron_inputs_signature 缓存拼接结果，两个文件未改写时不再读取和拼接。
+
+_prompt_cache: "OrderedDict[str, Tuple[Tuple, str]]" = OrderedDict()
+_prompt_cache_lock = threading.Lock()
+_prompt_cache_stats = {"hits": 0, "misses": 0}
+
+
+def _normalize_prompt_section(content: str) -> str:
+    """统一换行并去掉首尾空白，使相同内容拼接出的提示词逐字节相同"""
+    return content.replace("\r\n", "\n").strip()
+
+
+def render_cron_prompt(task_md: str, workflow_md: str) -> str:
+    """拼接 Cron 执行提示词"""
+    return (
+        f"{PROMPT_PREAMBLE}\n"
+        f"# 工作流程\n\n{_normalize_prompt_section(workflow_md)}\n\n"
+        f"# 任务描述\n\n{_normalize_prompt_section(task_md)}\n"
+    )
+
+
+def get_cron_prompt(task_id: str) -> str:
+    """获取任务的执行提示词，输入文件未变化时返回缓存"""
+    signature = cron_inputs_signature(task_id)
+    with _prompt_cache_lock:
+        cached = _prompt_cache.get(task_id)
+        if cached is not None and cached[0] == signature:
+            _prompt_cache.move_to_end(task_id)
+            _prompt_cache_stats["hits"] += 1
+            return cached[1]
+        _prompt_cache_stats["misses"] += 1
+
+    # 签名先于内容读取：读取期间文件被改写时，下次签名不同会重新拼接
+    prompt = render_cron_prompt(load_task_md(task_id), load_workflow(task_id))
+
+    with _prompt_cache_lock:
+        _prompt_cache[task_id] = (signature, prompt)
+        _prompt_cache.move_to_end(task_id)
+        while len(_prompt_cache) > PROMPT_CACHE_SIZE:
+            _prompt_cache.popitem(last=False)
+    return prompt
+
+
+# ============ 结果复用 ============
+#
+# 开启 memoize 的任务在执行前计算输入指纹：提示词、声明的文件内容、声明的命令输出。
+# 指纹与上次成功执行时相同且未超过 TTL 时，直接复用上次的分析结果。
+
+def _hash_input_files(root: Path, patterns: list) -> str:
+    """按 glob 匹配 root 下的文件，返回路径和内容的摘要；不在 root 下的路径忽略"""
+    digest = hashlib.sha256()
+    root = root.resolve()
+    for pattern in patterns:
+        digest.update(f"\0pattern\0{pattern}\0".encode("utf-8"))
+        try:
+            paths = sorted(root.glob(pattern))
+        except (ValueError, NotImplementedError) as e:
+            logger.warning(f"无效的指纹文件模式 {pattern}: {e}")
+            continue
+
+        for path in paths:
+            resolved = path.resolve()
+            if not path.is_file() or (resolved != root and root not in resolved.parents):
+                continue
+            digest.update(f"\0file\0{path.relative_to(root).as_posix()}\0".encode("utf-8"))
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(_READ_CHUNK), b""):
+                    digest.update(chunk)
+    return digest.hexdigest()
+
+
+async def _command_output(command: str, cwd: str) -> Tuple[int, bytes]:
+    """
+    执行指纹命令，返回 (退出码, 标准输出)
+
+    命令按 shell 语法拆分参数后直接执行，不经过 shell（不支持管道、重定向、变量展开）；
+    超过 FINGERPRINT_COMMAND_TIMEOUT 秒时终止进程组并抛出 asyncio.TimeoutError
+    """
+    args = shlex.split(command)
+    if not args:
+        raise ValueError("指纹命令为空")
+    process = await asyncio.create_subprocess_exec(
+        *args,
+        cwd=cwd,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+        start_new_session=True
+    )
+    try:
+        stdout, _ = await asyncio.wait_for(process.communicate(), FINGERPRINT_COMMAND_TIMEOUT)
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        await kill_process_group(process)
+        raise
+    return process.returncode, stdout
+
+
+async def compute_input_fingerprint(task_id: str, project_path: str, memoize: MemoizeConfig) -> Optional[str]:
+    """
+    计算 Cron 任务的输入指纹
+
+    Returns:
+        十六进制摘要，命令执行失败或超时时返回 None（本次不复用结果）
+    """
+    digest = hashlib.sha256()
+    digest.update(get_cron_prompt(task_id).encode("utf-8"))
+
+    try:
+        files_digest = await asyncio.get_running_loop().run_in_executor(
+            None, _hash_input_files, Path(project_path), list(memoize.files)
+        )
+        digest.update(files_digest.encode("ascii"))
+
+        for command in memoize.commands:
+            returncode, stdout = await _command_output(command, project_path)
+            digest.update(f"\0command\0{command}\0{returncode}\0".encode("utf-8"))
+            digest.update(stdout)
+    except asyncio.TimeoutError:
+        logger.warning(f"计算输入指纹超时 [{task_id}]")
+        return None
+    except Exception as e:
+        logger.warning(f"计算输入指纹失败 [{task_id}]: {e}")
+        return None
+
+    return digest.hexdigest()
+
+
+def memoized_result(memoize: MemoizeConfig, fingerprint: Optional[str], now_ms: int) -> Optional[AnalysisResult]:
+    """指纹一致且未过期时返回上次的分析结果"""
+    if not fingerprint or fingerprint != memoize.fingerprint or not memoize.result:
+        return None
+    if memoize.ttl_minutes > 0 and now_ms - (memoize.result_at_ms or 0) > memoize.ttl_minutes * 60 * 1000:
+        return None
+    return AnalysisResult(**memoize.result)
+
+
+def get_prompt_cache_stats() -> Dict[str, Any]:
+    """提示词缓存统计"""
+    with _prompt_cache_lock:
+        hits = _prompt_cache_stats["hits"]
+        misses = _prompt_cache_stats["misses"]
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+            "size": len(_prompt_cache),
+            "capacity": PROMPT_CACHE_SIZE,
+        }
+
+
+# ============ 子进程 ============
+
+async def _read_stream(stream: asyncio.StreamReader, on_chunk: Callable[[bytes], None]) -> None:
+    """持续读取子进程输出直到 EOF，避免管道写满阻塞子进程"""
+    while True:
+        chunk = await stream.read(_READ_CHUNK)
+        if not chunk:
+            return
+        on_chunk(chunk)
+
+
+class _RunLogWriter:
+    """
+    执行输出文件的写入缓冲
+
+    事件循环上只把输出追加到内存缓冲，文件的打开、写入和关闭都在线程池中进行；
+    同一时刻最多一个写入在进行，保证写入顺序。
+    """
+
+    def __init__(self, path: Path):
+        self._path = path
+        self._file = None
+        self._buffer = bytearray()
+        self._pending: Optional[asyncio.Future] = None
+        self._last_flush = time.monotonic()
+
+    async def open(self) -> None:
+        self._file = await asyncio.get_running_loop().run_in_executor(None, open, self._path, "wb")
+
+    def write(self, data: bytes) -> None:
+        """追加到缓冲，需要时发起后台写入（在事件循环中调用）"""
+        self._buffer.extend(data)
+        if self._pending is not None:
+            if not self._pending.done():
+                return
+            # 上一次写入失败时在这里抛出
+            pending, self._pending = self._pending, None
+            pending.result()
+        now = time.monotonic()
+        if len(self._buffer) >= RUN_LOG_FLUSH_BYTES or now - self._last_flush >= RUN_LOG_FLUSH_SECONDS:
+            data = bytes(self._buffer)
+            self._buffer.clear()
+            self._last_flush = now
+            self._pending = asyncio.get_running_loop().run_in_executor(None, self._file.write, data)
+
+    async def close(self, trailer: bytes = b"") -> None:
+        """等待进行中的写入，写出剩余缓冲和 trailer 后关闭文件"""
+        if self._file is None:
+            return
+        try:
+            if self._pending is not None:
+                await self._pending
+        finally:
+            self._buffer.extend(trailer)
+            data = bytes(self._buffer)
+            self._buffer.clear()
+            await asyncio.get_running_loop().run_in_executor(None, self._write_and_close, data)
+
+    def _write_and_close(self, data: bytes) -> None:
+        try:
+            self._file.write(data)
+        finally:
+            self._file.close()
+
+
+async def _communicate(
+    process: asyncio.subprocess.Process,
+    on_stdout: Callable[[bytes], None],
+    on_stderr: Callable[[bytes], None]
+) -> None:
+    """逐块处理全部输出并等待子进程退出"""
+    await asyncio.gather(
+        _read_stream(process.stdout, on_stdout),
+        _read_stream(process.stderr, on_stderr)
+    )
+    await process.wait()
+
+
+def _signal_process_group(process: asyncio.subprocess.Process, sig: int) -> None:
+    """向子进程所在进程组发送信号（子进程以新会话启动，进程组 ID 即其 PID）"""
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(process.pid, sig)
+        else:
+            process.send_signal(sig)
+    except ProcessLookupError:
+        pass
+
+
+async def kill_process_group(process: asyncio.subprocess.Process) -> None:
+    """结束子进程及其派生的进程：先 SIGTERM，宽限期后 SIGKILL"""
+    if process.returncode is not None:
+        return
+
+    _signal_process_group(process, signal.SIGTERM)
+    try:
+        await asyncio.wait_for(process.wait(), KILL_GRACE_SECONDS)
+    except asyncio.TimeoutError:
+        _signal_process_group(process, getattr(signal, "SIGKILL", signal.SIGTERM))
+        await process.wait()
+
 
 class CronExecutor:
     """Cron 执行器"""
 
     def __init__(self, task_id: str):
         self.task_id = task_id
-        self.config: Optional[Dict[str, Any]] = None
+        self.config: Optional[CronTaskConfig] = None
 
     def load_config(self) -> bool:
         """加载任务配置"""
-        self.config = load_task_config(self.task_id)
+        self.config = load_task_model(self.task_id)
         return self.config is not None
 
+    def _patch_config(
+        self,
+        updates: Optional[Dict[str, Any]] = None,
+        increments: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """字段级更新配置，同时同步内存中的 self.config"""
+        apply_config_patch(self.config, updates, increments)
+        patch_task_config(self.task_id, updates, increments)
+
     async def create_cron_task(
         self,
         name: str,
@@ -47,7 +362,9 @@ class CronExecutor:
         workflow_content: str,
         cron_expression: Optional[str] = None,
         check_interval_minutes: int = 60,
-        timeout_minutes: int = 10
+        timeout_minutes: int = 10,
+        cron_schedule: Optional[Dict[str, Any]] = None,
+        memoize: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """
         创建 Cron 任务
@@ -61,6 +378,8 @@ class CronExecutor:
             cron_expression: Cron 表达式（可选）
             check_interval_minutes: 检查间隔（分钟）
             timeout_minutes: 执行超时时间（分钟）
+            cron_schedule: 调度类型配置（可选，at/every/cron，为空时按 cron_expression 或检查间隔）
+            memoize: 结果复用配置（可选，{enabled, files, commands, ttl_minutes}）
 
         Returns:
             任务配置
@@ -83,10 +402,15 @@ class CronExecutor:
                 "next_run": None
             },
 
+            "cron_schedule": cron_schedule,
+
+            "memoize": memoize,
+
             "execution": {
                 "timeout_minutes": timeout_minutes,
                 "last_run": None,
                 "last_result": None,
+                "last_run_id": None,
                 "run_count": 0,
                 "consecutive_failures": 0,
                 "max_consecutive_failures": 3
@@ -126,9 +450,9 @@ class CronExecutor:
         # 保存 workflow.md
         save_workflow(self.task_id, workflow_content)
 
-        append_log(self.task_id, "ACTION", "Cron 任务已创建")
+        append_log(self.task_id, "ACTION", "Cron 任务已创建", event="task_created")
 
-        self.config = config
+        self.config = load_task_model(self.task_id)
         return config
 
     async def execute_cron(self) -> AnalysisResult:
@@ -154,46 +478,91 @@ class CronExecutor:
 
         start_time = datetime.now()
         start_ms = int(start_time.timestamp() * 1000)
+        run_id = f"{start_time:%Y%m%d_%H%M%S_%f}"[:-3] + f"_{uuid.uuid4().hex[:6]}"
+        memoize = self.config.memoize if self.config.memoize and self.config.memoize.enabled else None
+        fingerprint = None
 
         try:
             mark_check_start(self.task_id)
 
+            if memoize:
+                fingerprint = await compute_input_fingerprint(
+                    self.task_id, self.config.project_path or ".", memoize
+                )
+                reused = memoized_result(memoize, fingerprint, start_ms)
+                if reused:
+                    return self._reuse_result(reused, run_id, start_time)
+
             # 更新执行状态
-            self.config["execution"]["last_run"] = start_time.isoformat() + "Z"
-            self.config["execution"]["last_result"] = None  # 清空，表示正在执行
-            self.config["cron_state"]["last_run_at_ms"] = start_ms
-            save_task_config(self.task_id, self.config)
+            self._patch_config({
+                "execution.last_run": start_time.isoformat() + "Z",
+                "execution.last_result": None,  # 清空，表示正在执行
+                "execution.last_run_id": run_id,
+                "cron_state.last_run_at_ms": start_ms
+            })
 
-            append_log(self.task_id, "ACTION", "开始执行 Cron 任务")
+            append_log(self.task_id, "ACTION", "开始执行 Cron 任务", event="run_started", run_id=run_id)
 
             # 构建提示词
             prompt = self._build_prompt()
 
-            # 执行 Claude CLI
-            result = await self._execute_claude_cli(prompt)
+            # 执行 Claude CLI（输出边执行边分析）
+            result = await self._execute_claude_cli(prompt, run_id)
 
             # 计算执行时长
             end_time = datetime.now()
             duration_ms = int((end_time - start_time).total_seconds() * 1000)
 
-            # 分析结果
-            analyzer = CronResultAnalyzer(self.config)
-            analysis = analyzer.analyze_output(result.get("output", ""))
+            analysis = result["analysis"]
 
             # 更新状态
             self._update_execution_state(analysis, duration_ms)
+            record_run(
+                self.task_id, run_id, start_ms, duration_ms=duration_ms,
+                status=analysis.status, returncode=result["returncode"],
+                summary=analysis.summary, metrics=analysis.metrics
+            )
+
+            append_log(
+                self.task_id, "OUTPUT", f"执行完成: {analysis.status}, {analysis.summary}",
+                event="run_finished", status=analysis.status, duration_ms=duration_ms, run_id=run_id
+            )
 
-            append_log(self.task_id, "OUTPUT", f"执行完成: {analysis.status}, {analysis.summary}")
+            if memoize:
+                self._save_memoized_result(analysis, fingerprint, start_ms)
 
             return analysis
 
         except subprocess.TimeoutExpired:
             # 超时处理
+            record_run(
+                self.task_id, run_id, start_ms, status="timeout", summary="任务执行超时",
+                duration_ms=int((datetime.now() - start_time).total_seconds() * 1000)
+            )
             return await self._handle_timeout()
 
+        except asyncio.CancelledError:
+            # 调度器停止等情况下执行被取消，子进程已结束
+            duration_ms = int((datetime.now() - start_time).total_seconds() * 1000)
+            append_log(
+                self.task_id, "WARNING", "执行已取消", event="run_cancelled",
+                duration_ms=duration_ms, run_id=run_id
+            )
+            record_run(
+                self.task_id, run_id, start_ms, status="cancelled", summary="执行已取消",
+                duration_ms=duration_ms
+            )
+            raise
+
         except Exception as e:
             logger.error(f"执行 Cron 任务失败: {e}")
-            append_log(self.task_id, "ERROR", f"执行失败: {e}")
+            duration_ms = int((datetime.now() - start_time).total_seconds() * 1000)
+            append_log(
+                self.task_id, "ERROR", f"执行失败: {e}",
+                event="run_failed", error=str(e),
+                duration_ms=duration_ms, run_id=run_id
+            )
+            record_run(self.task_id, run_id, start_ms, status="error", summary=str(e), duration_ms=duration_ms)
             return AnalysisResult(
                 status="error",
                 summary=str(e),
@@ -205,74 +574,138 @@ class CronExecutor:
             release_task_lock(self.task_id)
 
     def _build_prompt(self) -> str:
-        """构建执行提示词"""
-        task_md = load_task_md(self.task_id)
-        workflow_md = load_workflow(self.task_id)
-
-        prompt = f"""# 任务描述
-
-{task_md}
-
-# 工作流程
-
-{workflow_md}
-
-# 输出要求
-
-请按照工作流程执行任务，并按以下 JSON 格式输出结果：
-
-```json
-{{
-  "status": "success | warning | error",
-  "summary": "一句话总结",
-  "findings": [
-    {{"level": "info|warning|error", "message": "具体发现"}}
-  ],
-  "metrics": {{
-    "key": value
-  }}
-}}
-```
-"""
-        return prompt
+        """构建执行提示词（task.md 和 workflow.md 未改写时使用缓存）"""
+        return get_cron_prompt(self.task_id)
 
-    async def _execute_claude_cli(self, prompt: str) -> Dict[str, Any]:
+    async def _execute_claude_cli(self, prompt: str, run_id: str) -> Dict[str, Any]:
         """
         执行 Claude CLI
 
+        以异步子进程运行，不阻塞事件循环；子进程在独立的进程组中启动，
+        超时或被取消时整组结束，不留下 Claude CLI 派生的进程。
+
+        标准输出逐块写入 runs/<run_id>.log 并交给增量分析器，内存中只保留
+        开头和末尾（runs.tail_kb）；输出中途解析出 JSON 结果时记录 run_partial 事件
+
         Args:
             prompt: 提示词
+            run_id: 执行 ID
 
         Returns:
-            执行结果 {output, returncode}
+            执行结果 {output, stderr, returncode, run_id, analysis}
+
+        Raises:
+            subprocess.TimeoutExpired: 执行超时
         """
-        timeout_seconds = self.config.get("execution", {}).get("timeout_minutes", 10) * 60
-        project_path = self.config.get("project_path", ".")
+        timeout_seconds = self.config.execution.timeout_minutes * 60
+        project_path = self.config.project_path or "."
+        # 移除 --output-format json，获取原始文本输出
+        cmd = ["claude", "-p", prompt]
+
+        runs_settings = get_settings_section("runs")
+        tail_bytes = int(runs_settings.get("tail_kb", 64)) * 1024
+        max_output_bytes = int(float(runs_settings.get("max_output_mb", 20)) * 1024 * 1024)
+
+        analyzer = IncrementalOutputAnalyzer(self.config.to_dict(), tail_chars=tail_bytes)
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        stderr_tail = bytearray()
+        written = 0
+
+        run_log = _RunLogWriter(get_run_log_path(self.task_id, run_id))
+
+        def on_stdout(chunk: bytes) -> None:
+            nonlocal written
+            if written < max_output_bytes:
+                run_log.write(chunk[:max_output_bytes - written])
+                if written + len(chunk) >= max_output_bytes:
+                    run_log.write("\n... (输出超过 runs.max_output_mb，后续内容未写入) ...\n".encode("utf-8"))
+            written += len(chunk)
+
+            partial = analyzer.feed(decoder.decode(chunk))
+            if partial:
+                append_log(
+                    self.task_id, "OUTPUT", f"已解析到执行结果: {partial.status}, {partial.summary}",
+                    event="run_partial", status=partial.status, run_id=run_id
+                )
 
+        def on_stderr(chunk: bytes) -> None:
+            stderr_tail.extend(chunk)
+            del stderr_tail[:-tail_bytes]
+
+        loop = asyncio.get_running_loop()
         try:
-            # 移除 --output-format json，获取原始文本输出
-            result = subprocess.run(
-                [
-                    "claude",
-                    "-p", prompt
-                ],
+            await run_log.open()
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
                 cwd=project_path,
-                capture_output=True,
-                text=True,
-                timeout=timeout_seconds
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                start_new_session=True
             )
 
-            # 记录原始输出用于调试
-            logger.debug(f"Claude CLI 原始输出: {result.stdout[:500]}")
+            try:
+                await asyncio.wait_for(_communicate(process, on_stdout, on_stderr), timeout_seconds)
+            except asyncio.TimeoutError:
+                await kill_process_group(process)
+                raise subprocess.TimeoutExpired(cmd, timeout_seconds, output=analyzer.output)
+            except asyncio.CancelledError:
+                await kill_process_group(process)
+                raise
+
+            analyzer.feed(decoder.decode(b"", final=True))
+            stderr = stderr_tail.decode("utf-8", errors="replace")
+        finally:
+            try:
+                await run_log.close(b"\n--- stderr ---\n" + bytes(stderr_tail) if stderr_tail else b"")
+            finally:
+                await loop.run_in_executor(
+                    None, prune_run_logs, self.task_id, int(runs_settings.get("keep", 20))
+                )
 
-            return {
-                "output": result.stdout,
-                "stderr": result.stderr,
-                "returncode": result.returncode
-            }
+        # 记录原始输出用于调试
+        logger.debug(f"Claude CLI 原始输出 [{run_id}]: {analyzer.output[:500]}")
 
-        except subprocess.TimeoutExpired:
-            raise
+        return {
+            "output": analyzer.output,
+            "stderr": stderr,
+            "returncode": process.returncode,
+            "run_id": run_id,
+            "analysis": analyzer.finish()
+        }
+
+    def _reuse_result(self, analysis: AnalysisResult, run_id: str, start_time: datetime) -> AnalysisResult:
+        """输入未变化，跳过 Claude CLI，按一次执行记录复用的结果"""
+        start_ms = int(start_time.timestamp() * 1000)
+        duration_ms = int((datetime.now() - start_time).total_seconds() * 1000)
+
+        self._patch_config({
+            "execution.last_run": start_time.isoformat() + "Z",
+            "cron_state.last_run_at_ms": start_ms
+        })
+        self._update_execution_state(analysis, duration_ms)
+        record_run(
+            self.task_id, run_id, start_ms, duration_ms=duration_ms, status=analysis.status,
+            summary=analysis.summary, metrics=dict(analysis.metrics, reused=True)
+        )
+
+        append_log(
+            self.task_id, "OUTPUT", f"输入未变化，复用上次结果: {analysis.status}, {analysis.summary}",
+            event="run_finished", status=analysis.status, duration_ms=duration_ms, run_id=run_id, reused=True
+        )
+        return analysis
+
+    def _save_memoized_result(self, analysis: AnalysisResult, fingerprint: Optional[str], start_ms: int) -> None:
+        """保存可复用的结果；失败的结果不复用，同时清除旧结果"""
+        if not fingerprint or analysis.status in FAILURE_STATUSES:
+            self._patch_config({"memoize.fingerprint": None, "memoize.result": None, "memoize.result_at_ms": None})
+            return
+
+        self._patch_config({
+            "memoize.fingerprint": fingerprint,
+            "memoize.result": asdict(analysis),
+            "memoize.result_at_ms": start_ms
+        })
 
     def _update_execution_state(
         self,
@@ -283,58 +716,58 @@ class CronExecutor:
         if not self.config:
             return
 
-        # 更新执行统计
-        self.config["execution"]["last_result"] = analysis.status
-        self.config["execution"]["run_count"] = \
-            self.config.get("execution", {}).get("run_count", 0) + 1
-
-        # 更新 cron_state
-        self.config["cron_state"]["last_run_duration_ms"] = duration_ms
-        self.config["cron_state"]["run_count"] = \
-            self.config.get("cron_state", {}).get("run_count", 0) + 1
+        # 更新执行统计和 cron_state
+        updates = {
+            "execution.last_result": analysis.status,
+            "cron_state.last_run_duration_ms": duration_ms
+        }
+        increments = {
+            "execution.run_count": 1,
+            "cron_state.run_count": 1
+        }
 
         # 处理失败计数
         if analysis.status == "error":
-            self.config["execution"]["consecutive_failures"] = \
-                self.config.get("execution", {}).get("consecutive_failures", 0) + 1
-            self.config["cron_state"]["error_count"] = \
-                self.config.get("cron_state", {}).get("error_count", 0) + 1
-            self.config["cron_state"]["last_error"] = analysis.summary
+            increments["execution.consecutive_failures"] = 1
+            increments["cron_state.error_count"] = 1
+            updates["cron_state.last_error"] = analysis.summary
         else:
-            self.config["execution"]["consecutive_failures"] = 0
-            self.config["cron_state"]["last_error"] = None
+            updates["execution.consecutive_failures"] = 0
+            updates["cron_state.last_error"] = None
 
-        save_task_config(self.task_id, self.config)
+        self._patch_config(updates, increments)
 
     async def _handle_timeout(self) -> AnalysisResult:
         """处理超时"""
         if not self.config:
             return AnalysisResult(status="timeout", summary="任务超时")
 
-        append_log(self.task_id, "WARNING", "任务执行超时")
+        append_log(self.task_id, "WARNING", "任务执行超时", event="run_timeout")
 
         # 更新状态
-        self.config["execution"]["last_result"] = "timeout"
-        self.config["execution"]["consecutive_failures"] = \
-            self.config.get("execution", {}).get("consecutive_failures", 0) + 1
+        self._patch_config(
+            {"execution.last_result": "timeout"},
+            {"execution.consecutive_failures": 1}
+        )
 
         # 检查连续失败次数
-        max_failures = self.config.get("execution", {}).get("max_consecutive_failures", 3)
-        consecutive_failures = self.config["execution"]["consecutive_failures"]
+        max_failures = self.config.execution.max_consecutive_failures
+        consecutive_failures = self.config.execution.consecutive_failures
 
         if consecutive_failures >= max_failures:
             # 达到阈值，暂停任务
-            self.config["state"]["status"] = "paused"
+            apply_config_patch(self.config, {"state.status": "paused"})
             set_task_status(self.task_id, "paused")
-            append_log(self.task_id, "ACTION", f"连续超时 {consecutive_failures} 次，任务已暂停")
+            append_log(
+                self.task_id, "ACTION", f"连续超时 {consecutive_failures} 次，任务已暂停",
+                event="task_paused", reason="timeout", consecutive_failures=consecutive_failures
+            )
 
             notify_task_error(
                 self.task_id,
                 f"任务连续超时 {consecutive_failures} 次，已自动暂停"
             )
 
-        save_task_config(self.task_id, self.config)
-
         return AnalysisResult(
             status="timeout",
             summary=f"任务执行超时 (连续失败 {consecutive_failures} 次)",
@@ -351,38 +784,39 @@ class CronExecutor:
         if not self.config:
             return
 
-        analyzer = CronResultAnalyzer(self.config)
+        notification = self.config.notification
+        analyzer = CronResultAnalyzer(self.config.to_dict())
 
         if analyzer.should_notify(result):
             if result.status == "error":
                 notify_task_error(self.task_id, result.summary)
             elif result.status == "warning":
                 # 可疑情况，可以选择是否通知
-                if self.config.get("notification", {}).get("enable_claude_analysis", True):
+                if notification.enable_claude_analysis:
                     # 可以在这里添加 Claude 二次分析
                     notify_task_error(self.task_id, f"警告: {result.summary}")
 
         # 成功时是否通知
         if result.status == "success":
-            if self.config.get("notification", {}).get("notify_on_success", False):
+            if notification.notify_on_success:
                 notify_task_completed(self.task_id, result.summary)
 
     async def stop_cron(self) -> bool:
         """停止 Cron 任务"""
         set_task_status(self.task_id, "stopped")
-        append_log(self.task_id, "ACTION", "Cron 任务已停止")
+        append_log(self.task_id, "ACTION", "Cron 任务已停止", event="task_stopped")
         return True
 
     async def pause_cron(self) -> bool:
         """暂停 Cron 任务"""
         set_task_status(self.task_id, "paused")
-        append_log(self.task_id, "ACTION", "Cron 任务已暂停")
+        append_log(self.task_id, "ACTION", "Cron 任务已暂停", event="task_paused")
         return True
 
     async def resume_cron(self) -> bool:
         """恢复 Cron 任务"""
         set_task_status(self.task_id, "active")
-        append_log(self.task_id, "ACTION", "Cron 任务已恢复")
+        append_log(self.task_id, "ACTION", "Cron 任务已恢复", event="task_resumed")
         return True
 
 
@@ -0,0 +1,117 @@
+"""
+daemon-archon 写入持久化
+
+setting.json 中 storage.durability 决定状态文件写入后何时落盘：
+
+- none：不调用 fsync，只依赖"写临时文件 + 改名"保证文件完整（默认）
+- fsync：每次写入后立即 fsync 文件，改名时同时 fsync 所在目录
+- group：写入后只登记文件，由后台线程每 storage.group_commit_ms 毫秒统一 fsync 一次，
+  同一周期内所有任务的写入合并为一次提交；断电时最多丢失一个周期内的写入
+"""
+
+import os
+import logging
+import threading
+from pathlib import Path
+from typing import Optional, Dict
+
+logger = logging.getLogger(__name__)
+
+DURABILITY_MODES = ("none", "fsync", "group")
+
+
+def fsync_path(path: Path) -> None:
+    """fsync 文件或目录"""
+    flags = os.O_RDONLY
+    if hasattr(os, "O_DIRECTORY") and path.is_dir():
+        flags |= os.O_DIRECTORY
+    fd = os.open(str(path), flags)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class GroupCommitter:
+    """
+    组提交线程
+
+    同一文件在一个周期内多次写入只 fsync 一次，多个文件共享的目录也只 fsync 一次
+    """
+
+    def __init__(self, interval: float = 0.05):
+        """
+        初始化组提交
+
+        Args:
+            interval: 提交周期（秒）
+        """
+        self.interval = interval
+        self._pending: Dict[Path, bool] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+    def add(self, path: Path, sync_dir: bool = False) -> None:
+        """
+        登记一次写入
+
+        Args:
+            path: 写入的文件
+            sync_dir: 是否需要同时 fsync 所在目录（文件被创建或改名时）
+        """
+        with self._lock:
+            self._pending[path] = self._pending.get(path, False) or sync_dir
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._wakeup.clear()
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name="archon-group-commit",
+                    daemon=True
+                )
+                self._thread.start()
+
+    def commit(self) -> int:
+        """
+        立即提交已登记的写入
+
+        Returns:
+            fsync 的文件和目录数
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        if not pending:
+            return 0
+
+        targets = list(pending)
+        targets.extend({path.parent for path, sync_dir in pending.items() if sync_dir})
+
+        synced = 0
+        for target in targets:
+            try:
+                fsync_path(target)
+                synced += 1
+            except FileNotFoundError:
+                # 提交前已被删除或再次改名
+                pass
+            except OSError as e:
+                logger.error(f"fsync 失败 [{target}]: {e}")
+        return synced
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """提交剩余写入并停止线程"""
+        self._stopping = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.commit()
+
+    def _run(self) -> None:
+        """提交线程主循环"""
+        while not self._stopping:
+            self._wakeup.wait(self.interval)
+            self.commit()
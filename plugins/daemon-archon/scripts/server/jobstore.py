@@ -0,0 +1,165 @@
+"""
+daemon-archon 调度任务持久化
+
+APScheduler 的 SQLite 任务存储：每个调度任务一行，记录下次运行时间和序列化后的任务状态。
+守护进程重启后按原有节奏恢复调度，而不是从启动时刻重新计时；
+停机期间错过的运行由调度器按 scheduler.catch_up 策略处理。
+
+任务函数以 "模块:函数名" 的形式保存，因此调度任务必须使用模块级函数。
+"""
+
+import pickle
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import Optional, List, Tuple, Any
+
+from apscheduler.job import Job
+from apscheduler.jobstores.base import BaseJobStore, JobLookupError, ConflictingIdError
+from apscheduler.util import datetime_to_utc_timestamp, utc_timestamp_to_datetime
+
+logger = logging.getLogger(__name__)
+
+JOBSTORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scheduler_jobs (
+    id TEXT PRIMARY KEY,
+    next_run_time REAL,
+    job_state BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_scheduler_jobs_next_run ON scheduler_jobs (next_run_time);
+"""
+
+
+class SQLiteJobStore(BaseJobStore):
+    """SQLite 调度任务存储"""
+
+    def __init__(self, db_path: Path, pickle_protocol: int = pickle.HIGHEST_PROTOCOL):
+        """
+        初始化任务存储
+
+        Args:
+            db_path: 数据库路径
+            pickle_protocol: 任务状态的 pickle 协议版本
+        """
+        super().__init__()
+        self.db_path = db_path
+        self.pickle_protocol = pickle_protocol
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def start(self, scheduler, alias):
+        """调度器启动时打开数据库"""
+        super().start(scheduler, alias)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(JOBSTORE_SCHEMA)
+
+    def shutdown(self):
+        """调度器停止时关闭数据库"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # ============ 查询 ============
+
+    def lookup_job(self, job_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT job_state FROM scheduler_jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return self._reconstitute_job(row[0]) if row else None
+
+    def get_due_jobs(self, now):
+        return self._get_jobs("WHERE next_run_time <= ?", (datetime_to_utc_timestamp(now),))
+
+    def get_next_run_time(self):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT next_run_time FROM scheduler_jobs WHERE next_run_time IS NOT NULL "
+                "ORDER BY next_run_time LIMIT 1"
+            ).fetchone()
+        return utc_timestamp_to_datetime(row[0]) if row else None
+
+    def get_all_jobs(self):
+        jobs = self._get_jobs()
+        self._fix_paused_jobs_sorting(jobs)
+        return jobs
+
+    # ============ 写入 ============
+
+    def add_job(self, job):
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT INTO scheduler_jobs (id, next_run_time, job_state) VALUES (?, ?, ?)",
+                    self._job_row(job)
+                )
+        except sqlite3.IntegrityError:
+            raise ConflictingIdError(job.id)
+
+    def update_job(self, job):
+        job_id, next_run_time, job_state = self._job_row(job)
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE scheduler_jobs SET next_run_time = ?, job_state = ? WHERE id = ?",
+                (next_run_time, job_state, job_id)
+            )
+        if cursor.rowcount == 0:
+            raise JobLookupError(job.id)
+
+    def remove_job(self, job_id):
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM scheduler_jobs WHERE id = ?", (job_id,))
+        if cursor.rowcount == 0:
+            raise JobLookupError(job_id)
+
+    def remove_all_jobs(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM scheduler_jobs")
+
+    # ============ 序列化 ============
+
+    def _job_row(self, job: Job) -> Tuple[str, Optional[float], bytes]:
+        """任务 -> (id, next_run_time, job_state)"""
+        return (
+            job.id,
+            datetime_to_utc_timestamp(job.next_run_time),
+            pickle.dumps(job.__getstate__(), self.pickle_protocol),
+        )
+
+    def _reconstitute_job(self, job_state: bytes) -> Job:
+        """从序列化状态恢复任务"""
+        state = pickle.loads(job_state)
+        state["jobstore"] = self
+        job = Job.__new__(Job)
+        job.__setstate__(state)
+        job._scheduler = self._scheduler
+        job._jobstore_alias = self._alias
+        return job
+
+    def _get_jobs(self, where: str = "", params: Tuple[Any, ...] = ()) -> List[Job]:
+        """按下次运行时间顺序读取任务，无法恢复的任务（如函数已被删除）直接清理"""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, job_state FROM scheduler_jobs {where} ORDER BY next_run_time",
+                params
+            ).fetchall()
+
+        jobs, failed = [], []
+        for job_id, job_state in rows:
+            try:
+                jobs.append(self._reconstitute_job(job_state))
+            except Exception as e:
+                logger.error(f"恢复调度任务失败 [{job_id}]: {e}")
+                failed.append((job_id,))
+
+        if failed:
+            with self._lock, self._conn:
+                self._conn.executemany("DELETE FROM scheduler_jobs WHERE id = ?", failed)
+        return jobs
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} (path={self.db_path})>"
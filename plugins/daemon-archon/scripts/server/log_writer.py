@@ -0,0 +1,143 @@
+"""
+daemon-archon 后台日志写入器
+
+append_log 在事件循环中只把日志放入队列，由独立线程按任务批量写入，
+避免阻塞式文件 I/O 拖慢调度循环
+"""
+
+import time
+import queue
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional, List, Any, Callable
+
+logger = logging.getLogger(__name__)
+
+# 队列控制消息
+_FLUSH = object()
+_STOP = object()
+
+
+class TaskLogWriter:
+    """
+    任务日志写入线程
+
+    - 单线程按入队顺序消费，同一任务的日志顺序不变
+    - 同一批次内按任务分组，每个任务只打开一次文件
+    - 距本批第一条日志超过 flush_interval 秒、或累计 max_batch 条、
+      或收到 flush/stop 请求时写出
+    """
+
+    def __init__(
+        self,
+        sink: Callable[[str, List[Any]], Any],
+        flush_interval: float = 0.5,
+        max_batch: int = 256
+    ):
+        """
+        初始化写入器
+
+        Args:
+            sink: 写入函数 sink(task_id, entries)
+            flush_interval: 最长缓冲时间（秒）
+            max_batch: 最多缓冲的日志条数
+        """
+        self._sink = sink
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+    @property
+    def running(self) -> bool:
+        """是否正在接收日志"""
+        return self._thread is not None and self._thread.is_alive() and not self._stopping
+
+    def start(self) -> None:
+        """启动写入线程"""
+        if self.running:
+            return
+
+        self._stopping = False
+        self._thread = threading.Thread(
+            target=self._run,
+            name="archon-log-writer",
+            daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, task_id: str, entry: Any) -> None:
+        """提交一条日志"""
+        self._queue.put((task_id, entry))
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """
+        等待已提交的日志全部写出
+
+        Returns:
+            是否在超时前完成
+        """
+        if not self.running:
+            return True
+
+        done = threading.Event()
+        self._queue.put((_FLUSH, done))
+        return done.wait(timeout)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """写出剩余日志并停止线程"""
+        if self._thread is None:
+            return
+
+        self._stopping = True
+        self._queue.put((_STOP, None))
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning("日志写入线程未在超时前退出")
+        self._thread = None
+
+    def _write(self, pending: "OrderedDict[str, List[Any]]") -> None:
+        """按任务写出缓冲的日志"""
+        for task_id, entries in pending.items():
+            try:
+                self._sink(task_id, entries)
+            except Exception as e:
+                logger.error(f"批量写入日志失败 [{task_id}]: {e}")
+
+    def _run(self) -> None:
+        """写入线程主循环"""
+        pending: "OrderedDict[str, List[Any]]" = OrderedDict()
+        pending_count = 0
+        deadline: Optional[float] = None
+
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                task_id, item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                task_id, item = None, None
+
+            if task_id is None or task_id is _FLUSH or task_id is _STOP:
+                self._write(pending)
+                pending = OrderedDict()
+                pending_count = 0
+                deadline = None
+
+                if task_id is _FLUSH:
+                    item.set()
+                elif task_id is _STOP:
+                    return
+                continue
+
+            pending.setdefault(task_id, []).append(item)
+            pending_count += 1
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_interval
+
+            if pending_count >= self.max_batch:
+                self._write(pending)
+                pending = OrderedDict()
+                pending_count = 0
+                deadline = None
@@ -6,6 +6,7 @@ daemon-archon FastAPI 服务入口
 
 import os
 import sys
+import shlex
 import logging
 import asyncio
 from contextlib import asynccontextmanager
@@ -17,17 +18,24 @@ from fastapi import FastAPI, HTTPException, BackgroundTasks
 from pydantic import BaseModel
 
 # 使用相对导入（需要以模块方式运行: python -m server.main）
-from .scheduler import ArchonScheduler, get_scheduler
+from .scheduler import ArchonScheduler, ConcurrencyLimitError, get_scheduler, validate_cron_schedule
+from .workers import WorkerPool, get_worker_pool
+from .types import CronSchedule, MemoizeConfig
 from .state_store import (
-    load_global_settings, save_global_settings,
-    load_task_config, list_all_tasks, list_active_tasks,
-    get_task_status, set_task_status, read_log,
-    ensure_base_dir
+    load_global_settings, save_global_settings, get_settings_section,
+    load_task_config, list_all_tasks, count_tasks,
+    get_task_status, set_task_status, read_log, query_events, read_run_output,
+    ensure_base_dir, get_config_cache_stats,
+    start_log_writer, stop_log_writer, stop_group_commit
 )
 from .probe_executor import ProbeExecutor, probe_check_callback
-from .cron_executor import CronExecutor, cron_execute_callback
+from .cron_executor import CronExecutor, cron_execute_callback, get_prompt_cache_stats
 from .stuck_detector import run_stuck_detection, handle_stuck_tasks
 from .notifier import notify_service_status
+from .run_history import query_runs
+from .archive import (
+    archive_stale_tasks, list_archived_tasks, load_archived_task, restore_task
+)
 
 # 配置日志
 logging.basicConfig(
@@ -62,6 +70,17 @@ class CronCreateRequest(BaseModel):
     cron_expression: Optional[str] = None
     check_interval_minutes: int = 60
     timeout_minutes: int = 10
+    # 调度类型：at（一次性）/ every（间隔，可带锚点）/ cron（表达式，可带时区）
+    schedule_kind: Optional[str] = None
+    at_ms: Optional[int] = None
+    every_ms: Optional[int] = None
+    anchor_ms: Optional[int] = None
+    tz: Optional[str] = None
+    # 结果复用：输入（提示词、文件、命令输出）未变化时不调用 Claude CLI，复用上次结果
+    memoize: bool = False
+    memoize_files: List[str] = []
+    memoize_commands: List[str] = []
+    memoize_ttl_minutes: float = 60
 
 
 class TaskResponse(BaseModel):
@@ -92,20 +111,28 @@ async def lifespan(app: FastAPI):
     # 确保工作目录存在
     ensure_base_dir()
 
+    # 启动后台日志写入
+    start_log_writer()
+
     # 写入 PID 文件
     PID_FILE.parent.mkdir(parents=True, exist_ok=True)
     PID_FILE.write_text(str(os.getpid()))
 
-    # 配置并启动调度器
+    # 配置并启动调度器；多进程模式下由各 worker 运行调度器
+    pool = get_worker_pool()
     scheduler = get_scheduler()
-    scheduler.configure(
-        probe_callback=probe_check_callback,
-        cron_callback=cron_execute_callback
-    )
-    await scheduler.start()
+    if pool:
+        await pool.start()
+    else:
+        scheduler.configure(
+            probe_callback=probe_check_callback,
+            cron_callback=cron_execute_callback
+        )
+        await scheduler.start()
 
-    # 启动卡住检测定时任务
+    # 启动卡住检测和归档定时任务
     asyncio.create_task(stuck_detection_loop())
+    asyncio.create_task(archive_loop())
 
     notify_service_status("已启动", f"PID: {os.getpid()}")
     logger.info("Archon 服务已启动")
@@ -114,7 +141,14 @@ async def lifespan(app: FastAPI):
 
     # 关闭时
     logger.info("Archon 服务关闭中...")
-    await scheduler.stop()
+    if pool:
+        await pool.stop()
+    else:
+        await scheduler.stop()
+
+    # 写出缓冲的日志，提交未落盘的写入
+    stop_log_writer()
+    stop_group_commit()
 
     # 删除 PID 文件
     if PID_FILE.exists():
@@ -138,6 +172,44 @@ async def stuck_detection_loop():
             logger.error(f"卡住检测失败: {e}")
 
 
+async def archive_loop():
+    """归档循环：定期把长时间未变动的终态任务移入归档"""
+    while True:
+        try:
+            archive_settings = get_settings_section("archive")
+            await asyncio.sleep(float(archive_settings.get("interval_minutes", 60)) * 60)
+            if archive_settings.get("enabled", False):
+                await asyncio.get_running_loop().run_in_executor(None, archive_stale_tasks)
+        except asyncio.CancelledError:
+            break
+        except Exception as e:
+            logger.error(f"任务归档失败: {e}")
+
+
+def get_dispatcher():
+    """
+    调度操作的入口
+
+    多进程模式下为 WorkerPool（按 task_id 转发给所属 worker），否则为本进程的调度器
+    """
+    return get_worker_pool() or get_scheduler()
+
+
+async def _run_with_slot(task_id: str, mode: str, run):
+    """
+    在并发额度内执行手动触发的检查 / 执行
+
+    与调度执行共用同一组额度，最多排队 concurrency.manual_wait_seconds 秒，
+    超时返回 429
+    """
+    wait = float(get_settings_section("concurrency").get("manual_wait_seconds", 30))
+    try:
+        async with get_dispatcher().concurrency_slot(task_id, mode, timeout=wait):
+            return await run()
+    except ConcurrencyLimitError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+
 # ============ FastAPI 应用 ============
 
 app = FastAPI(
@@ -163,49 +235,91 @@ async def root():
 @app.get("/status", response_model=StatusResponse)
 async def get_status():
     """获取服务状态"""
-    scheduler = get_scheduler()
-    all_tasks = list_all_tasks()
-    active_tasks = list_active_tasks()
+    pool = get_worker_pool()
+    scheduler = pool or get_scheduler()
 
     return StatusResponse(
         running=scheduler.running,
-        tasks_count=len(all_tasks),
-        active_tasks_count=len(active_tasks),
-        scheduler_jobs=scheduler.list_jobs()
+        tasks_count=count_tasks(),
+        active_tasks_count=count_tasks(status="active"),
+        scheduler_jobs=await pool.list_jobs() if pool else scheduler.list_jobs()
     )
 
 
 @app.get("/tasks")
-async def list_tasks(mode: Optional[str] = None, status: Optional[str] = None):
-    """列出所有任务"""
-    tasks = list_all_tasks()
-
-    if mode:
-        tasks = [t for t in tasks if t.get("mode") == mode]
-
-    if status:
-        tasks = [t for t in tasks if t.get("state", {}).get("status") == status]
-
+async def list_tasks(
+    mode: Optional[str] = None,
+    status: Optional[str] = None,
+    include_archived: bool = False
+):
+    """列出所有任务，include_archived 为 true 时附带已归档任务（带 archived_at 字段）"""
+    tasks = list_all_tasks(mode=mode or None, status=status or None)
+    if include_archived:
+        tasks.extend(list_archived_tasks(mode=mode or None, status=status or None))
     return {"tasks": tasks}
 
 
 @app.get("/tasks/{task_id}")
 async def get_task(task_id: str):
-    """获取任务详情"""
-    config = load_task_config(task_id)
+    """获取任务详情（包括已归档任务）"""
+    config = load_task_config(task_id) or load_archived_task(task_id)
     if not config:
         raise HTTPException(status_code=404, detail="任务不存在")
 
     return config
 
 
+@app.post("/tasks/{task_id}/restore")
+async def restore_archived_task(task_id: str):
+    """把已归档任务恢复到工作目录"""
+    if not load_archived_task(task_id):
+        raise HTTPException(status_code=404, detail="归档任务不存在")
+
+    if not restore_task(task_id):
+        raise HTTPException(status_code=500, detail="恢复归档任务失败")
+
+    return {"success": True, "task_id": task_id}
+
+
 @app.get("/tasks/{task_id}/logs")
 async def get_task_logs(task_id: str, lines: int = 100):
     """获取任务日志"""
-    logs = read_log(task_id, lines)
+    # read_log 会等待日志写入线程落盘（最长数秒），放到线程池中执行
+    logs = await asyncio.get_running_loop().run_in_executor(None, read_log, task_id, lines)
     return {"logs": logs}
 
 
+def _parse_since(value: str) -> int:
+    """解析 since 参数：毫秒时间戳或 ISO 时间（带时区后缀或 Z 时按该时区，否则按本地时区）"""
+    if value.isdigit():
+        return int(value)
+    if value.endswith(("Z", "z")):
+        value = value[:-1] + "+00:00"
+    try:
+        return int(datetime.fromisoformat(value).timestamp() * 1000)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"无效的 since 参数: {value}")
+
+
+@app.get("/tasks/{task_id}/events")
+async def get_task_events(
+    task_id: str,
+    since: Optional[str] = None,
+    type: Optional[str] = None,
+    limit: int = 100
+):
+    """
+    查询任务的结构化事件
+
+    指定 since 时返回该时间之后最早的 limit 条，否则返回最近的 limit 条
+    """
+    since_ms = _parse_since(since) if since else None
+    events = await asyncio.get_running_loop().run_in_executor(
+        None, query_events, task_id, since_ms, type or None, limit
+    )
+    return {"events": events, "count": len(events)}
+
+
 # ============ Probe 模式 API ============
 
 @app.post("/probe/create")
@@ -227,7 +341,7 @@ async def create_probe(request: ProbeCreateRequest, background_tasks: Background
         )
 
         # 添加到调度器
-        scheduler = get_scheduler()
+        scheduler = get_dispatcher()
         await scheduler.add_probe_task(task_id, config)
 
         return TaskResponse(
@@ -251,7 +365,7 @@ async def check_probe(task_id: str):
         raise HTTPException(status_code=404, detail="Probe 任务不存在")
 
     executor = ProbeExecutor(task_id)
-    result = await executor.check_probe()
+    result = await _run_with_slot(task_id, "probe", executor.check_probe)
 
     return {
         "task_id": task_id,
@@ -274,7 +388,7 @@ async def stop_probe(task_id: str):
 
     if success:
         # 从调度器移除
-        scheduler = get_scheduler()
+        scheduler = get_dispatcher()
         await scheduler.remove_task(task_id, "probe")
 
     return {"success": success, "task_id": task_id}
@@ -282,9 +396,57 @@ async def stop_probe(task_id: str):
 
 # ============ Cron 模式 API ============
 
+def _cron_schedule_from_request(request: CronCreateRequest) -> Optional[Dict[str, Any]]:
+    """
+    请求 -> cron_schedule 配置
+
+    未指定调度类型相关字段时返回 None，沿用 cron_expression / check_interval_minutes
+    """
+    if not any([request.schedule_kind, request.at_ms, request.every_ms, request.tz]):
+        return None
+
+    kind = request.schedule_kind
+    if not kind:
+        kind = "at" if request.at_ms is not None else "every" if request.every_ms else "cron"
+
+    try:
+        schedule = CronSchedule.from_dict({
+            "kind": kind,
+            "at_ms": request.at_ms,
+            "every_ms": request.every_ms,
+            "anchor_ms": request.anchor_ms,
+            "expr": request.cron_expression,
+            "tz": request.tz
+        })
+        validate_cron_schedule(schedule)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return schedule.to_dict()
+
+
+def _memoize_from_request(request: CronCreateRequest) -> Optional[Dict[str, Any]]:
+    """请求 -> memoize 配置，未开启时返回 None"""
+    if not request.memoize:
+        return None
+    for command in request.memoize_commands:
+        try:
+            if not shlex.split(command):
+                raise ValueError("命令为空")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"无效的指纹命令 {command!r}: {e}")
+    return MemoizeConfig(
+        enabled=True,
+        files=request.memoize_files,
+        commands=request.memoize_commands,
+        ttl_minutes=request.memoize_ttl_minutes
+    ).to_dict()
+
+
 @app.post("/cron/create")
 async def create_cron(request: CronCreateRequest):
     """创建 Cron 任务"""
+    cron_schedule = _cron_schedule_from_request(request)
+
     # 生成任务 ID
     task_id = datetime.now().strftime("%Y%m%d_%H%M%S") + "_cron"
 
@@ -299,11 +461,13 @@ async def create_cron(request: CronCreateRequest):
             workflow_content=request.workflow_content,
             cron_expression=request.cron_expression,
             check_interval_minutes=request.check_interval_minutes,
-            timeout_minutes=request.timeout_minutes
+            timeout_minutes=request.timeout_minutes,
+            cron_schedule=cron_schedule,
+            memoize=_memoize_from_request(request)
         )
 
         # 添加到调度器
-        scheduler = get_scheduler()
+        scheduler = get_dispatcher()
         await scheduler.add_cron_task(task_id, config)
 
         return TaskResponse(
@@ -327,7 +491,7 @@ async def execute_cron(task_id: str):
         raise HTTPException(status_code=404, detail="Cron 任务不存在")
 
     executor = CronExecutor(task_id)
-    result = await executor.execute_cron()
+    result = await _run_with_slot(task_id, "cron", executor.execute_cron)
 
     return {
         "task_id": task_id,
@@ -338,6 +502,35 @@ async def execute_cron(task_id: str):
     }
 
 
+@app.get("/cron/{task_id}/output")
+async def get_cron_output(task_id: str, run_id: Optional[str] = None, lines: int = 100):
+    """获取 Cron 执行输出（默认最近一次，执行中也可读取已输出的部分）"""
+    config = load_task_config(task_id)
+    if not config or config.get("mode") != "cron":
+        raise HTTPException(status_code=404, detail="Cron 任务不存在")
+
+    output = read_run_output(task_id, run_id, lines)
+    if output is None:
+        raise HTTPException(status_code=404, detail="执行输出不存在")
+
+    return {"task_id": task_id, **output}
+
+
+@app.get("/cron/{task_id}/runs")
+async def get_cron_runs(
+    task_id: str,
+    limit: int = 50,
+    status: Optional[str] = None,
+    window: Optional[int] = None
+):
+    """获取 Cron 执行历史和耗时分位数、失败率（window 为统计的最近执行次数）"""
+    config = load_task_config(task_id)
+    if not config or config.get("mode") != "cron":
+        raise HTTPException(status_code=404, detail="Cron 任务不存在")
+
+    return {"task_id": task_id, **query_runs(task_id, limit, status, window)}
+
+
 @app.post("/cron/{task_id}/stop")
 async def stop_cron(task_id: str):
     """停止 Cron 任务"""
@@ -350,7 +543,7 @@ async def stop_cron(task_id: str):
 
     if success:
         # 从调度器移除
-        scheduler = get_scheduler()
+        scheduler = get_dispatcher()
         await scheduler.remove_task(task_id, "cron")
 
     return {"success": success, "task_id": task_id}
@@ -367,7 +560,7 @@ async def pause_cron(task_id: str):
     success = await executor.pause_cron()
 
     if success:
-        scheduler = get_scheduler()
+        scheduler = get_dispatcher()
         await scheduler.pause_task(task_id, "cron")
 
     return {"success": success, "task_id": task_id}
@@ -384,7 +577,7 @@ async def resume_cron(task_id: str):
     success = await executor.resume_cron()
 
     if success:
-        scheduler = get_scheduler()
+        scheduler = get_dispatcher()
         await scheduler.resume_task(task_id, "cron")
 
     return {"success": success, "task_id": task_id}
@@ -428,8 +621,42 @@ async def check_stuck():
     }
 
 
+# ============ 调试 API ============
+
+@app.get("/debug/cache")
+async def debug_cache():
+    """配置缓存与提示词缓存命中统计"""
+    return {**get_config_cache_stats(), "prompt": get_prompt_cache_stats()}
+
+
+@app.get("/debug/concurrency")
+async def debug_concurrency():
+    """执行并发与排队统计（多进程模式下为协调者的全局统计，附带各 worker 的占用）"""
+    pool = get_worker_pool()
+    if pool:
+        return await pool.get_concurrency_stats()
+    return get_scheduler().get_concurrency_stats()
+
+
+@app.get("/debug/watcher")
+async def debug_watcher():
+    """transcript 监听统计（多进程模式下按 worker 分组）"""
+    pool = get_worker_pool()
+    if pool:
+        return await pool.get_watcher_stats()
+    return get_scheduler().get_watcher_stats()
+
+
+@app.get("/debug/workers")
+async def debug_workers():
+    """worker 进程状态（未启用多进程模式时为空）"""
+    pool = get_worker_pool()
+    return pool.stats() if pool else {}
+
+
 # ============ 入口点 ============
 
+
 def main():
     """主入口"""
     import uvicorn
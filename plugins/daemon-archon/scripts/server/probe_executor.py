@@ -14,12 +14,12 @@ from datetime import datetime
 from pathlib import Path
 from typing import Optional, Dict, Any, Tuple
 
-from .types import ProbeStatus, AnalysisResult
+from .types import ProbeStatus, AnalysisResult, ProbeTaskConfig
 from .state_store import (
-    load_task_config, save_task_config, get_task_dir,
+    load_task_model, save_task_config, get_task_dir,
     ensure_task_dir, set_task_status, append_log,
     append_correction, save_destination, acquire_task_lock,
-    release_task_lock
+    release_task_lock, patch_task_config, apply_config_patch
 )
 from .analyzer import TranscriptAnalyzer, read_transcript_incremental, get_transcript_path
 from .notifier import notify_task_error, notify_correction_needed, notify_task_completed
@@ -33,13 +33,22 @@ class ProbeExecutor:
 
     def __init__(self, task_id: str):
         self.task_id = task_id
-        self.config: Optional[Dict[str, Any]] = None
+        self.config: Optional[ProbeTaskConfig] = None
 
     def load_config(self) -> bool:
         """加载任务配置"""
-        self.config = load_task_config(self.task_id)
+        self.config = load_task_model(self.task_id)
         return self.config is not None
 
+    def _patch_config(
+        self,
+        updates: Optional[Dict[str, Any]] = None,
+        increments: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """字段级更新配置，同时同步内存中的 self.config"""
+        apply_config_patch(self.config, updates, increments)
+        patch_task_config(self.task_id, updates, increments)
+
     async def start_probe(
         self,
         initial_prompt: str,
@@ -142,9 +151,12 @@ class ProbeExecutor:
 """
         save_destination(self.task_id, destination_content)
 
-        append_log(self.task_id, "ACTION", f"Probe 任务已启动, PID: {probe_info.get('pid')}")
+        append_log(
+            self.task_id, "ACTION", f"Probe 任务已启动, PID: {probe_info.get('pid')}",
+            event="task_started", pid=probe_info.get('pid')
+        )
 
-        self.config = config
+        self.config = load_task_model(self.task_id)
         return config
 
     async def _start_claude_cli(
@@ -231,15 +243,16 @@ class ProbeExecutor:
             mark_check_start(self.task_id)
 
             # 检查进程状态
-            pid = self.config.get("probe", {}).get("pid")
+            probe = self.config.probe
+            pid = probe.pid
             process_alive = self._check_process_alive(pid)
 
             if not process_alive:
                 # 进程已退出，分析输出判断是否成功完成
-                append_log(self.task_id, "WARNING", f"Probe 进程 {pid} 已退出")
+                append_log(self.task_id, "WARNING", f"Probe 进程 {pid} 已退出", event="process_exited", pid=pid)
 
                 # 尝试分析 stdout 输出
-                stdout_log_path = self.config.get("probe", {}).get("stdout_log")
+                stdout_log_path = probe.stdout_log
                 if stdout_log_path:
                     stdout_log = Path(stdout_log_path)
                     if stdout_log.exists():
@@ -247,19 +260,22 @@ class ProbeExecutor:
                             content = stdout_log.read_text(encoding='utf-8', errors='ignore')
 
                             # 检查是否包含完成标志
-                            completion_keywords = self.config.get("criteria", {}).get("completion_keywords", [])
+                            completion_keywords = self.config.criteria.completion_keywords or []
                             has_completion = any(kw in content for kw in completion_keywords)
 
                             # 检查是否有实质性输出（超过 500 字符）
                             has_output = len(content.strip()) > 500
 
                             # 检查是否有错误标志
-                            failure_indicators = self.config.get("criteria", {}).get("failure_indicators", [])
+                            failure_indicators = self.config.criteria.failure_indicators or []
                             has_error = any(indicator in content for indicator in failure_indicators)
 
                             if (has_completion or has_output) and not has_error:
                                 set_task_status(self.task_id, "completed")
-                                append_log(self.task_id, "ACTION", "Probe 任务已完成（基于输出分析）")
+                                append_log(
+                                    self.task_id, "ACTION", "Probe 任务已完成（基于输出分析）",
+                                    event="task_completed", status="completed"
+                                )
                                 return AnalysisResult(
                                     status="completed",
                                     summary="Probe 任务已完成",
@@ -276,15 +292,14 @@ class ProbeExecutor:
                 )
 
             # 读取 transcript
-            session_id = self.config.get("probe", {}).get("session_id")
-            transcript_path = self.config.get("probe", {}).get("transcript_path")
+            session_id = probe.session_id
+            transcript_path = probe.transcript_path
 
             if not transcript_path and session_id:
                 transcript_path = get_transcript_path(session_id)
                 if transcript_path:
                     # 更新配置
-                    self.config["probe"]["transcript_path"] = transcript_path
-                    save_task_config(self.task_id, self.config)
+                    self._patch_config({"probe.transcript_path": transcript_path})
 
             if not transcript_path:
                 return AnalysisResult(
@@ -293,19 +308,25 @@ class ProbeExecutor:
                 )
 
             # 增量读取 transcript
-            last_offset = self.config.get("state", {}).get("last_transcript_offset", 0)
+            last_offset = self.config.state.last_transcript_offset or 0
             transcript_data = read_transcript_incremental(transcript_path, last_offset)
 
             # 更新偏移量
-            self.config.setdefault("state", {})["last_transcript_offset"] = transcript_data["new_offset"]
-            self.config["state"]["last_check"] = datetime.utcnow().isoformat() + "Z"
-            save_task_config(self.task_id, self.config)
+            self._patch_config({
+                "state.last_transcript_offset": transcript_data["new_offset"],
+                "state.last_check": datetime.utcnow().isoformat() + "Z"
+            })
 
             # 分析消息
-            analyzer = TranscriptAnalyzer(self.config)
+            analyzer = TranscriptAnalyzer(self.config.to_dict())
             result = analyzer.analyze_messages(transcript_data["messages"])
+            result.metrics["message_count"] = len(transcript_data["messages"])
 
-            append_log(self.task_id, "OUTPUT", f"分析结果: {result.status}, {result.summary}")
+            append_log(
+                self.task_id, "OUTPUT", f"分析结果: {result.status}, {result.summary}",
+                event="check_finished", status=result.status, progress=result.progress,
+                message_count=len(transcript_data["messages"])
+            )
 
             return result
 
@@ -327,18 +348,21 @@ class ProbeExecutor:
         elif result.status == "completed":
             await self._handle_completed(result)
         else:
-            append_log(self.task_id, "DECISION", "Probe 运行正常，无需干预")
+            append_log(self.task_id, "DECISION", "Probe 运行正常，无需干预", event="decision", action="none")
 
     async def _handle_error(self, result: AnalysisResult) -> None:
         """处理错误状态"""
         if not self.config:
             return
 
-        correction_count = self.config.get("correction", {}).get("current_count", 0)
-        max_corrections = self.config.get("correction", {}).get("max_auto_corrections", 3)
+        correction_count = self.config.correction.current_count
+        max_corrections = self.config.correction.max_auto_corrections
 
         if correction_count >= max_corrections:
-            append_log(self.task_id, "DECISION", f"纠偏次数已达上限 ({correction_count}/{max_corrections})")
+            append_log(
+                self.task_id, "DECISION", f"纠偏次数已达上限 ({correction_count}/{max_corrections})",
+                event="decision", action="escalate", correction_index=correction_count
+            )
             notify_correction_needed(
                 self.task_id,
                 f"任务自动纠偏 {correction_count} 次失败，请手动处理"
@@ -346,17 +370,20 @@ class ProbeExecutor:
             return
 
         # 执行纠偏
-        append_log(self.task_id, "ACTION", f"开始执行纠偏 ({correction_count + 1}/{max_corrections})")
+        append_log(
+            self.task_id, "ACTION", f"开始执行纠偏 ({correction_count + 1}/{max_corrections})",
+            event="correction_started", correction_index=correction_count + 1
+        )
         await self._execute_correction(result)
 
     async def _handle_stuck(self, result: AnalysisResult) -> None:
         """处理卡住状态"""
-        append_log(self.task_id, "WARNING", f"Probe 卡住: {result.summary}")
+        append_log(self.task_id, "WARNING", f"Probe 卡住: {result.summary}", event="stuck", status=result.status)
         notify_task_error(self.task_id, f"Probe 任务卡住: {result.summary}")
 
     async def _handle_completed(self, result: AnalysisResult) -> None:
         """处理完成状态"""
-        append_log(self.task_id, "ACTION", "任务已完成")
+        append_log(self.task_id, "ACTION", "任务已完成", event="task_completed", status="stopped")
         set_task_status(self.task_id, "stopped")
         notify_task_completed(self.task_id, result.summary)
 
@@ -369,7 +396,7 @@ class ProbeExecutor:
         if not self.config:
             return
 
-        session_id = self.config.get("probe", {}).get("session_id")
+        session_id = self.config.probe.session_id
         if not session_id:
             logger.error("无法获取 session_id，无法执行纠偏")
             return
@@ -395,17 +422,17 @@ class ProbeExecutor:
                     "--resume", session_id,
                     "-p", correction_prompt
                 ],
-                cwd=self.config.get("project_path"),
+                cwd=self.config.project_path or None,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
                 start_new_session=True
             )
 
             # 更新纠偏计数
-            self.config["correction"]["current_count"] = \
-                self.config.get("correction", {}).get("current_count", 0) + 1
-            self.config["state"]["last_correction"] = datetime.utcnow().isoformat() + "Z"
-            save_task_config(self.task_id, self.config)
+            self._patch_config(
+                {"state.last_correction": datetime.utcnow().isoformat() + "Z"},
+                {"correction.current_count": 1}
+            )
 
             # 记录纠偏历史
             append_correction(self.task_id, {
@@ -418,11 +445,15 @@ class ProbeExecutor:
                 "follow_up_status": "待观察"
             })
 
-            append_log(self.task_id, "ACTION", f"纠偏指令已注入, 新 PID: {process.pid}")
+            append_log(
+                self.task_id, "ACTION", f"纠偏指令已注入, 新 PID: {process.pid}",
+                event="correction_injected", pid=process.pid,
+                correction_index=self.config.correction.current_count
+            )
 
         except Exception as e:
             logger.error(f"执行纠偏失败: {e}")
-            append_log(self.task_id, "ERROR", f"纠偏失败: {e}")
+            append_log(self.task_id, "ERROR", f"纠偏失败: {e}", event="correction_failed", error=str(e))
 
     def _check_process_alive(self, pid: Optional[int]) -> bool:
         """检查进程是否存活"""
@@ -450,7 +481,7 @@ class ProbeExecutor:
             if not self.load_config():
                 return False
 
-        pid = self.config.get("probe", {}).get("pid")
+        pid = self.config.probe.pid
         if not pid:
             return True
 
@@ -473,7 +504,7 @@ class ProbeExecutor:
                 os.kill(pid, signal.SIGKILL)
 
             set_task_status(self.task_id, "stopped")
-            append_log(self.task_id, "ACTION", f"Probe 已停止, PID: {pid}")
+            append_log(self.task_id, "ACTION", f"Probe 已停止, PID: {pid}", event="task_stopped", pid=pid)
             return True
 
         except OSError as e:
@@ -484,12 +515,13 @@ class ProbeExecutor:
             return False
 
 
-async def probe_check_callback(task_id: str) -> None:
+async def probe_check_callback(task_id: str) -> AnalysisResult:
     """
     Probe 检查回调函数
 
-    由调度器调用
+    由调度器调用，返回的分析结果用于调整检查间隔
     """
     executor = ProbeExecutor(task_id)
     result = await executor.check_probe()
     await executor.handle_check_result(result)
+    return result
@@ -0,0 +1,223 @@
+"""
+daemon-archon Cron 执行历史
+
+每次 Cron 执行结束后写入一条记录（run_id、开始时间、耗时、状态、退出码、
+指标），保存在单个 SQLite 文件 runs.db 中，每个任务只保留最近 runs.history_keep 条。
+
+按任务汇总耗时分位数（p50/p95/p99）和失败率，用于发现逐渐变慢或
+失败增多的任务，不必翻查日志。
+"""
+
+import json
+import math
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import Optional, List, Dict, Any
+
+from .state_store import get_base_dir, get_settings_section
+
+logger = logging.getLogger(__name__)
+
+# 计入失败率的状态
+FAILURE_STATUSES = ("error", "timeout")
+
+RUN_HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cron_runs (
+    task_id TEXT NOT NULL,
+    run_id TEXT NOT NULL,
+    started_at_ms INTEGER NOT NULL,
+    duration_ms INTEGER,
+    status TEXT,
+    returncode INTEGER,
+    summary TEXT,
+    metrics TEXT,
+    PRIMARY KEY (task_id, run_id)
+);
+CREATE INDEX IF NOT EXISTS idx_cron_runs_task_started ON cron_runs (task_id, started_at_ms);
+"""
+
+
+def percentile(sorted_values: List[float], p: float) -> Optional[float]:
+    """最近秩法分位数，sorted_values 需已升序排列"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class RunHistory:
+    """执行历史存储"""
+
+    def __init__(self, db_path: Path, keep: int = 500):
+        """
+        初始化执行历史存储
+
+        Args:
+            db_path: 数据库路径
+            keep: 每个任务保留的记录数
+        """
+        self.db_path = db_path
+        self.keep = max(1, keep)
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        """获取当前线程的连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), timeout=30)
+            conn.executescript(RUN_HISTORY_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def record(
+        self,
+        task_id: str,
+        run_id: str,
+        started_at_ms: int,
+        duration_ms: Optional[int],
+        status: str,
+        returncode: Optional[int] = None,
+        summary: str = "",
+        metrics: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """写入一条执行记录，并删除超出保留数量的旧记录"""
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cron_runs "
+                "(task_id, run_id, started_at_ms, duration_ms, status, returncode, summary, metrics) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    task_id, run_id, started_at_ms, duration_ms, status, returncode,
+                    summary, json.dumps(metrics or {}, ensure_ascii=False)
+                )
+            )
+            conn.execute(
+                "DELETE FROM cron_runs WHERE task_id = ? AND rowid NOT IN ("
+                "SELECT rowid FROM cron_runs WHERE task_id = ? ORDER BY started_at_ms DESC LIMIT ?)",
+                (task_id, task_id, self.keep)
+            )
+
+    def list_runs(self, task_id: str, limit: int = 50, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        """列出执行记录，按开始时间倒序"""
+        where = "task_id = ?"
+        params: List[Any] = [task_id]
+        if status:
+            where += " AND status = ?"
+            params.append(status)
+        params.append(limit)
+
+        rows = self._conn().execute(
+            "SELECT run_id, started_at_ms, duration_ms, status, returncode, summary, metrics "
+            f"FROM cron_runs WHERE {where} ORDER BY started_at_ms DESC LIMIT ?",
+            params
+        ).fetchall()
+        return [
+            {
+                "run_id": row[0],
+                "started_at_ms": row[1],
+                "duration_ms": row[2],
+                "status": row[3],
+                "returncode": row[4],
+                "summary": row[5],
+                "metrics": json.loads(row[6]) if row[6] else {},
+            }
+            for row in rows
+        ]
+
+    def stats(self, task_id: str, window: Optional[int] = None) -> Dict[str, Any]:
+        """
+        汇总执行统计
+
+        Args:
+            task_id: 任务 ID
+            window: 只统计最近若干次执行，为空时统计全部保留的记录
+
+        Returns:
+            {runs, failures, failure_rate, status_counts, duration_ms: {avg, p50, p95, p99, max}}
+        """
+        rows = self._conn().execute(
+            "SELECT duration_ms, status FROM cron_runs WHERE task_id = ? "
+            "ORDER BY started_at_ms DESC LIMIT ?",
+            (task_id, window if window else -1)
+        ).fetchall()
+
+        status_counts: Dict[str, int] = {}
+        for _, status in rows:
+            status_counts[status] = status_counts.get(status, 0) + 1
+        failures = sum(status_counts.get(status, 0) for status in FAILURE_STATUSES)
+        durations = sorted(row[0] for row in rows if row[0] is not None)
+
+        return {
+            "runs": len(rows),
+            "failures": failures,
+            "failure_rate": round(failures / len(rows), 4) if rows else 0.0,
+            "status_counts": status_counts,
+            "duration_ms": {
+                "avg": round(sum(durations) / len(durations)) if durations else None,
+                "p50": percentile(durations, 50),
+                "p95": percentile(durations, 95),
+                "p99": percentile(durations, 99),
+                "max": durations[-1] if durations else None,
+            }
+        }
+
+    def delete(self, task_id: str) -> None:
+        """删除任务的全部执行记录"""
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM cron_runs WHERE task_id = ?", (task_id,))
+
+
+_run_history: Optional[RunHistory] = None
+
+
+def get_run_history() -> RunHistory:
+    """获取执行历史存储单例"""
+    global _run_history
+    if _run_history is None:
+        runs_settings = get_settings_section("runs")
+        path = runs_settings.get("history_path") or get_base_dir() / "runs.db"
+        _run_history = RunHistory(Path(path).expanduser(), int(runs_settings.get("history_keep", 500)))
+    return _run_history
+
+
+def record_run(task_id: str, run_id: str, started_at_ms: int, **fields) -> bool:
+    """写入执行记录，失败只记录日志，不影响执行流程"""
+    try:
+        get_run_history().record(task_id, run_id, started_at_ms, **fields)
+        return True
+    except Exception as e:
+        logger.error(f"写入执行历史失败 [{task_id}]: {e}")
+        return False
+
+
+def delete_runs(task_id: str) -> bool:
+    """删除任务的执行记录，失败只记录日志"""
+    try:
+        get_run_history().delete(task_id)
+        return True
+    except Exception as e:
+        logger.error(f"删除执行历史失败 [{task_id}]: {e}")
+        return False
+
+
+def query_runs(
+    task_id: str,
+    limit: int = 50,
+    status: Optional[str] = None,
+    window: Optional[int] = None
+) -> Dict[str, Any]:
+    """查询执行记录和汇总统计"""
+    history = get_run_history()
+    try:
+        return {
+            "runs": history.list_runs(task_id, limit, status),
+            "stats": history.stats(task_id, window)
+        }
+    except Exception as e:
+        logger.error(f"查询执行历史失败 [{task_id}]: {e}")
+        return {"runs": [], "stats": None}
@@ -4,26 +4,405 @@ daemon-archon APScheduler 调度器
 基于 APScheduler 实现定时任务调度，借鉴 OpenClaw 的优秀设计
 """
 
+import time
+import asyncio
+import hashlib
 import logging
-from datetime import datetime, timedelta
-from typing import Optional, Dict, Any, List, Callable
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, Any, List, Callable, Deque, Set, Tuple, Iterable
 from pathlib import Path
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.base import BaseTrigger
 from apscheduler.triggers.interval import IntervalTrigger
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.date import DateTrigger
 from apscheduler.jobstores.memory import MemoryJobStore
 from apscheduler.executors.asyncio import AsyncIOExecutor
 
-from .types import TaskMode, TaskStatus, CronScheduleKind
+from .types import TaskMode, TaskStatus, CronScheduleKind, CronSchedule, AnalysisResult
 from .state_store import (
-    load_task_config, save_task_config, list_active_tasks,
-    get_task_status, set_task_status, append_log
+    load_task_config, load_task_model, save_task_config, list_active_tasks,
+    get_task_status, set_task_status, append_log, patch_task_config,
+    get_base_dir, get_settings_section
 )
+from .jobstore import SQLiteJobStore
+from .transcript_watcher import TranscriptWatcher
 
 logger = logging.getLogger(__name__)
 
+# 停机期间错过的运行如何处理：
+# skip 跳过，按原节奏等待下次运行；run_once 补执行一次；
+# run_all 逐次补执行，最多 scheduler.max_catch_up_runs 次（Probe 检查只关心当前状态，最多补一次）
+CATCH_UP_POLICIES = ("skip", "run_once", "run_all")
+
+# 统计错过次数时最多向后推算的触发次数
+MAX_MISSED_SCAN = 10000
+
+# 调度错峰：
+# none 不错峰；hash 按 task_id 的哈希确定固定相位（间隔任务在整个间隔内，
+# Cron 任务在 cron_jitter_seconds 内）；spread 把相同间隔/表达式的任务在周期内均匀排开
+JITTER_MODES = ("none", "hash", "spread")
+
+# 错峰时间隔触发器的对齐起点，保证相位在重启后不变
+_PHASE_EPOCH = datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+# 自适应检查间隔保留的精度（分钟，0.1 即 6 秒）
+_INTERVAL_PRECISION = 1
+
+
+# ============ 自适应检查间隔 ============
+
+def next_probe_interval(
+    base: float,
+    current: float,
+    result: AnalysisResult,
+    settings: Dict[str, Any]
+) -> Optional[float]:
+    """
+    根据检查结果计算下一次 Probe 检查间隔（分钟）
+
+    - 发现错误或工具调用失败：缩短到 min_probe_interval_minutes
+    - 没有新消息或已空闲：在当前间隔上乘以 probe_backoff_factor，最多 max_probe_interval_minutes
+    - 有新的正常活动：回到任务配置的检查间隔
+
+    无法判断时（未读取 transcript、任务已完成/停止）返回 None，保持当前间隔
+    """
+    message_count = result.metrics.get("message_count")
+    if message_count is None or result.status in ("completed", "stopped"):
+        return None
+
+    floor = min(base, float(settings.get("min_probe_interval_minutes", 1)))
+    cap = max(base, float(settings.get("max_probe_interval_minutes", 30)))
+
+    if result.status == "error":
+        interval = floor
+    elif message_count == 0 or result.status in ("idle", "stuck"):
+        interval = min(current * float(settings.get("probe_backoff_factor", 2)), cap)
+    else:
+        interval = base
+    return round(max(interval, floor), _INTERVAL_PRECISION)
+
+
+# ============ 错峰 ============
+
+def task_phase(task_id: str) -> float:
+    """task_id 对应的固定相位 [0, 1)，与进程无关（不使用内置 hash）"""
+    digest = hashlib.sha1(task_id.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], "big") / 2 ** 64
+
+
+class OffsetTrigger(BaseTrigger):
+    """在基础触发器的每个触发时间上加固定偏移"""
+
+    def __init__(self, trigger: BaseTrigger, offset_seconds: float):
+        self.trigger = trigger
+        self.offset = timedelta(seconds=offset_seconds)
+
+    def get_next_fire_time(self, previous_fire_time, now):
+        if previous_fire_time is not None:
+            previous_fire_time = previous_fire_time - self.offset
+        next_fire_time = self.trigger.get_next_fire_time(previous_fire_time, now - self.offset)
+        return next_fire_time + self.offset if next_fire_time else None
+
+    def __str__(self):
+        return f"{self.trigger} +{self.offset.total_seconds():g}s"
+
+    def __repr__(self):
+        return f"<OffsetTrigger ({self.trigger!r}, offset={self.offset.total_seconds():g}s)>"
+
+
+class AnchoredTrigger(OffsetTrigger):
+    """锚定间隔：按锚点确定相位的间隔触发器，不参与错峰分配"""
+
+    def __str__(self):
+        return f"{self.trigger} @{self.offset.total_seconds():g}s"
+
+
+def _base_trigger(trigger: BaseTrigger) -> BaseTrigger:
+    """去掉错峰偏移后的触发器"""
+    return trigger.trigger if isinstance(trigger, OffsetTrigger) else trigger
+
+
+def _trigger_key(trigger: BaseTrigger) -> str:
+    """判断调度是否变化时比较的触发器描述（CronTrigger 的 str 不含时区）"""
+    base = _base_trigger(trigger)
+    if isinstance(base, CronTrigger):
+        return f"{trigger} {base.timezone}"
+    return str(trigger)
+
+
+# ============ Cron 调度类型 ============
+
+def resolve_cron_schedule(config: Dict[str, Any]) -> CronSchedule:
+    """
+    任务配置 -> Cron 调度
+
+    没有 cron_schedule 的配置按 schedule.cron_expression / check_interval_minutes 转换
+    """
+    data = config.get("cron_schedule")
+    if data:
+        return CronSchedule.from_dict(data)
+
+    schedule = config.get("schedule", {})
+    if schedule.get("cron_expression"):
+        return CronSchedule(kind=CronScheduleKind.CRON, expr=schedule["cron_expression"])
+    interval_minutes = schedule.get("check_interval_minutes", 60)
+    return CronSchedule(kind=CronScheduleKind.EVERY, every_ms=int(interval_minutes * 60000))
+
+
+def validate_cron_schedule(schedule: CronSchedule) -> None:
+    """校验 Cron 调度，不合法时抛出 ValueError"""
+    if schedule.kind not in list(CronScheduleKind):
+        raise ValueError(f"未知的调度类型: {schedule.kind}")
+
+    if schedule.kind == CronScheduleKind.AT:
+        if schedule.at_ms is None:
+            raise ValueError("at 调度缺少 at_ms")
+    elif schedule.kind == CronScheduleKind.EVERY:
+        if not schedule.every_ms or schedule.every_ms < 1000:
+            raise ValueError("every 调度的 every_ms 不能小于 1000")
+    elif not schedule.expr:
+        raise ValueError("cron 调度缺少 expr")
+    else:
+        try:
+            CronTrigger.from_crontab(schedule.expr, timezone=schedule.tz)
+        except Exception as e:
+            raise ValueError(f"cron 表达式或时区无效: {e}")
+
+
+def anchored_interval_trigger(every_ms: int, anchor_ms: int) -> AnchoredTrigger:
+    """在 anchor_ms + k * every_ms 时刻触发的间隔触发器"""
+    epoch_ms = int(_PHASE_EPOCH.timestamp() * 1000)
+    offset_ms = (anchor_ms - epoch_ms) % every_ms
+    return AnchoredTrigger(
+        IntervalTrigger(seconds=every_ms / 1000, start_date=_PHASE_EPOCH),
+        offset_ms / 1000
+    )
+
+
+# ============ 并发控制 ============
+
+class ConcurrencyLimitError(Exception):
+    """在限定时间内未能获得执行额度"""
+
+
+class _Waiter:
+    """排队中的执行"""
+
+    __slots__ = ("task_id", "project", "mode", "weight", "future", "enqueued_at")
+
+    def __init__(self, task_id: str, project: str, mode: str, weight: int, future: asyncio.Future):
+        self.task_id = task_id
+        self.project = project
+        self.mode = mode
+        self.weight = weight
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+
+def task_project(task_id: str) -> str:
+    """任务所属项目（并发额度按 project_path 计算）"""
+    config = load_task_model(task_id)
+    return (config.project_path if config else "") or ""
+
+
+class ConcurrencyGovernor:
+    """
+    Claude CLI 执行并发控制
+
+    每次执行按模式占用 weights 中的权重（默认 1），同时受三个上限约束：
+    全局 max_total、每个项目 max_per_project、每种模式 max_per_mode。
+    超出上限的执行进入排队，按项目轮转放行（同一项目内先到先得），
+    不会因为某个项目任务多而饿死其他项目；排队只会延后执行，不会丢弃。
+    """
+
+    def __init__(
+        self,
+        max_total: int = 4,
+        max_per_project: int = 2,
+        max_per_mode: Optional[Dict[str, int]] = None,
+        weights: Optional[Dict[str, int]] = None
+    ):
+        """
+        初始化并发控制
+
+        Args:
+            max_total: 全局权重上限，0 表示不限制
+            max_per_project: 每个项目的权重上限，0 表示不限制
+            max_per_mode: {模式: 权重上限}，未列出的模式不限制
+            weights: {模式: 每次执行的权重}
+        """
+        self.max_total = max(0, int(max_total or 0))
+        self.max_per_project = int(max_per_project or 0)
+        self.max_per_mode = {k: int(v) for k, v in (max_per_mode or {}).items() if v}
+        self.weights = {k: int(v) for k, v in (weights or {}).items()}
+
+        self._running_total = 0
+        self._running_project: Dict[str, int] = {}
+        self._running_mode: Dict[str, int] = {}
+        self._queues: "OrderedDict[str, Deque[_Waiter]]" = OrderedDict()
+        self._granted = 0
+        self._delayed = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any]) -> "ConcurrencyGovernor":
+        """按 concurrency 配置段创建，未开启时不限制并发，只做统计"""
+        if not settings.get("enabled", False):
+            return cls(max_total=0, max_per_project=0)
+        return cls(
+            max_total=settings.get("max_total", 4),
+            max_per_project=settings.get("max_per_project", 2),
+            max_per_mode=settings.get("max_per_mode"),
+            weights=settings.get("weights")
+        )
+
+    def _weight(self, mode: str) -> int:
+        """执行权重（不超过全局上限，保证单个执行总能放行）"""
+        weight = max(1, self.weights.get(mode, 1))
+        return min(weight, self.max_total) if self.max_total else weight
+
+    def _fits(self, project: str, mode: str, weight: int) -> bool:
+        """是否可以立即放行"""
+        if self.max_total and self._running_total + weight > self.max_total:
+            return False
+        if self.max_per_project:
+            limit = max(self.max_per_project, weight)
+            if self._running_project.get(project, 0) + weight > limit:
+                return False
+        mode_limit = self.max_per_mode.get(mode)
+        if mode_limit:
+            if self._running_mode.get(mode, 0) + weight > max(mode_limit, weight):
+                return False
+        return True
+
+    def _take(self, project: str, mode: str, weight: int) -> None:
+        """占用额度"""
+        self._running_total += weight
+        self._running_project[project] = self._running_project.get(project, 0) + weight
+        self._running_mode[mode] = self._running_mode.get(mode, 0) + weight
+        self._granted += 1
+
+    def _dispatch(self) -> None:
+        """按项目轮转放行排队中的执行"""
+        progressed = True
+        while progressed and self._queues:
+            progressed = False
+            for project in list(self._queues):
+                queue = self._queues[project]
+                while queue and queue[0].future.done():
+                    # 等待方已取消
+                    queue.popleft()
+                if not queue:
+                    del self._queues[project]
+                    continue
+
+                waiter = queue[0]
+                if not self._fits(project, waiter.mode, waiter.weight):
+                    continue
+
+                queue.popleft()
+                self._take(project, waiter.mode, waiter.weight)
+                waiter.future.set_result(None)
+
+                # 已放行的项目移到队尾，下一轮从其他项目开始
+                if queue:
+                    self._queues.move_to_end(project)
+                else:
+                    del self._queues[project]
+                progressed = True
+                break
+
+    async def acquire(self, task_id: str, project: str, mode: str) -> int:
+        """
+        等待执行额度
+
+        Returns:
+            占用的权重，执行结束后传给 release
+        """
+        weight = self._weight(mode)
+        if not self._queues and self._fits(project, mode, weight):
+            self._take(project, mode, weight)
+            return weight
+
+        waiter = _Waiter(task_id, project, mode, weight, asyncio.get_running_loop().create_future())
+        self._queues.setdefault(project, deque()).append(waiter)
+        self._delayed += 1
+        self._dispatch()
+
+        if not waiter.future.done():
+            logger.info(f"并发已满，任务排队等待 [{task_id}]: 队列长度 {self.queue_depth()}")
+
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # 已放行但等待方被取消，归还额度
+                self.release(project, mode, weight)
+            raise
+
+        waited = time.monotonic() - waiter.enqueued_at
+        self._wait_total += waited
+        self._wait_max = max(self._wait_max, waited)
+        return weight
+
+    def release(self, project: str, mode: str, weight: int) -> None:
+        """归还额度并放行排队中的执行"""
+        self._running_total -= weight
+        self._running_project[project] = self._running_project.get(project, 0) - weight
+        if self._running_project[project] <= 0:
+            del self._running_project[project]
+        self._running_mode[mode] = self._running_mode.get(mode, 0) - weight
+        if self._running_mode[mode] <= 0:
+            del self._running_mode[mode]
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, task_id: str, project: str, mode: str, timeout: Optional[float] = None):
+        """
+        在额度内执行
+
+        Args:
+            timeout: 最长排队秒数，超时抛出 ConcurrencyLimitError；为空时一直等待
+        """
+        try:
+            weight = await asyncio.wait_for(self.acquire(task_id, project, mode), timeout)
+        except asyncio.TimeoutError:
+            raise ConcurrencyLimitError(f"并发已满，{timeout} 秒内未获得执行额度")
+        try:
+            yield
+        finally:
+            self.release(project, mode, weight)
+
+    def queue_depth(self) -> int:
+        """排队中的执行数"""
+        return sum(
+            1 for queue in self._queues.values() for waiter in queue if not waiter.future.done()
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """并发与排队统计"""
+        return {
+            "max_total": self.max_total,
+            "max_per_project": self.max_per_project,
+            "max_per_mode": dict(self.max_per_mode),
+            "running": self._running_total,
+            "running_by_project": dict(self._running_project),
+            "running_by_mode": dict(self._running_mode),
+            "queue_depth": self.queue_depth(),
+            "queue_by_project": {
+                project: len(queue) for project, queue in self._queues.items() if queue
+            },
+            "granted": self._granted,
+            "delayed": self._delayed,
+            "avg_wait_seconds": round(self._wait_total / self._delayed, 3) if self._delayed else 0.0,
+            "max_wait_seconds": round(self._wait_max, 3),
+        }
+
 
 class ArchonScheduler:
     """
@@ -39,11 +418,21 @@ class ArchonScheduler:
         self.running = False
         self._probe_callback: Optional[Callable] = None
         self._cron_callback: Optional[Callable] = None
+        self.governor: Optional[Any] = None  # ConcurrencyGovernor，多进程模式下为 workers.RemoteGovernor
+        self.watcher: Optional[TranscriptWatcher] = None
+        # 恢复任务期间推迟 spread 分配：(模式, 触发规则) -> (触发器, task_id 集合)
+        self._pending_spread: Optional[Dict[Tuple[str, str], Tuple[BaseTrigger, Set[str]]]] = None
+        # 多进程模式下只调度归属本 worker 的任务
+        self._task_filter: Optional[Callable[[str], bool]] = None
+        self._jobstore_suffix: Optional[str] = None
 
     def configure(
         self,
         probe_callback: Optional[Callable] = None,
-        cron_callback: Optional[Callable] = None
+        cron_callback: Optional[Callable] = None,
+        task_filter: Optional[Callable[[str], bool]] = None,
+        jobstore_suffix: Optional[str] = None,
+        governor: Optional[Any] = None
     ):
         """
         配置调度器回调
@@ -51,9 +440,25 @@ class ArchonScheduler:
         Args:
             probe_callback: Probe 检查回调函数
             cron_callback: Cron 执行回调函数
+            task_filter: 任务归属判断（可选，多进程模式下由 worker 设置）
+            jobstore_suffix: 任务存储文件名后缀（可选，各 worker 使用独立的任务存储）
+            governor: 并发额度（可选，提供 slot/stats；多进程模式下由协调者统一分配，
+                为空时按 concurrency 配置创建本进程的 ConcurrencyGovernor）
         """
         self._probe_callback = probe_callback
         self._cron_callback = cron_callback
+        self._task_filter = task_filter
+        self._jobstore_suffix = jobstore_suffix
+        self.governor = governor
+
+    def owns(self, task_id: str) -> bool:
+        """任务是否由本调度器负责"""
+        return self._task_filter is None or self._task_filter(task_id)
+
+    async def rebalance(self) -> None:
+        """任务归属变化后重新对齐：添加新归属的任务，清理不再归属的任务"""
+        if self.scheduler:
+            await self._restore_active_tasks()
 
     async def start(self):
         """启动调度器"""
@@ -64,7 +469,7 @@ class ArchonScheduler:
         # 创建调度器
         self.scheduler = AsyncIOScheduler(
             jobstores={
-                'default': MemoryJobStore()
+                'default': self._create_jobstore()
             },
             executors={
                 'default': AsyncIOExecutor()
@@ -76,14 +481,36 @@ class ArchonScheduler:
             }
         )
 
+        if self.governor is None:
+            self.governor = ConcurrencyGovernor.from_settings(get_settings_section("concurrency"))
+
+        self.watcher = TranscriptWatcher.from_settings(
+            get_settings_section("watcher"), self._on_transcript_change
+        )
+        self.watcher.start()
+
+        # 以暂停状态启动：先恢复任务、处理停机期间错过的运行，再开始调度
+        self.scheduler.start(paused=True)
+
         # 恢复所有活跃任务
         await self._restore_active_tasks()
+        self._catch_up_missed_runs()
 
-        # 启动调度器
-        self.scheduler.start()
+        self.scheduler.resume()
         self.running = True
         logger.info("Archon 调度器已启动")
 
+    def _create_jobstore(self):
+        """按 scheduler.jobstore 创建任务存储（sqlite / memory）"""
+        settings = get_settings_section("scheduler")
+        if settings.get("jobstore", "sqlite") == "memory":
+            return MemoryJobStore()
+
+        path = Path(settings.get("jobstore_path") or get_base_dir() / "scheduler.db").expanduser()
+        if self._jobstore_suffix:
+            path = path.with_name(f"{path.stem}.{self._jobstore_suffix}{path.suffix}")
+        return SQLiteJobStore(path)
+
     async def stop(self):
         """停止调度器"""
         if not self.running:
@@ -91,27 +518,158 @@ class ArchonScheduler:
 
         if self.scheduler:
             self.scheduler.shutdown(wait=True)
+            # AsyncIOScheduler 在下一轮事件循环中才真正停止，等待其完成，
+            # 避免旧实例继续从持久化的任务存储中取出任务
+            await asyncio.sleep(0)
             self.scheduler = None
 
+        if self.watcher:
+            self.watcher.stop()
+            self.watcher = None
+
         self.running = False
         logger.info("Archon 调度器已停止")
 
     async def _restore_active_tasks(self):
-        """恢复所有活跃任务"""
-        active_tasks = list_active_tasks()
+        """
+        恢复所有活跃任务
+
+        任务存储中已有且调度未变化的任务保留原有的下次运行时间；
+        任务已删除、停止或不再归属本调度器的调度任务被清理，已暂停的保持暂停
+        """
+        active_tasks = [task for task in list_active_tasks() if self.owns(task.get("task_id"))]
         logger.info(f"恢复 {len(active_tasks)} 个活跃任务")
 
-        for task in active_tasks:
-            task_id = task.get("task_id")
-            mode = task.get("mode")
+        self._pending_spread = {}
+        try:
+            for task in active_tasks:
+                task_id = task.get("task_id")
+                mode = task.get("mode")
+
+                try:
+                    if mode == "probe":
+                        await self.add_probe_task(task_id, task)
+                    elif mode == "cron":
+                        await self.add_cron_task(task_id, task)
+                except Exception as e:
+                    logger.error(f"恢复任务失败 [{task_id}]: {e}")
+        finally:
+            pending, self._pending_spread = self._pending_spread, None
+
+        # 每组同周期任务只分配一次，避免逐个添加时反复重排
+        for (mode, _), (trigger, task_ids) in pending.items():
+            self._spread_jobs(mode, trigger, include=task_ids)
 
-            try:
-                if mode == "probe":
-                    await self.add_probe_task(task_id, task)
-                elif mode == "cron":
-                    await self.add_cron_task(task_id, task)
-            except Exception as e:
-                logger.error(f"恢复任务失败 [{task_id}]: {e}")
+        for job in self.scheduler.get_jobs():
+            task_id = job.args[1] if job.id.startswith("catchup_") else job.args[0]
+            status = get_task_status(task_id)
+            if not self.owns(task_id) or status not in ("active", "paused"):
+                job.remove()
+                if self.watcher:
+                    self.watcher.unwatch(task_id)
+                logger.info(f"已清理调度任务: {job.id}")
+            elif status == "paused" and job.next_run_time is not None:
+                job.pause()
+
+    def _catch_up_missed_runs(self):
+        """按 scheduler.catch_up 处理停机期间错过的运行"""
+        settings = get_settings_section("scheduler")
+        policy = settings.get("catch_up", "run_once")
+        if policy not in CATCH_UP_POLICIES:
+            logger.warning(f"未知的补执行策略 {policy}，使用 run_once")
+            policy = "run_once"
+        max_runs = max(1, int(settings.get("max_catch_up_runs", 3)))
+
+        now = datetime.now(self.scheduler.timezone)
+        for job in self.scheduler.get_jobs():
+            if job.next_run_time is None or job.next_run_time > now or job.id.startswith("catchup_"):
+                continue
+            if isinstance(job.trigger, DateTrigger):
+                # 一次性任务不设错过宽限，调度器恢复后直接执行
+                continue
+
+            missed = self._count_missed_runs(job, now, max_runs if policy == "run_all" else 1)
+            mode, task_id = job.id.split("_", 1)
+            runs = 0
+            if policy == "run_once":
+                runs = 1
+            elif policy == "run_all":
+                runs = 1 if mode == "probe" else missed
+
+            # 按原有节奏计算停机后的第一次运行时间
+            next_time = job.trigger.get_next_fire_time(None, now)
+            if next_time is None or next_time <= now:
+                job.remove()
+            else:
+                job.modify(next_run_time=next_time)
+
+            if runs:
+                self.scheduler.add_job(
+                    run_catch_up,
+                    trigger=DateTrigger(run_date=now),
+                    id=f"catchup_{job.id}",
+                    args=[mode, task_id, runs],
+                    name=f"补执行: {task_id}",
+                    replace_existing=True,
+                    misfire_grace_time=None
+                )
+                append_log(
+                    task_id, "ACTION", f"停机期间错过运行，补执行 {runs} 次",
+                    event="catch_up", policy=policy, runs=runs
+                )
+            else:
+                append_log(
+                    task_id, "ACTION", "停机期间错过运行，已跳过",
+                    event="catch_up", policy=policy, runs=0
+                )
+
+    @staticmethod
+    def _count_missed_runs(job, now: datetime, limit: int) -> int:
+        """统计 job.next_run_time 到 now 之间错过的运行次数（最多 limit 次）"""
+        count = 0
+        run_time = job.next_run_time
+        for _ in range(MAX_MISSED_SCAN):
+            if run_time is None or run_time > now or count >= limit:
+                break
+            count += 1
+            run_time = job.trigger.get_next_fire_time(run_time, now)
+        return count
+
+    def _schedule_job(
+        self,
+        job_id: str,
+        func: Callable,
+        trigger,
+        task_id: str,
+        name: str,
+        **options
+    ) -> None:
+        """
+        添加或更新调度任务
+
+        任务存储中已有相同触发器的任务时保留其下次运行时间，不从当前时刻重新计时；
+        options 为 add_job 的其他参数（如 misfire_grace_time）
+        """
+        existing = self.scheduler.get_job(job_id)
+        if existing and existing.func is func:
+            if _trigger_key(existing.trigger) == _trigger_key(trigger):
+                if existing.next_run_time is None:
+                    existing.resume()
+                return
+
+            # 触发器变化时原地重新调度
+            existing.reschedule(trigger)
+            return
+
+        self.scheduler.add_job(
+            func,
+            trigger=trigger,
+            id=job_id,
+            args=[task_id],
+            name=name,
+            replace_existing=True,
+            **options
+        )
 
     async def add_probe_task(self, task_id: str, config: Optional[Dict[str, Any]] = None):
         """
@@ -129,25 +687,17 @@ class ArchonScheduler:
             if not config:
                 raise ValueError(f"任务配置不存在: {task_id}")
 
-        # 获取检查间隔
-        interval_minutes = config.get("schedule", {}).get("check_interval_minutes", 5)
+        # 有新内容写入时由文件监听触发检查
+        configured_minutes = config.get("schedule", {}).get("check_interval_minutes", 5)
+        self._watch_transcript(task_id, config.get("probe", {}).get("transcript_path"), configured_minutes)
 
-        # 创建定时任务
-        job_id = f"probe_{task_id}"
-
-        # 移除已存在的任务
-        if self.scheduler.get_job(job_id):
-            self.scheduler.remove_job(job_id)
+        # 获取检查间隔；自适应调整过的间隔在重启后继续沿用
+        interval_minutes = self._probe_base_interval(task_id, configured_minutes)
+        if get_settings_section("scheduler").get("adaptive_probe_interval", False):
+            interval_minutes = config.get("state", {}).get("adaptive_interval_minutes") or interval_minutes
 
-        # 添加新任务
-        self.scheduler.add_job(
-            self._execute_probe_check,
-            trigger=IntervalTrigger(minutes=interval_minutes),
-            id=job_id,
-            args=[task_id],
-            name=f"Probe 检查: {task_id}",
-            replace_existing=True
-        )
+        # 创建定时任务
+        self._schedule_task("probe", task_id, self._interval_trigger(interval_minutes))
 
         logger.info(f"已添加 Probe 监控任务: {task_id}, 间隔: {interval_minutes} 分钟")
 
@@ -168,35 +718,136 @@ class ArchonScheduler:
                 raise ValueError(f"任务配置不存在: {task_id}")
 
         # 获取调度配置
-        schedule = config.get("schedule", {})
-        cron_expression = schedule.get("cron_expression")
-        interval_minutes = schedule.get("check_interval_minutes", 60)
+        schedule = resolve_cron_schedule(config)
+        validate_cron_schedule(schedule)
+
+        # 根据调度类型创建触发器
+        if schedule.kind == CronScheduleKind.AT:
+            # 一次性任务：不错峰；错过时间（如服务停机）后仍执行，执行后任务完成
+            run_date = datetime.fromtimestamp(schedule.at_ms / 1000, tz=timezone.utc)
+            self._schedule_job(
+                f"cron_{task_id}", run_cron_once, DateTrigger(run_date=run_date),
+                task_id, _job_name("cron", task_id), misfire_grace_time=None
+            )
+            logger.info(f"已添加 Cron 任务: {task_id}, 执行时间: {run_date.isoformat()}")
+        elif schedule.kind == CronScheduleKind.EVERY and schedule.anchor_ms is not None:
+            # 锚定间隔：在 anchor_ms + k * every_ms 时刻运行，按墙上时间对齐，不错峰
+            trigger = anchored_interval_trigger(schedule.every_ms, schedule.anchor_ms)
+            self._schedule_task("cron", task_id, trigger, jitter="none")
+            logger.info(f"已添加 Cron 任务: {task_id}, 间隔: {schedule.every_ms} 毫秒, 锚点: {schedule.anchor_ms}")
+        elif schedule.kind == CronScheduleKind.EVERY:
+            # 使用间隔触发
+            interval_minutes = schedule.every_ms / 60000
+            self._schedule_task("cron", task_id, self._interval_trigger(interval_minutes))
+            logger.info(f"已添加 Cron 任务: {task_id}, 间隔: {interval_minutes:g} 分钟")
+        else:
+            # 使用 Cron 表达式，时区为空时使用本地时区
+            trigger = CronTrigger.from_crontab(schedule.expr, timezone=schedule.tz)
+            self._schedule_task("cron", task_id, trigger)
+            logger.info(f"已添加 Cron 任务: {task_id}, 表达式: {schedule.expr}, 时区: {trigger.timezone}")
 
-        job_id = f"cron_{task_id}"
+    # ============ transcript 监听 ============
 
-        # 移除已存在的任务
-        if self.scheduler.get_job(job_id):
-            self.scheduler.remove_job(job_id)
+    def _watch_transcript(self, task_id: str, transcript_path: Optional[str], interval_minutes: float) -> bool:
+        """
+        监听 Probe 的 transcript 文件（路径未知或没有可用后端时返回 False）
 
-        # 根据配置创建触发器
-        if cron_expression:
-            # 使用 Cron 表达式
-            trigger = CronTrigger.from_crontab(cron_expression)
-            logger.info(f"已添加 Cron 任务: {task_id}, 表达式: {cron_expression}")
-        else:
-            # 使用间隔触发
-            trigger = IntervalTrigger(minutes=interval_minutes)
-            logger.info(f"已添加 Cron 任务: {task_id}, 间隔: {interval_minutes} 分钟")
+        文件变化触发的检查之间至少间隔任务配置的检查间隔（interval_minutes），
+        持续写入的 transcript 不会被连续检查
+        """
+        if not self.watcher or not transcript_path:
+            return False
+        return self.watcher.watch(task_id, transcript_path, min_interval_seconds=interval_minutes * 60)
 
-        # 添加任务
-        self.scheduler.add_job(
-            self._execute_cron_task,
-            trigger=trigger,
-            id=job_id,
-            args=[task_id],
-            name=f"Cron 任务: {task_id}",
-            replace_existing=True
-        )
+    def _probe_base_interval(self, task_id: str, configured: float) -> float:
+        """
+        Probe 的基础检查间隔
+
+        transcript 处于监听状态时定时检查只作兜底，间隔放宽到 watcher.poll_interval_minutes
+        """
+        if self.watcher and self.watcher.is_watching(task_id):
+            poll_minutes = get_settings_section("watcher").get("poll_interval_minutes", 30)
+            return max(configured, poll_minutes)
+        return configured
+
+    async def _on_transcript_change(self, task_id: str) -> None:
+        """transcript 有新内容写入"""
+        await self._execute_probe_check(task_id, source="transcript")
+
+    def get_watcher_stats(self) -> Dict[str, Any]:
+        """transcript 监听统计"""
+        if self.watcher is None:
+            return {}
+        return self.watcher.stats()
+
+    # ============ 错峰调度 ============
+
+    def _jitter_mode(self) -> str:
+        """当前错峰模式（scheduler.jitter）"""
+        jitter = get_settings_section("scheduler").get("jitter", "none")
+        if jitter not in JITTER_MODES:
+            logger.warning(f"未知的错峰模式 {jitter}，不错峰")
+            return "none"
+        return jitter
+
+    def _interval_trigger(self, minutes: float) -> IntervalTrigger:
+        """间隔触发器；错峰时以固定起点对齐，相位由偏移决定"""
+        if self._jitter_mode() == "none":
+            return IntervalTrigger(minutes=minutes)
+        return IntervalTrigger(minutes=minutes, start_date=_PHASE_EPOCH)
+
+    @staticmethod
+    def _jitter_period(trigger: BaseTrigger) -> float:
+        """错峰范围（秒）：间隔任务为整个间隔，其余为 scheduler.cron_jitter_seconds"""
+        if isinstance(trigger, IntervalTrigger):
+            return trigger.interval.total_seconds()
+        return float(get_settings_section("scheduler").get("cron_jitter_seconds", 60))
+
+    def _schedule_task(
+        self,
+        mode: str,
+        task_id: str,
+        trigger: BaseTrigger,
+        jitter: Optional[str] = None
+    ) -> None:
+        """按错峰模式添加任务的调度（jitter 为空时使用 scheduler.jitter）"""
+        jitter = jitter or self._jitter_mode()
+        if jitter == "spread":
+            if self._pending_spread is not None:
+                group = self._pending_spread.setdefault((mode, str(trigger)), (trigger, set()))
+                group[1].add(task_id)
+            else:
+                self._spread_jobs(mode, trigger, include=(task_id,))
+            return
+
+        if jitter == "hash":
+            offset = round(task_phase(task_id) * self._jitter_period(trigger), 3)
+            trigger = OffsetTrigger(trigger, offset)
+        self._schedule_job(f"{mode}_{task_id}", _JOB_FUNCS[mode], trigger, task_id, _job_name(mode, task_id))
+
+    def _spread_jobs(self, mode: str, trigger: BaseTrigger, include: Iterable[str] = ()) -> None:
+        """
+        把同一模式下触发规则相同的任务在错峰范围内均匀排开
+
+        新任务加入或任务移除后重新分配，已有任务的偏移可能随之改变
+        """
+        key = _trigger_key(trigger)
+        prefix = f"{mode}_"
+        peers = set(include)
+        for job in self.scheduler.get_jobs():
+            if not job.id.startswith(prefix) or isinstance(job.trigger, AnchoredTrigger):
+                continue
+            if _trigger_key(_base_trigger(job.trigger)) == key:
+                peers.add(job.args[0])
+
+        ordered = sorted(peers)
+        period = self._jitter_period(trigger)
+        for index, peer in enumerate(ordered):
+            offset = round(period * index / len(ordered), 3)
+            self._schedule_job(
+                f"{prefix}{peer}", _JOB_FUNCS[mode], OffsetTrigger(trigger, offset),
+                peer, _job_name(mode, peer)
+            )
 
     async def remove_task(self, task_id: str, mode: str):
         """
@@ -211,10 +862,22 @@ class ArchonScheduler:
 
         job_id = f"{mode}_{task_id}"
 
-        if self.scheduler.get_job(job_id):
+        if self.watcher and mode == "probe":
+            self.watcher.unwatch(task_id)
+
+        job = self.scheduler.get_job(job_id)
+        if job:
             self.scheduler.remove_job(job_id)
             logger.info(f"已移除任务: {job_id}")
 
+            spread = isinstance(job.trigger, OffsetTrigger) and not isinstance(job.trigger, AnchoredTrigger)
+            if spread and self._jitter_mode() == "spread":
+                # 其余同周期任务重新均匀排开
+                self._spread_jobs(mode, job.trigger.trigger)
+
+        if self.scheduler.get_job(f"catchup_{job_id}"):
+            self.scheduler.remove_job(f"catchup_{job_id}")
+
     async def pause_task(self, task_id: str, mode: str):
         """暂停任务"""
         if not self.scheduler:
@@ -222,6 +885,9 @@ class ArchonScheduler:
 
         job_id = f"{mode}_{task_id}"
 
+        if self.watcher and mode == "probe":
+            self.watcher.unwatch(task_id)
+
         if self.scheduler.get_job(job_id):
             self.scheduler.pause_job(job_id)
             logger.info(f"已暂停任务: {job_id}")
@@ -236,6 +902,17 @@ class ArchonScheduler:
         if self.scheduler.get_job(job_id):
             self.scheduler.resume_job(job_id)
             logger.info(f"已恢复任务: {job_id}")
+            if mode == "probe":
+                config = load_task_model(task_id)
+                if config:
+                    self._watch_transcript(
+                        task_id, config.probe.transcript_path, config.schedule.check_interval_minutes
+                    )
+        elif mode == "probe":
+            # 调度任务不存在（如使用 memory 任务存储时服务重启过），按配置重新添加
+            await self.add_probe_task(task_id)
+        elif mode == "cron":
+            await self.add_cron_task(task_id)
 
     async def trigger_task(self, task_id: str, mode: str):
         """立即触发任务"""
@@ -244,10 +921,19 @@ class ArchonScheduler:
         elif mode == "cron":
             await self._execute_cron_task(task_id)
 
-    async def _execute_probe_check(self, task_id: str):
-        """执行 Probe 检查"""
+    async def _execute_probe_check(self, task_id: str, source: str = "schedule"):
+        """
+        执行 Probe 检查
+
+        Args:
+            task_id: 任务 ID
+            source: 触发来源 (schedule: 定时/手动, transcript: 文件变化)
+        """
         logger.info(f"执行 Probe 检查: {task_id}")
-        append_log(task_id, "ACTION", "触发定时检查")
+        if source == "transcript":
+            append_log(task_id, "ACTION", "transcript 有更新，触发检查", event="check_triggered", source=source)
+        else:
+            append_log(task_id, "ACTION", "触发定时检查", event="check_triggered")
 
         # 检查任务状态
         status = get_task_status(task_id)
@@ -257,16 +943,83 @@ class ArchonScheduler:
 
         # 调用回调函数
         if self._probe_callback:
+            if self.watcher:
+                self.watcher.note_check(task_id)
+            corrections = self._correction_count(task_id)
             try:
-                await self._probe_callback(task_id)
+                async with self.concurrency_slot(task_id, "probe"):
+                    result = await self._probe_callback(task_id)
             except Exception as e:
                 logger.error(f"Probe 检查失败 [{task_id}]: {e}")
-                append_log(task_id, "ERROR", f"检查失败: {e}")
+                append_log(task_id, "ERROR", f"检查失败: {e}", event="check_failed", error=str(e))
+                return
+
+            if self.watcher and self._correction_count(task_id) > corrections:
+                # 注入的纠偏指令会写入 transcript，这些变化不触发检查，由定时检查跟进
+                config = load_task_model(task_id)
+                if config:
+                    self.watcher.ignore_writes(task_id, config.schedule.check_interval_minutes * 60)
+
+            if isinstance(result, AnalysisResult):
+                self._adapt_probe_interval(task_id, result)
+
+    @staticmethod
+    def _correction_count(task_id: str) -> int:
+        """已执行的纠偏次数"""
+        config = load_task_model(task_id)
+        return config.correction.current_count if config else 0
+
+    def _adapt_probe_interval(self, task_id: str, result: AnalysisResult) -> None:
+        """
+        按检查结果调整 Probe 检查间隔，原地重新调度
+
+        首次检查才找到 transcript 路径时在这里开始监听，基础间隔随之放宽
+        """
+        if not self.scheduler or get_task_status(task_id) != "active":
+            return
+
+        config = load_task_model(task_id)
+        job = self.scheduler.get_job(f"probe_{task_id}")
+        if config is None or job is None:
+            return
+
+        self._watch_transcript(task_id, config.probe.transcript_path, config.schedule.check_interval_minutes)
+        base = self._probe_base_interval(task_id, config.schedule.check_interval_minutes)
+
+        trigger = _base_trigger(job.trigger)
+        if not isinstance(trigger, IntervalTrigger):
+            return
+        current = trigger.interval.total_seconds() / 60
+
+        settings = get_settings_section("scheduler")
+        if settings.get("adaptive_probe_interval", False):
+            interval = next_probe_interval(base, current, result, settings)
+        else:
+            interval = base
+        if interval is None or interval == current:
+            return
+
+        try:
+            # spread 模式下按需重排全部同周期任务代价较高，偏离配置间隔时改用 hash 相位
+            jitter = "hash" if interval != base and self._jitter_mode() == "spread" else None
+            self._schedule_task("probe", task_id, self._interval_trigger(interval), jitter=jitter)
+            patch_task_config(task_id, {
+                "state.adaptive_interval_minutes": None if interval == base else interval
+            })
+        except Exception as e:
+            logger.error(f"调整检查间隔失败 [{task_id}]: {e}")
+            return
+
+        append_log(
+            task_id, "DECISION", f"检查间隔调整为 {interval:g} 分钟 (结果: {result.status})",
+            event="interval_adjusted", interval_minutes=interval, previous_minutes=current,
+            status=result.status
+        )
 
     async def _execute_cron_task(self, task_id: str):
         """执行 Cron 任务"""
         logger.info(f"执行 Cron 任务: {task_id}")
-        append_log(task_id, "ACTION", "触发定时执行")
+        append_log(task_id, "ACTION", "触发定时执行", event="run_triggered")
 
         # 检查任务状态
         status = get_task_status(task_id)
@@ -277,10 +1030,28 @@ class ArchonScheduler:
         # 调用回调函数
         if self._cron_callback:
             try:
-                await self._cron_callback(task_id)
+                async with self.concurrency_slot(task_id, "cron"):
+                    await self._cron_callback(task_id)
             except Exception as e:
                 logger.error(f"Cron 任务执行失败 [{task_id}]: {e}")
-                append_log(task_id, "ERROR", f"执行失败: {e}")
+                append_log(task_id, "ERROR", f"执行失败: {e}", event="run_failed", error=str(e))
+
+    def concurrency_slot(self, task_id: str, mode: str, timeout: Optional[float] = None):
+        """
+        按任务所属项目和模式申请执行额度（调度执行与手动执行共用）
+
+        Args:
+            timeout: 最长排队秒数，超时抛出 ConcurrencyLimitError；为空时一直等待
+        """
+        if self.governor is None:
+            self.governor = ConcurrencyGovernor.from_settings(get_settings_section("concurrency"))
+        return self.governor.slot(task_id, task_project(task_id), mode, timeout)
+
+    def get_concurrency_stats(self) -> Dict[str, Any]:
+        """并发与排队统计"""
+        if self.governor is None:
+            return {}
+        return self.governor.stats()
 
     def get_job_info(self, task_id: str, mode: str) -> Optional[Dict[str, Any]]:
         """获取任务信息"""
@@ -317,6 +1088,46 @@ class ArchonScheduler:
         return jobs
 
 
+# ============ 调度任务函数 ============
+#
+# 持久化的任务存储按 "模块:函数名" 保存任务函数，不能使用绑定方法
+
+async def run_probe_check(task_id: str) -> None:
+    """定时 Probe 检查"""
+    await get_scheduler()._execute_probe_check(task_id)
+
+
+async def run_cron_task(task_id: str) -> None:
+    """定时 Cron 执行"""
+    await get_scheduler()._execute_cron_task(task_id)
+
+
+async def run_cron_once(task_id: str) -> None:
+    """一次性 Cron 执行（at 调度），执行后任务完成"""
+    await get_scheduler()._execute_cron_task(task_id)
+
+    if get_task_status(task_id) == "active":
+        set_task_status(task_id, "completed")
+        append_log(task_id, "ACTION", "一次性任务已执行，任务完成", event="task_completed", status="completed")
+
+
+async def run_catch_up(mode: str, task_id: str, runs: int) -> None:
+    """补执行停机期间错过的运行"""
+    for _ in range(runs):
+        await get_scheduler().trigger_task(task_id, mode)
+
+
+_JOB_FUNCS = {
+    "probe": run_probe_check,
+    "cron": run_cron_task,
+}
+
+
+def _job_name(mode: str, task_id: str) -> str:
+    """调度任务显示名称"""
+    return f"Probe 检查: {task_id}" if mode == "probe" else f"Cron 任务: {task_id}"
+
+
 # 全局调度器实例
 _scheduler: Optional[ArchonScheduler] = None
 
@@ -0,0 +1,88 @@
+"""
+daemon-archon 任务配置序列化
+
+setting.json 中 storage.serializer 决定 config.json 的写入格式：
+
+- json：带缩进的 JSON，便于人工查看（默认）
+- compact：紧凑 JSON，安装了 orjson 时用 orjson 编解码
+- msgpack：MessagePack 二进制，需要安装 msgpack，文件以 MSGPACK_MAGIC 开头
+
+读取时按文件开头自动识别格式，切换设置后旧文件仍可读取，下次保存时转换为新格式。
+"""
+
+import json
+import logging
+from functools import lru_cache
+from typing import Any, Dict, Callable, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+# msgpack 文件的格式标记（JSON 文件不会以 NUL 开头）
+MSGPACK_MAGIC = b"\x00ARCHON-MSGPACK\x01"
+
+SERIALIZERS = ("json", "compact", "msgpack")
+
+
+def _dumps_pretty(data: Any) -> bytes:
+    """带缩进的 JSON"""
+    return json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+
+
+def _dumps_compact(data: Any) -> bytes:
+    """紧凑 JSON"""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _dumps_msgpack(data: Any) -> bytes:
+    """MessagePack 加格式标记"""
+    return MSGPACK_MAGIC + msgpack.packb(data, use_bin_type=True)
+
+
+_ENCODERS: Dict[str, Callable[[Any], bytes]] = {
+    "json": _dumps_pretty,
+    "compact": _dumps_compact,
+    "msgpack": _dumps_msgpack,
+}
+
+
+def available_serializers() -> Tuple[str, ...]:
+    """当前环境可用的序列化格式"""
+    return tuple(name for name in SERIALIZERS if name != "msgpack" or msgpack is not None)
+
+
+@lru_cache(maxsize=None)
+def resolve_serializer(name: str) -> str:
+    """规范化格式名，未知或依赖缺失时退回 json"""
+    if name not in available_serializers():
+        logger.warning(f"序列化格式 {name} 不可用，使用 json")
+        return "json"
+    return name
+
+
+def encode_config(data: Any, serializer: str = "json") -> bytes:
+    """按指定格式编码"""
+    return _ENCODERS[serializer](data)
+
+
+def decode_config(raw: bytes) -> Any:
+    """按文件开头识别格式并解码"""
+    if raw.startswith(MSGPACK_MAGIC):
+        if msgpack is None:
+            raise ValueError("配置为 msgpack 格式，但未安装 msgpack")
+        return msgpack.unpackb(raw[len(MSGPACK_MAGIC):], raw=False)
+
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw.decode('utf-8'))
@@ -0,0 +1,663 @@
+"""
+daemon-archon SQLite 存储引擎
+
+把任务配置、状态、日志和纠偏记录保存在单个 WAL 模式的 SQLite 数据库中，
+对外提供与 state_store 相同签名的读写方法。
+
+destination.md / task.md / workflow 等供人阅读编辑的文档仍保存在任务目录中。
+
+启用方式：在 setting.json 中设置 storage.engine = "sqlite"，
+已有数据可通过迁移命令一次性导入：
+
+    python -m server.sqlite_store migrate [--db PATH] [--activate]
+"""
+
+import re
+import json
+import time
+import sqlite3
+import logging
+import argparse
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, List, Dict, Any
+
+from .state_store import (
+    get_base_dir, render_corrections, load_global_settings,
+    save_global_settings, apply_config_patch, get_settings_section,
+    max_correction_index, read_task_config_file, replay_config_journal,
+    load_correction_records
+)
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id TEXT PRIMARY KEY,
+    mode TEXT,
+    status TEXT,
+    name TEXT,
+    created_at TEXT,
+    next_run TEXT,
+    config TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_mode_status ON tasks (mode, status);
+
+CREATE TABLE IF NOT EXISTS task_status (
+    task_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    task_id TEXT NOT NULL,
+    ts TEXT NOT NULL,
+    level TEXT NOT NULL,
+    message TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_logs_task ON logs (task_id, id);
+
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    task_id TEXT NOT NULL,
+    ts_ms INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_events_task_ts ON events (task_id, ts_ms);
+CREATE INDEX IF NOT EXISTS idx_events_task_type ON events (task_id, type, ts_ms);
+
+CREATE TABLE IF NOT EXISTS corrections (
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    record TEXT NOT NULL,
+    PRIMARY KEY (task_id, idx)
+);
+
+CREATE TABLE IF NOT EXISTS correction_docs (
+    task_id TEXT PRIMARY KEY,
+    content TEXT NOT NULL,
+    last_index INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+# archon.log 行格式: [2026-02-01 14:30:00] [LEVEL] message
+LOG_LINE_PATTERN = re.compile(r'^\[(.+?)\] \[(\w+)\] (.*)$')
+
+# 日志按行数裁剪：以平均每行约 100 字节估算 logging.max_log_size_mb 对应的行数
+LOG_ROWS_PER_MB = 10000
+
+# 每个任务每写入多少条日志检查一次是否需要裁剪
+LOG_PRUNE_EVERY = 256
+
+
+def _dumps(data: Any) -> str:
+    """紧凑 JSON 编码"""
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+
+def _index_columns(config: Dict[str, Any]) -> tuple:
+    """提取 tasks 表的索引列"""
+    schedule = config.get("schedule") or {}
+    return (
+        config.get("mode"),
+        (config.get("state") or {}).get("status"),
+        config.get("name", ""),
+        config.get("created_at", ""),
+        schedule.get("next_run") or schedule.get("next_check"),
+    )
+
+
+class SqliteStateStore:
+    """SQLite 存储引擎"""
+
+    def __init__(self, db_path: Path):
+        """
+        初始化存储引擎
+
+        Args:
+            db_path: 数据库文件路径
+        """
+        self.db_path = db_path
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+        self._log_writes: Dict[str, int] = {}
+
+    # ============ 连接与事务 ============
+
+    def _conn(self) -> sqlite3.Connection:
+        """获取当前线程的连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # storage.durability 为 fsync 时每次提交都落盘，否则 WAL 模式下由检查点落盘
+            durability = get_settings_section("storage").get("durability", "none")
+            conn.execute(f"PRAGMA synchronous={'FULL' if durability == 'fsync' else 'NORMAL'}")
+            self._local.conn = conn
+            self._ensure_schema(conn)
+        return conn
+
+    def _ensure_schema(self, conn: sqlite3.Connection) -> None:
+        """建表（每个进程执行一次）"""
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            conn.executescript(SCHEMA)
+            conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+            self._schema_ready = True
+
+    @contextmanager
+    def _transaction(self):
+        """写事务（BEGIN IMMEDIATE，避免读后写升级锁时死锁）"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def close(self) -> None:
+        """关闭当前线程的连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    # ============ 任务配置 ============
+
+    def load_task_config(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """加载任务配置"""
+        try:
+            row = self._conn().execute(
+                "SELECT config FROM tasks WHERE task_id = ?", (task_id,)
+            ).fetchone()
+        except Exception as e:
+            logger.error(f"加载任务配置失败 [{task_id}]: {e}")
+            return None
+
+        return json.loads(row[0]) if row else None
+
+    def _write_config(self, conn: sqlite3.Connection, task_id: str, config: Dict[str, Any]) -> None:
+        """在事务内写入配置及索引列"""
+        conn.execute(
+            "INSERT OR REPLACE INTO tasks "
+            "(task_id, mode, status, name, created_at, next_run, config, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (task_id, *_index_columns(config), _dumps(config), time.time())
+        )
+
+    def save_task_config(self, task_id: str, config: Dict[str, Any]) -> bool:
+        """保存任务配置"""
+        try:
+            with self._transaction() as conn:
+                self._write_config(conn, task_id, config)
+            return True
+        except Exception as e:
+            logger.error(f"保存任务配置失败 [{task_id}]: {e}")
+            return False
+
+    def patch_task_config(
+        self,
+        task_id: str,
+        updates: Dict[str, Any],
+        increments: Dict[str, Any]
+    ) -> bool:
+        """字段级更新任务配置（在写事务内读改写，并发写入不会互相覆盖）"""
+        try:
+            with self._transaction() as conn:
+                row = conn.execute(
+                    "SELECT config FROM tasks WHERE task_id = ?", (task_id,)
+                ).fetchone()
+                if not row:
+                    logger.error(f"更新任务配置失败 [{task_id}]: 配置不存在")
+                    return False
+                config = apply_config_patch(json.loads(row[0]), updates, increments)
+                self._write_config(conn, task_id, config)
+            return True
+        except Exception as e:
+            logger.error(f"更新任务配置失败 [{task_id}]: {e}")
+            return False
+
+    def delete_task(self, task_id: str) -> bool:
+        """删除任务的全部记录"""
+        try:
+            with self._transaction() as conn:
+                for table in ("tasks", "task_status", "logs", "events", "corrections", "correction_docs"):
+                    conn.execute(f"DELETE FROM {table} WHERE task_id = ?", (task_id,))
+            return True
+        except Exception as e:
+            logger.error(f"删除任务配置失败 [{task_id}]: {e}")
+            return False
+
+    # ============ 任务状态 ============
+
+    def get_task_status(self, task_id: str) -> Optional[str]:
+        """获取任务状态"""
+        try:
+            row = self._conn().execute(
+                "SELECT status FROM task_status WHERE task_id = ?", (task_id,)
+            ).fetchone()
+        except Exception as e:
+            logger.error(f"读取任务状态失败 [{task_id}]: {e}")
+            return None
+
+        return row[0] if row else None
+
+    def set_task_status(self, task_id: str, status: str) -> bool:
+        """设置任务状态，并在同一事务中同步 config 的 state.status"""
+        try:
+            with self._transaction() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO task_status (task_id, status) VALUES (?, ?)",
+                    (task_id, status)
+                )
+                row = conn.execute(
+                    "SELECT config FROM tasks WHERE task_id = ?", (task_id,)
+                ).fetchone()
+                if row:
+                    config = json.loads(row[0])
+                    config.setdefault("state", {})["status"] = status
+                    self._write_config(conn, task_id, config)
+            return True
+        except Exception as e:
+            logger.error(f"设置任务状态失败 [{task_id}]: {e}")
+            return False
+
+    # ============ 任务列表 ============
+
+    @staticmethod
+    def _filter_clause(mode: Optional[str], status: Optional[str]) -> tuple:
+        """构造 mode/status 过滤条件"""
+        conditions = []
+        params: List[Any] = []
+        if mode is not None:
+            conditions.append("mode = ?")
+            params.append(mode)
+        if status is not None:
+            conditions.append("status = ?")
+            params.append(status)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        return where, params
+
+    def list_task_summaries(
+        self,
+        mode: Optional[str] = None,
+        status: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """列出任务摘要，按创建时间倒序"""
+        where, params = self._filter_clause(mode, status)
+        rows = self._conn().execute(
+            "SELECT task_id, mode, status, name, created_at, next_run, updated_at "
+            f"FROM tasks{where} ORDER BY created_at DESC",
+            params
+        ).fetchall()
+
+        return [
+            {
+                "task_id": row[0],
+                "mode": row[1],
+                "status": row[2],
+                "name": row[3],
+                "created_at": row[4],
+                "next_run": row[5],
+                "mtime": int(row[6] * 1e9),
+            }
+            for row in rows
+        ]
+
+    def list_task_configs(
+        self,
+        mode: Optional[str] = None,
+        status: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """列出任务配置，按创建时间倒序"""
+        where, params = self._filter_clause(mode, status)
+        rows = self._conn().execute(
+            f"SELECT config FROM tasks{where} ORDER BY created_at DESC", params
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def count_tasks(self, mode: Optional[str] = None, status: Optional[str] = None) -> int:
+        """统计任务数量"""
+        where, params = self._filter_clause(mode, status)
+        return self._conn().execute(f"SELECT COUNT(*) FROM tasks{where}", params).fetchone()[0]
+
+    # ============ 日志 ============
+
+    def append_log_entries(self, task_id: str, entries: List[tuple]) -> bool:
+        """
+        在一个事务中写入一批日志及对应事件
+
+        Args:
+            entries: [(时间戳, 级别, 消息, 事件)]
+        """
+        try:
+            with self._transaction() as conn:
+                conn.executemany(
+                    "INSERT INTO logs (task_id, ts, level, message) VALUES (?, ?, ?, ?)",
+                    [(task_id, ts, level, message) for ts, level, message, _ in entries]
+                )
+                self._insert_events(conn, task_id, [entry[3] for entry in entries])
+            self._maybe_prune_logs(task_id, len(entries))
+            return True
+        except Exception as e:
+            logger.error(f"写入日志失败 [{task_id}]: {e}")
+            return False
+
+    @staticmethod
+    def _insert_events(conn: sqlite3.Connection, task_id: str, events: List[Dict[str, Any]]) -> None:
+        """写入事件"""
+        conn.executemany(
+            "INSERT INTO events (task_id, ts_ms, type, data) VALUES (?, ?, ?, ?)",
+            [(task_id, event["ts_ms"], event["type"], _dumps(event)) for event in events]
+        )
+
+    def _maybe_prune_logs(self, task_id: str, written: int) -> None:
+        """
+        按 logging.max_log_size_mb × max_log_files 估算的行数上限裁剪旧日志
+
+        对应目录存储下的日志轮转
+        """
+        count = self._log_writes.get(task_id, 0) + written
+        if count < LOG_PRUNE_EVERY:
+            self._log_writes[task_id] = count
+            return
+        self._log_writes[task_id] = 0
+
+        logging_settings = get_settings_section("logging")
+        max_rows = int(
+            float(logging_settings.get("max_log_size_mb", 10))
+            * max(1, int(logging_settings.get("max_log_files", 5)))
+            * LOG_ROWS_PER_MB
+        )
+        for table in ("logs", "events"):
+            self._conn().execute(
+                f"DELETE FROM {table} WHERE task_id = ? AND id <= ("
+                f"SELECT id FROM {table} WHERE task_id = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                (task_id, task_id, max_rows)
+            )
+
+    def read_log(self, task_id: str, lines: int = 100) -> List[str]:
+        """读取最近的日志，格式与 archon.log 的行一致"""
+        try:
+            rows = self._conn().execute(
+                "SELECT ts, level, message FROM logs WHERE task_id = ? "
+                "ORDER BY id DESC LIMIT ?",
+                (task_id, lines)
+            ).fetchall()
+        except Exception as e:
+            logger.error(f"读取日志失败 [{task_id}]: {e}")
+            return []
+
+        return [f"[{ts}] [{level}] {message}\n" for ts, level, message in reversed(rows)]
+
+    def query_events(
+        self,
+        task_id: str,
+        since_ms: Optional[int] = None,
+        event_type: Optional[str] = None,
+        limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        """查询结构化事件，语义与 state_store.query_events 一致"""
+        where = "task_id = ?"
+        params: List[Any] = [task_id]
+        if event_type:
+            where += " AND type = ?"
+            params.append(event_type)
+
+        try:
+            if since_ms is None:
+                rows = self._conn().execute(
+                    f"SELECT data FROM events WHERE {where} ORDER BY id DESC LIMIT ?",
+                    params + [limit]
+                ).fetchall()
+                rows.reverse()
+            else:
+                rows = self._conn().execute(
+                    f"SELECT data FROM events WHERE {where} AND ts_ms >= ? "
+                    f"ORDER BY ts_ms, id LIMIT ?",
+                    params + [since_ms, limit]
+                ).fetchall()
+        except Exception as e:
+            logger.error(f"查询事件失败 [{task_id}]: {e}")
+            return []
+
+        return [json.loads(row[0]) for row in rows]
+
+    # ============ 纠偏历史 ============
+
+    def load_corrections(self, task_id: str) -> str:
+        """加载纠偏历史（由结构化记录渲染）"""
+        try:
+            conn = self._conn()
+            rows = conn.execute(
+                "SELECT record FROM corrections WHERE task_id = ? ORDER BY idx", (task_id,)
+            ).fetchall()
+            doc = conn.execute(
+                "SELECT content FROM correction_docs WHERE task_id = ?", (task_id,)
+            ).fetchone()
+        except Exception as e:
+            logger.error(f"读取纠偏历史失败 [{task_id}]: {e}")
+            return ""
+
+        records = [json.loads(row[0]) for row in rows]
+        return render_corrections(records, doc[0] if doc else "")
+
+    def save_corrections(self, task_id: str, content: str) -> bool:
+        """保存纠偏历史（整体替换为给定的 markdown 文本）"""
+        try:
+            with self._transaction() as conn:
+                conn.execute("DELETE FROM corrections WHERE task_id = ?", (task_id,))
+                conn.execute(
+                    "INSERT OR REPLACE INTO correction_docs (task_id, content, last_index) "
+                    "VALUES (?, ?, ?)",
+                    (task_id, content, max_correction_index(content))
+                )
+            return True
+        except Exception as e:
+            logger.error(f"保存纠偏历史失败 [{task_id}]: {e}")
+            return False
+
+    def append_correction(self, task_id: str, record: Dict[str, Any]) -> bool:
+        """追加纠偏记录"""
+        try:
+            with self._transaction() as conn:
+                row = conn.execute(
+                    "SELECT MAX(idx) FROM corrections WHERE task_id = ?", (task_id,)
+                ).fetchone()
+                doc = conn.execute(
+                    "SELECT last_index FROM correction_docs WHERE task_id = ?", (task_id,)
+                ).fetchone()
+                index = max(row[0] or 0, doc[0] if doc else 0) + 1
+
+                record = dict(record, index=index)
+                record.setdefault("timestamp", datetime.now().strftime("%Y-%m-%d %H:%M"))
+                conn.execute(
+                    "INSERT INTO corrections (task_id, idx, record) VALUES (?, ?, ?)",
+                    (task_id, index, _dumps(record))
+                )
+            return True
+        except Exception as e:
+            logger.error(f"追加纠偏记录失败 [{task_id}]: {e}")
+            return False
+
+
+# ============ 迁移 ============
+
+def _parse_log_lines(content: str) -> List[tuple]:
+    """解析 archon.log，多行消息合并到上一条"""
+    entries: List[list] = []
+    for line in content.splitlines():
+        match = LOG_LINE_PATTERN.match(line)
+        if match:
+            entries.append([match.group(1), match.group(2), match.group(3)])
+        elif entries:
+            entries[-1][2] += "\n" + line
+
+    return [tuple(e) for e in entries]
+
+
+def _rotated_files(task_dir: Path, name: str) -> List[Path]:
+    """当前文件及其轮转文件（name.1、name.2 ...），从旧到新"""
+    rotated = {}
+    for path in task_dir.glob(f"{name}.*"):
+        suffix = path.name[len(name) + 1:]
+        if suffix.isdigit():
+            rotated[int(suffix)] = path
+
+    files = [rotated[i] for i in sorted(rotated, reverse=True)]
+    current = task_dir / name
+    if current.exists():
+        files.append(current)
+    return files
+
+
+def _parse_event_lines(content: str) -> List[Dict[str, Any]]:
+    """解析 events.jsonl，跳过不完整的行"""
+    events = []
+    for line in content.splitlines():
+        try:
+            event = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(event, dict) and "ts_ms" in event and "type" in event:
+            events.append(event)
+    return events
+
+
+def migrate_directory_layout(store: SqliteStateStore, base_dir: Optional[Path] = None) -> Dict[str, int]:
+    """
+    把目录存储的任务导入 SQLite
+
+    可重复执行：同一任务的配置、状态、日志和纠偏记录会被整体替换。
+    原目录中的文件保持不变。
+
+    Args:
+        store: 目标存储引擎
+        base_dir: 工作目录（默认 ~/.claude/daemon-archon）
+
+    Returns:
+        迁移统计 {tasks, logs, corrections}
+    """
+    stats = {"tasks": 0, "logs": 0, "corrections": 0}
+    base_dir = base_dir or get_base_dir()
+    if not base_dir.exists():
+        return stats
+
+    for task_dir in sorted(base_dir.iterdir()):
+        if not task_dir.is_dir() or task_dir.name.startswith('.'):
+            continue
+
+        task_id = task_dir.name
+
+        config_file = task_dir / "config.json"
+        if not config_file.exists():
+            continue
+
+        try:
+            config = read_task_config_file(config_file)
+            journal_file = task_dir / "config.journal"
+            if journal_file.exists():
+                replay_config_journal(config, journal_file)
+
+        except Exception as e:
+            logger.error(f"迁移跳过，配置无法解析 [{task_id}]: {e}")
+            continue
+
+        status_file = task_dir / "status"
+        corrections_file = task_dir / "corrections.md"
+        correction_records = load_correction_records(task_dir / "corrections.jsonl")
+
+        log_entries = []
+        for path in _rotated_files(task_dir, "archon.log"):
+            log_entries.extend(_parse_log_lines(path.read_text(encoding='utf-8', errors='replace')))
+
+        events = []
+        for path in _rotated_files(task_dir, "events.jsonl"):
+            events.extend(_parse_event_lines(path.read_text(encoding='utf-8', errors='replace')))
+
+        with store._transaction() as conn:
+            store._write_config(conn, task_id, config)
+
+            if status_file.exists():
+                conn.execute(
+                    "INSERT OR REPLACE INTO task_status (task_id, status) VALUES (?, ?)",
+                    (task_id, status_file.read_text().strip())
+                )
+
+            conn.execute("DELETE FROM logs WHERE task_id = ?", (task_id,))
+            conn.executemany(
+                "INSERT INTO logs (task_id, ts, level, message) VALUES (?, ?, ?, ?)",
+                [(task_id, *entry) for entry in log_entries]
+            )
+
+            conn.execute("DELETE FROM events WHERE task_id = ?", (task_id,))
+            store._insert_events(conn, task_id, events)
+
+            conn.execute("DELETE FROM corrections WHERE task_id = ?", (task_id,))
+            conn.executemany(
+                "INSERT OR REPLACE INTO corrections (task_id, idx, record) VALUES (?, ?, ?)",
+                [(task_id, r["index"], _dumps(r)) for r in correction_records if "index" in r]
+            )
+
+            if corrections_file.exists():
+                content = corrections_file.read_text(encoding='utf-8')
+                conn.execute(
+                    "INSERT OR REPLACE INTO correction_docs (task_id, content, last_index) "
+                    "VALUES (?, ?, ?)",
+                    (task_id, content, max_correction_index(content))
+                )
+
+            if correction_records or corrections_file.exists():
+                stats["corrections"] += 1
+
+        stats["tasks"] += 1
+        stats["logs"] += len(log_entries)
+
+    return stats
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="daemon-archon SQLite 存储工具")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = subparsers.add_parser("migrate", help="从目录存储迁移到 SQLite")
+    migrate_parser.add_argument("--db", help="数据库路径（默认 ~/.claude/daemon-archon/archon.db）")
+    migrate_parser.add_argument(
+        "--activate", action="store_true",
+        help="迁移完成后在 setting.json 中切换到 sqlite 引擎"
+    )
+
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        db_path = Path(args.db).expanduser() if args.db else get_base_dir() / "archon.db"
+        store = SqliteStateStore(db_path)
+        stats = migrate_directory_layout(store)
+        print(f"迁移完成: {stats['tasks']} 个任务, {stats['logs']} 条日志, "
+              f"{stats['corrections']} 份纠偏历史 -> {db_path}")
+
+        if args.activate:
+            settings = load_global_settings()
+            settings["storage"] = dict(
+                settings.get("storage") or {},
+                engine="sqlite",
+                sqlite_path=str(db_path)
+            )
+            save_global_settings(settings)
+            print("已切换到 sqlite 存储引擎，重启服务后生效")
+
+
+if __name__ == "__main__":
+    main()
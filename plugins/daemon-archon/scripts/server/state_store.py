@@ -4,18 +4,34 @@ daemon-archon 状态存储模块
 负责任务配置的持久化存储和读取
 """
 
+import re
 import json
+import bisect
 import os
+import atexit
 import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Set, Tuple
 from dataclasses import asdict
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
 from .types import (
     TaskConfig, ProbeTaskConfig, CronTaskConfig,
-    TaskMode, TaskStatus, GlobalSettings
+    TaskMode, TaskStatus, GlobalSettings,
+    StateModel, task_config_from_dict
 )
+from .log_writer import TaskLogWriter
+from .task_lock import TaskLockManager
+from .durability import DURABILITY_MODES, GroupCommitter, fsync_path
+from .serializers import encode_config, decode_config, resolve_serializer
 
 logger = logging.getLogger(__name__)
 
@@ -44,37 +60,203 @@ def ensure_task_dir(task_id: str) -> Path:
     return task_dir
 
 
+@contextmanager
+def _locked_file(lock_path: Path, exclusive: bool = True):
+    """
+    跨进程文件锁（fcntl.flock）
+
+    不支持 fcntl 的平台上退化为无锁
+    """
+    if fcntl is None:
+        yield
+        return
+
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, 'a') as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+# ============ 写入持久化 ============
+#
+# storage.durability 决定状态文件（配置、增量、状态、纠偏记录、任务文档）写入后
+# 何时 fsync，见 durability 模块。日志和任务索引不受此设置影响。
+
+_group_committer: Optional[GroupCommitter] = None
+
+
+def _durability_mode() -> str:
+    """当前的持久化策略"""
+    mode = get_settings_section("storage").get("durability", "none")
+    return mode if mode in DURABILITY_MODES else "none"
+
+
+def _get_group_committer() -> GroupCommitter:
+    """获取组提交线程单例"""
+    global _group_committer
+    if _group_committer is None:
+        interval_ms = float(get_settings_section("storage").get("group_commit_ms", 50))
+        _group_committer = GroupCommitter(interval_ms / 1000)
+        atexit.register(stop_group_commit)
+    return _group_committer
+
+
+def stop_group_commit() -> None:
+    """提交剩余写入并停止组提交线程"""
+    if _group_committer is not None:
+        _group_committer.stop()
+
+
+def _sync_written(path: Path, f=None, sync_dir: bool = False) -> None:
+    """
+    按持久化策略落盘刚写入的文件
+
+    Args:
+        path: 文件路径
+        f: 仍打开的文件对象，fsync 模式下直接对其 fsync
+        sync_dir: 文件是否为新建（需要同时落盘目录项）
+    """
+    mode = _durability_mode()
+    if mode == "fsync":
+        if f is not None:
+            f.flush()
+            os.fsync(f.fileno())
+        else:
+            fsync_path(path)
+        if sync_dir:
+            fsync_path(path.parent)
+    elif mode == "group":
+        _get_group_committer().add(path, sync_dir)
+
+
+def _sync_dir(directory: Path) -> None:
+    """按持久化策略落盘目录项（删除文件后）"""
+    mode = _durability_mode()
+    if mode == "fsync":
+        fsync_path(directory)
+    elif mode == "group":
+        _get_group_committer().add(directory)
+
+
+def _atomic_write_text(path: Path, content: str) -> None:
+    """写临时文件后改名，按持久化策略落盘"""
+    _atomic_write_bytes(path, content.encode('utf-8'))
+
+
+def _atomic_write_bytes(path: Path, content: bytes) -> None:
+    """写临时文件后改名，按持久化策略落盘"""
+    mode = _durability_mode()
+    temp_file = path.with_name(f"{path.name}.tmp")
+    with open(temp_file, 'wb') as f:
+        f.write(content)
+        if mode == "fsync":
+            # 改名前先落盘，避免断电后改名已生效而内容为空
+            f.flush()
+            os.fsync(f.fileno())
+    temp_file.rename(path)
+
+    if mode == "fsync":
+        fsync_path(path.parent)
+    elif mode == "group":
+        _get_group_committer().add(path, sync_dir=True)
+
+
 # ============ 全局配置 ============
 
+_settings_cache: Optional[Dict[str, Any]] = None
+
+
+def _default_settings() -> Dict[str, Any]:
+    """默认全局配置"""
+    return {
+        "version": "1.0",
+        "notification": {
+            "enabled": True,
+            "method": "system",
+            "webhook_url": None,
+            "slack_webhook": None
+        },
+        "defaults": {
+            "probe_check_interval_minutes": 5,
+            "cron_check_interval_minutes": 60,
+            "max_auto_corrections": 3
+        },
+        "claude_cli": {
+            "path": "claude",
+            "default_model": None
+        },
+        "logging": {
+            "level": "INFO",
+            "max_log_size_mb": 10,
+            "max_log_files": 5,
+            "flush_interval_ms": 500,
+            "flush_batch_size": 256
+        },
+        "storage": {
+            "engine": "json",
+            "sqlite_path": None,
+            "config_cache_size": 256,
+            "durability": "none",
+            "group_commit_ms": 50,
+            "serializer": "json"
+        },
+        "archive": {
+            "enabled": False,
+            "after_days": 30,
+            "interval_minutes": 60,
+            "path": None
+        },
+        "scheduler": {
+            "jobstore": "sqlite",
+            "jobstore_path": None,
+            "catch_up": "run_once",
+            "max_catch_up_runs": 3,
+            "jitter": "none",
+            "cron_jitter_seconds": 60,
+            "adaptive_probe_interval": False,
+            "min_probe_interval_minutes": 1,
+            "max_probe_interval_minutes": 30,
+            "probe_backoff_factor": 2
+        },
+        "concurrency": {
+            "enabled": False,
+            "max_total": 4,
+            "max_per_project": 2,
+            "max_per_mode": {"probe": 4, "cron": 2},
+            "weights": {"probe": 1, "cron": 1},
+            "manual_wait_seconds": 30
+        },
+        "watcher": {
+            "enabled": False,
+            "backend": "auto",
+            "debounce_ms": 2000,
+            "poll_interval_minutes": 30
+        },
+        "workers": {
+            "count": 0,
+            "vnodes": 64,
+            "restart_delay_seconds": 5
+        },
+        "runs": {
+            "keep": 20,
+            "max_output_mb": 20,
+            "tail_kb": 64,
+            "history_keep": 500,
+            "history_path": None
+        }
+    }
+
+
 def load_global_settings() -> Dict[str, Any]:
     """加载全局配置"""
     settings_file = get_base_dir() / "setting.json"
 
     if not settings_file.exists():
         # 返回默认配置
-        return {
-            "version": "1.0",
-            "notification": {
-                "enabled": True,
-                "method": "system",
-                "webhook_url": None,
-                "slack_webhook": None
-            },
-            "defaults": {
-                "probe_check_interval_minutes": 5,
-                "cron_check_interval_minutes": 60,
-                "max_auto_corrections": 3
-            },
-            "claude_cli": {
-                "path": "claude",
-                "default_model": None
-            },
-            "logging": {
-                "level": "INFO",
-                "max_log_size_mb": 10,
-                "max_log_files": 5
-            }
-        }
+        return _default_settings()
 
     try:
         with open(settings_file, 'r', encoding='utf-8') as f:
@@ -90,29 +272,335 @@ def save_global_settings(settings: Dict[str, Any]) -> bool:
     settings_file = get_base_dir() / "setting.json"
 
     try:
-        # 原子写入
-        temp_file = settings_file.with_suffix('.tmp')
-        with open(temp_file, 'w', encoding='utf-8') as f:
-            json.dump(settings, f, indent=2, ensure_ascii=False)
-        temp_file.rename(settings_file)
-        return True
+        _atomic_write_text(settings_file, json.dumps(settings, indent=2, ensure_ascii=False))
     except Exception as e:
         logger.error(f"保存全局配置失败: {e}")
         return False
 
+    global _settings_cache
+    _settings_cache = None
+    return True
+
+
+def get_settings_section(section: str) -> Dict[str, Any]:
+    """
+    读取全局配置中的一节
+
+    进程内缓存，save_global_settings 后失效；setting.json 中缺少的字段用默认值补齐
+    """
+    global _settings_cache
+    if _settings_cache is None:
+        _settings_cache = load_global_settings()
+
+    defaults = _default_settings().get(section) or {}
+    return {**defaults, **(_settings_cache.get(section) or {})}
+
+
+# ============ 存储引擎 ============
+
+_storage_engine = None
+_storage_engine_lock = threading.Lock()
+_storage_engine_resolved = False
+
+
+def get_storage_engine():
+    """
+    获取配置的存储引擎
+
+    setting.json 中 storage.engine 为 "sqlite" 时返回 SqliteStateStore，
+    默认的目录存储（每个任务一个目录）返回 None。引擎在进程内首次使用时确定，
+    切换引擎需要重启服务。
+    """
+    global _storage_engine, _storage_engine_resolved
+    if _storage_engine_resolved:
+        return _storage_engine
+
+    with _storage_engine_lock:
+        if not _storage_engine_resolved:
+            storage = get_settings_section("storage")
+            if storage.get("engine") == "sqlite":
+                from .sqlite_store import SqliteStateStore
+                db_path = storage.get("sqlite_path") or get_base_dir() / "archon.db"
+                _storage_engine = SqliteStateStore(Path(db_path).expanduser())
+            _storage_engine_resolved = True
+
+    return _storage_engine
+
+
+# ============ 配置缓存 ============
+#
+# 目录存储下按 task_id 缓存物化后的配置模型（TaskConfig，带 __slots__），
+# 以 config.json 与 config.journal 的 (inode, mtime_ns, size) 作为签名；
+# 文件未变化时直接返回缓存。save/patch 写穿更新缓存。
+# 返回给调用方的是副本（字典或模型），调用方修改不会污染缓存。
+
+_config_cache: "OrderedDict[str, Tuple[Tuple, TaskConfig]]" = OrderedDict()
+_config_cache_lock = threading.Lock()
+_config_cache_stats = {"hits": 0, "misses": 0}
+
+
+def _config_cache_capacity() -> int:
+    """缓存容量（storage.config_cache_size，0 表示禁用）"""
+    return int(get_settings_section("storage").get("config_cache_size", 256))
+
+
+def _copy_config(value: Any) -> Any:
+    """复制 JSON 结构（比 copy.deepcopy 快）"""
+    if isinstance(value, dict):
+        return {k: _copy_config(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy_config(v) for v in value]
+    return value
+
+
+def _file_signature(path: Path) -> Optional[Tuple[int, int, int]]:
+    """文件签名 (inode, mtime_ns, size)，不存在时返回 None"""
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def _config_signature(task_dir: Path) -> Tuple:
+    """任务配置签名：快照 + 增量"""
+    return (
+        _file_signature(task_dir / "config.json"),
+        _file_signature(task_dir / "config.journal"),
+    )
+
+
+def _config_cache_get(task_id: str, signature: Tuple, as_model: bool = False) -> Optional[Any]:
+    """命中时返回缓存配置的副本（as_model 为 True 时返回模型，否则返回字典）"""
+    with _config_cache_lock:
+        cached = _config_cache.get(task_id)
+        if cached is not None and cached[0] == signature:
+            _config_cache.move_to_end(task_id)
+            _config_cache_stats["hits"] += 1
+            return cached[1].clone() if as_model else cached[1].to_dict()
+        _config_cache_stats["misses"] += 1
+        return None
+
+
+def _config_cache_put(task_id: str, signature: Tuple, model: TaskConfig) -> None:
+    """写入缓存（调用方之后不得再修改 model），超出容量时淘汰最久未使用的条目"""
+    capacity = _config_cache_capacity()
+    if capacity <= 0:
+        return
+
+    with _config_cache_lock:
+        _config_cache[task_id] = (signature, model)
+        _config_cache.move_to_end(task_id)
+        while len(_config_cache) > capacity:
+            _config_cache.popitem(last=False)
+
+
+def _config_cache_patch(
+    task_id: str,
+    old_signature: Tuple,
+    new_signature: Tuple,
+    updates: Optional[Dict[str, Any]],
+    increments: Optional[Dict[str, Any]]
+) -> None:
+    """字段级更新写穿：缓存基于写入前的文件状态时原地应用，否则丢弃"""
+    with _config_cache_lock:
+        cached = _config_cache.get(task_id)
+        if cached is None:
+            return
+        if cached[0] != old_signature:
+            del _config_cache[task_id]
+            return
+        apply_config_patch(cached[1], _copy_config(updates), increments)
+        _config_cache[task_id] = (new_signature, cached[1])
+
+
+def _config_cache_evict(task_id: str) -> None:
+    """移除缓存条目"""
+    with _config_cache_lock:
+        _config_cache.pop(task_id, None)
+
+
+def get_config_cache_stats() -> Dict[str, Any]:
+    """配置缓存统计"""
+    with _config_cache_lock:
+        hits = _config_cache_stats["hits"]
+        misses = _config_cache_stats["misses"]
+        total = hits + misses
+        return {
+            "enabled": get_storage_engine() is None and _config_cache_capacity() > 0,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+            "size": len(_config_cache),
+            "capacity": _config_cache_capacity(),
+        }
+
 
 # ============ 任务配置 ============
+#
+# 目录存储下 config.json 是完整快照，config.journal 是字段级增量（JSON 行，
+# {"set": {...}, "inc": {...}}）。patch_task_config 只追加增量，读取时在快照上
+# 重放；增量超过 JOURNAL_COMPACT_BYTES 时合并回 config.json。
+# 快照与增量的读写都在 config.lock 上加锁。
+
+JOURNAL_COMPACT_BYTES = 16 * 1024
+
+
+def _get_child(node: Any, key: str) -> Any:
+    """读取字典或模型的字段"""
+    if isinstance(node, StateModel):
+        return node.get_field(key)
+    return node.get(key)
+
+
+def _set_child(node: Any, key: str, value: Any) -> None:
+    """写入字典或模型的字段"""
+    if isinstance(node, StateModel):
+        node.set_field(key, value)
+    else:
+        node[key] = value
+
+
+def _resolve_parent(config: Any, path: str) -> Tuple[Any, str]:
+    """按点分路径定位父节点，缺失的中间节点补为 {}（模型字段补为默认模型）"""
+    keys = path.split('.')
+    node = config
+    for key in keys[:-1]:
+        child = _get_child(node, key)
+        if not isinstance(child, (dict, StateModel)):
+            _set_child(node, key, {})
+            child = _get_child(node, key)
+        node = child
+    return node, keys[-1]
+
+
+def apply_config_patch(
+    config: Any,
+    updates: Optional[Dict[str, Any]] = None,
+    increments: Optional[Dict[str, Any]] = None
+) -> Any:
+    """
+    在内存中的配置上应用字段级更新
+
+    Args:
+        config: 任务配置，字典或 TaskConfig 模型（原地修改）
+        updates: {点分路径: 新值}，如 {"execution.last_result": "success"}
+        increments: {点分路径: 增量}，如 {"execution.run_count": 1}
+
+    Returns:
+        修改后的配置
+    """
+    for path, value in (updates or {}).items():
+        parent, key = _resolve_parent(config, path)
+        _set_child(parent, key, value)
+
+    for path, delta in (increments or {}).items():
+        parent, key = _resolve_parent(config, path)
+        _set_child(parent, key, (_get_child(parent, key) or 0) + delta)
+
+    return config
+
+
+def replay_config_journal(config: Dict[str, Any], journal_file: Path) -> Dict[str, Any]:
+    """在配置快照上按顺序重放 config.journal 中的增量（原地修改并返回 config）"""
+    with open(journal_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                patch = json.loads(line)
+            except json.JSONDecodeError:
+                # 崩溃时写了一半的行
+                logger.warning(f"跳过损坏的配置增量: {journal_file}")
+                continue
+            apply_config_patch(config, patch.get("set"), patch.get("inc"))
+    return config
+
+
+def read_task_config_file(config_file: Path) -> Dict[str, Any]:
+    """读取配置快照（自动识别 JSON / msgpack 格式）"""
+    return decode_config(config_file.read_bytes())
+
+
+def _write_config_snapshot(config_file: Path, config: Dict[str, Any]) -> int:
+    """
+    原子写入完整配置并清空增量（调用方需持有 config.lock）
+
+    Returns:
+        新快照的 mtime_ns
+    """
+    serializer = resolve_serializer(get_settings_section("storage").get("serializer", "json"))
+    _atomic_write_bytes(config_file, encode_config(config, serializer))
+
+    journal_file = config_file.with_name("config.journal")
+    if journal_file.exists():
+        journal_file.unlink()
+        # 删除必须落盘，否则重启后增量会在新快照上重放第二次
+        _sync_dir(config_file.parent)
+
+    return config_file.stat().st_mtime_ns
+
+
+def _load_config_model(task_id: str, as_model: bool) -> Optional[Any]:
+    """
+    目录存储下读取配置：优先命中缓存，否则读取快照并重放增量，物化为模型后放入缓存
+
+    Returns:
+        as_model 为 True 时返回 TaskConfig 模型，否则返回字典；不存在时返回 None
+    """
+    task_dir = get_task_dir(task_id)
+    config_file = task_dir / "config.json"
+    journal_file = task_dir / "config.journal"
+
+    signature = _config_signature(task_dir)
+    if signature[0] is None:
+        return None
+
+    cached = _config_cache_get(task_id, signature, as_model)
+    if cached is not None:
+        return cached
+
+    if signature[1] is None:
+        config = read_task_config_file(config_file)
+    else:
+        with _locked_file(task_dir / "config.lock", exclusive=False):
+            signature = _config_signature(task_dir)
+            config = read_task_config_file(config_file)
+            if journal_file.exists():
+                replay_config_journal(config, journal_file)
+
+    model = task_config_from_dict(config)
+    _config_cache_put(task_id, signature, model)
+    return model.clone() if as_model else model.to_dict()
+
 
 def load_task_config(task_id: str) -> Optional[Dict[str, Any]]:
     """加载任务配置"""
-    config_file = get_task_dir(task_id) / "config.json"
+    engine = get_storage_engine()
+    if engine:
+        return engine.load_task_config(task_id)
 
-    if not config_file.exists():
+    try:
+        return _load_config_model(task_id, as_model=False)
+    except Exception as e:
+        logger.error(f"加载任务配置失败 [{task_id}]: {e}")
         return None
 
+
+def load_task_model(task_id: str) -> Optional[TaskConfig]:
+    """
+    加载任务配置并物化为模型
+
+    按 mode 返回 ProbeTaskConfig / CronTaskConfig，字段按属性访问；
+    返回的是副本，修改后需通过 patch_task_config / save_task_config 持久化
+    """
+    engine = get_storage_engine()
     try:
-        with open(config_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        if engine:
+            config = engine.load_task_config(task_id)
+            return task_config_from_dict(config) if config else None
+        return _load_config_model(task_id, as_model=True)
     except Exception as e:
         logger.error(f"加载任务配置失败 [{task_id}]: {e}")
         return None
@@ -120,26 +608,120 @@ def load_task_config(task_id: str) -> Optional[Dict[str, Any]]:
 
 def save_task_config(task_id: str, config: Dict[str, Any]) -> bool:
     """保存任务配置"""
+    engine = get_storage_engine()
+    if engine:
+        return engine.save_task_config(task_id, config)
+
     task_dir = ensure_task_dir(task_id)
     config_file = task_dir / "config.json"
 
     try:
         # 原子写入
-        temp_file = config_file.with_suffix('.tmp')
-        with open(temp_file, 'w', encoding='utf-8') as f:
-            json.dump(config, f, indent=2, ensure_ascii=False)
-        temp_file.rename(config_file)
-        return True
+        with _locked_file(task_dir / "config.lock"):
+            mtime_ns = _write_config_snapshot(config_file, config)
+            _config_cache_put(
+                task_id, _config_signature(task_dir),
+                task_config_from_dict(_copy_config(config))
+            )
     except Exception as e:
         logger.error(f"保存任务配置失败 [{task_id}]: {e}")
+        _config_cache_evict(task_id)
         return False
 
+    _catalog_update(task_id, config, mtime_ns)
+    return True
+
+
+def patch_task_config(
+    task_id: str,
+    updates: Optional[Dict[str, Any]] = None,
+    increments: Optional[Dict[str, Any]] = None
+) -> bool:
+    """
+    字段级更新任务配置
+
+    只持久化变化的字段，并发写入不同字段时不会互相覆盖；
+    increments 在持久化层累加，多个写入方的计数不会丢失。
+
+    Args:
+        task_id: 任务 ID
+        updates: {点分路径: 新值}
+        increments: {点分路径: 增量}
+
+    Returns:
+        是否成功
+    """
+    if not updates and not increments:
+        return True
+
+    engine = get_storage_engine()
+    if engine:
+        return engine.patch_task_config(task_id, updates or {}, increments or {})
+
+    task_dir = get_task_dir(task_id)
+    config_file = task_dir / "config.json"
+    journal_file = task_dir / "config.journal"
+
+    if not config_file.exists():
+        logger.error(f"更新任务配置失败 [{task_id}]: 配置不存在")
+        return False
+
+    line = json.dumps(
+        {"set": updates or {}, "inc": increments or {}},
+        ensure_ascii=False, separators=(',', ':')
+    ) + "\n"
+
+    try:
+        with _locked_file(task_dir / "config.lock"):
+            old_signature = _config_signature(task_dir)
+            created = not journal_file.exists()
+            with open(journal_file, 'a', encoding='utf-8') as f:
+                f.write(line)
+                journal_size = f.tell()
+                _sync_written(journal_file, f, sync_dir=created)
+            _config_cache_patch(
+                task_id, old_signature, _config_signature(task_dir),
+                updates, increments
+            )
+
+            if journal_size > JOURNAL_COMPACT_BYTES:
+                # 增量过多，合并回快照
+                config = read_task_config_file(config_file)
+                replay_config_journal(config, journal_file)
+                mtime_ns = _write_config_snapshot(config_file, config)
+                _config_cache_put(
+                    task_id, _config_signature(task_dir),
+                    task_config_from_dict(_copy_config(config))
+                )
+                _catalog_update(task_id, config, mtime_ns)
+
+            # 索引中的 mtime 随增量写入更新，归档据此判断任务是否长期未变动
+            mtime_ns = _config_mtime_ns(task_dir)
+    except Exception as e:
+        logger.error(f"更新任务配置失败 [{task_id}]: {e}")
+        _config_cache_evict(task_id)
+        return False
+
+    _catalog_patch(task_id, updates or {}, mtime_ns)
+    return True
+
 
 def delete_task_config(task_id: str) -> bool:
-    """删除任务配置"""
+    """删除任务配置（连同执行历史）"""
     import shutil
+    from .run_history import delete_runs
     task_dir = get_task_dir(task_id)
 
+    engine = get_storage_engine()
+    if engine:
+        if not engine.delete_task(task_id):
+            return False
+    else:
+        _catalog_remove(task_id)
+        _config_cache_evict(task_id)
+
+    delete_runs(task_id)
+
     if not task_dir.exists():
         return True
 
@@ -155,6 +737,10 @@ def delete_task_config(task_id: str) -> bool:
 
 def get_task_status(task_id: str) -> Optional[str]:
     """获取任务状态"""
+    engine = get_storage_engine()
+    if engine:
+        return engine.get_task_status(task_id)
+
     status_file = get_task_dir(task_id) / "status"
 
     if not status_file.exists():
@@ -173,69 +759,55 @@ def set_task_status(task_id: str, status: str) -> bool:
 
     同时更新 status 文件和 config.json 中的 state.status 字段
     """
+    engine = get_storage_engine()
+    if engine:
+        return engine.set_task_status(task_id, status)
+
     task_dir = ensure_task_dir(task_id)
     status_file = task_dir / "status"
 
     try:
         # 更新 status 文件
-        status_file.write_text(status)
-
-        # 同步更新 config.json
-        config = load_task_config(task_id)
-        if config:
-            config.setdefault("state", {})["status"] = status
-            save_task_config(task_id, config)
-
-        return True
+        _atomic_write_text(status_file, status)
     except Exception as e:
         logger.error(f"设置任务状态失败 [{task_id}]: {e}")
         return False
 
+    # 同步更新 config.json
+    if (task_dir / "config.json").exists():
+        return patch_task_config(task_id, {"state.status": status})
+    return True
+
 
 # ============ 任务锁 ============
 
-def acquire_task_lock(task_id: str, timeout_minutes: int = 30) -> bool:
+_task_lock_manager: Optional[TaskLockManager] = None
+
+
+def get_task_lock_manager() -> TaskLockManager:
+    """获取任务锁管理器单例"""
+    global _task_lock_manager
+    if _task_lock_manager is None:
+        _task_lock_manager = TaskLockManager()
+    return _task_lock_manager
+
+
+def acquire_task_lock(task_id: str) -> bool:
     """
-    获取任务锁
+    获取任务锁（非阻塞）
+
+    本进程已持有时直接返回 False；跨进程通过 task.lock 互斥，
+    持有进程退出后锁自动失效，长时间执行由心跳线程续租
 
     Args:
         task_id: 任务 ID
-        timeout_minutes: 锁超时时间（分钟），超过此时间视为僵尸锁
 
     Returns:
         是否成功获取锁
     """
-    task_dir = ensure_task_dir(task_id)
-    lock_file = task_dir / "task.lock"
-
-    # 检查是否存在锁
-    if lock_file.exists():
-        try:
-            content = lock_file.read_text().strip()
-            pid, timestamp = content.split(':')
-            lock_time = datetime.fromisoformat(timestamp)
-
-            # 检查是否超时
-            elapsed = (datetime.now() - lock_time).total_seconds() / 60
-            if elapsed < timeout_minutes:
-                # 锁未超时，检查进程是否存活
-                try:
-                    os.kill(int(pid), 0)
-                    # 进程存活，锁有效
-                    return False
-                except OSError:
-                    # 进程已死，可以覆盖锁
-                    pass
-        except Exception:
-            # 锁文件格式错误，覆盖
-            pass
-
-    # 创建锁
     try:
-        pid = os.getpid()
-        timestamp = datetime.now().isoformat()
-        lock_file.write_text(f"{pid}:{timestamp}")
-        return True
+        lock_file = ensure_task_dir(task_id) / "task.lock"
+        return get_task_lock_manager().acquire(task_id, lock_file)
     except Exception as e:
         logger.error(f"创建任务锁失败 [{task_id}]: {e}")
         return False
@@ -243,14 +815,8 @@ def acquire_task_lock(task_id: str, timeout_minutes: int = 30) -> bool:
 
 def release_task_lock(task_id: str) -> bool:
     """释放任务锁"""
-    lock_file = get_task_dir(task_id) / "task.lock"
-
-    if not lock_file.exists():
-        return True
-
     try:
-        lock_file.unlink()
-        return True
+        return get_task_lock_manager().release(task_id)
     except Exception as e:
         logger.error(f"释放任务锁失败 [{task_id}]: {e}")
         return False
@@ -258,155 +824,928 @@ def release_task_lock(task_id: str) -> bool:
 
 def is_task_locked(task_id: str) -> bool:
     """检查任务是否被锁定"""
-    lock_file = get_task_dir(task_id) / "task.lock"
-    return lock_file.exists()
+    return get_task_lock_manager().is_locked(task_id, get_task_dir(task_id) / "task.lock")
 
 
-# ============ 任务列表 ============
+# ============ 任务索引 ============
+#
+# .catalog.json 保存每个任务的摘要（mode/status/name/created_at/next_run/mtime），
+# 在 save_task_config / set_task_status / delete_task_config 时同步更新，
+# 列表和按 mode/status 过滤无需再逐个解析 config.json。
+# 多进程写入时在 .catalog.lock 上加锁，读-合并-写，避免互相覆盖。
+# mtime 为 config.json 与 config.journal 中较新的修改时间；索引字段未变时
+# 只在落后超过 CATALOG_MTIME_SLACK_NS 时落盘。
+
+CATALOG_VERSION = 1
+
+# 参与过滤/展示的索引字段，只有这些字段变化时才落盘
+_CATALOG_FIELDS = ("mode", "status", "name", "created_at", "next_run")
+
+# 索引字段未变时，mtime 落后超过该值（纳秒）才落盘，其他进程看到的 mtime 最多滞后这么久
+CATALOG_MTIME_SLACK_NS = 60 * 10 ** 9
+
+# 配置路径 -> 索引字段，用于字段级更新时同步索引
+_CATALOG_PATHS = {
+    "mode": "mode",
+    "state.status": "status",
+    "name": "name",
+    "created_at": "created_at",
+    "schedule.next_run": "next_run",
+    "schedule.next_check": "next_run",
+}
+
+
+_catalog_lock = threading.RLock()
+_catalog: Optional[Dict[str, Dict[str, Any]]] = None
+_catalog_index: Dict[Tuple[Any, Any], Set[str]] = {}
+_catalog_file_mtime: Optional[int] = None
+
+
+def get_catalog_file() -> Path:
+    """获取任务索引文件路径"""
+    return get_base_dir() / ".catalog.json"
+
+
+def _catalog_entry(config: Dict[str, Any], mtime_ns: Optional[int]) -> Dict[str, Any]:
+    """从任务配置提取索引条目"""
+    schedule = config.get("schedule") or {}
+    return {
+        "mode": config.get("mode"),
+        "status": (config.get("state") or {}).get("status"),
+        "name": config.get("name", ""),
+        "created_at": config.get("created_at", ""),
+        "next_run": schedule.get("next_run") or schedule.get("next_check"),
+        "mtime": mtime_ns,
+    }
 
-def list_all_tasks() -> List[Dict[str, Any]]:
-    """列出所有任务"""
-    base_dir = get_base_dir()
 
+def _config_mtime_ns(task_dir: Path) -> Optional[int]:
+    """配置最后修改时间：config.json 与未合并的 config.journal 中较新者，配置不存在时返回 None"""
+    try:
+        mtime_ns = (task_dir / "config.json").stat().st_mtime_ns
+    except OSError:
+        return None
+    try:
+        mtime_ns = max(mtime_ns, (task_dir / "config.journal").stat().st_mtime_ns)
+    except OSError:
+        pass
+    return mtime_ns
+
+
+def get_task_mtime_ns(task_id: str) -> Optional[int]:
+    """
+    任务配置的实际最后修改时间（纳秒）
+
+    目录存储下直接读取文件时间，不经过索引；SQLite 引擎下索引中的 updated_at 即为准确值，返回 None
+    """
+    if get_storage_engine():
+        return None
+    return _config_mtime_ns(get_task_dir(task_id))
+
+
+def _iter_task_dirs():
+    """遍历工作目录下的任务目录（不解析配置）"""
+    base_dir = get_base_dir()
     if not base_dir.exists():
-        return []
+        return
 
-    tasks = []
     for task_dir in base_dir.iterdir():
+        if task_dir.name.startswith('.'):
+            continue
         if not task_dir.is_dir():
             continue
-        if task_dir.name.startswith('.'):
+        yield task_dir
+
+
+def _reindex_catalog() -> None:
+    """重建 (mode, status) 二级索引"""
+    global _catalog_index
+    index: Dict[Tuple[Any, Any], Set[str]] = {}
+    for task_id, entry in (_catalog or {}).items():
+        index.setdefault((entry.get("mode"), entry.get("status")), set()).add(task_id)
+    _catalog_index = index
+
+
+def _read_catalog_file() -> Optional[Dict[str, Dict[str, Any]]]:
+    """读取索引文件，不存在或版本不符时返回 None"""
+    catalog_file = get_catalog_file()
+    if not catalog_file.exists():
+        return None
+
+    try:
+        with open(catalog_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except Exception as e:
+        logger.warning(f"读取任务索引失败，将重建: {e}")
+        return None
+
+    if data.get("version") != CATALOG_VERSION:
+        return None
+    return data.get("tasks", {})
+
+
+def _write_catalog_file(tasks: Dict[str, Dict[str, Any]]) -> None:
+    """
+    原子写入索引文件（调用方需持有 .catalog.lock）
+
+    索引可由任务目录重建，不参与持久化策略
+    """
+    global _catalog_file_mtime
+    catalog_file = get_catalog_file()
+    temp_file = catalog_file.with_suffix('.tmp')
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(
+            {"version": CATALOG_VERSION, "tasks": tasks},
+            f, ensure_ascii=False, separators=(',', ':')
+        )
+    temp_file.rename(catalog_file)
+    _catalog_file_mtime = catalog_file.stat().st_mtime_ns
+
+
+def _persist_catalog(changes: Dict[str, Optional[Dict[str, Any]]]) -> None:
+    """
+    把索引变更合并进索引文件
+
+    Args:
+        changes: {task_id: 条目}，条目为 None 表示删除
+    """
+    global _catalog
+    ensure_base_dir()
+    with _locked_file(get_base_dir() / ".catalog.lock"):
+        tasks = _read_catalog_file()
+        if tasks is None:
+            tasks = dict(_catalog or {})
+        for task_id, entry in changes.items():
+            if entry is None:
+                tasks.pop(task_id, None)
+            else:
+                tasks[task_id] = entry
+        try:
+            _write_catalog_file(tasks)
+        except Exception as e:
+            logger.error(f"写入任务索引失败: {e}")
+        _catalog = tasks
+        _reindex_catalog()
+
+
+def _reconcile_catalog(tasks: Dict[str, Dict[str, Any]]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    对比索引与磁盘上的任务目录
+
+    只 stat 每个 config.json，mtime 不一致或缺失的条目才重新解析
+
+    Returns:
+        需要写回索引的变更
+    """
+    changes: Dict[str, Optional[Dict[str, Any]]] = {}
+    seen = set()
+
+    for task_dir in _iter_task_dirs():
+        task_id = task_dir.name
+        # 有未合并的增量时以增量的修改时间为准
+        mtime_ns = _config_mtime_ns(task_dir)
+        if mtime_ns is None:
+            continue
+
+        seen.add(task_id)
+
+        entry = tasks.get(task_id)
+        if entry is not None and entry.get("mtime") == mtime_ns:
+            continue
+
+        config = load_task_config(task_id)
+        if config:
+            changes[task_id] = _catalog_entry(config, mtime_ns)
+
+    for task_id in tasks:
+        if task_id not in seen:
+            changes[task_id] = None
+
+    return changes
+
+
+def _load_catalog() -> Dict[str, Dict[str, Any]]:
+    """
+    获取内存中的任务索引
+
+    首次加载时与磁盘对账；之后仅在索引文件被其他进程修改时重新读取
+    """
+    global _catalog, _catalog_file_mtime
+    with _catalog_lock:
+        try:
+            file_mtime = get_catalog_file().stat().st_mtime_ns
+        except OSError:
+            file_mtime = None
+
+        if _catalog is not None and file_mtime is not None and file_mtime == _catalog_file_mtime:
+            return _catalog
+
+        first_load = _catalog is None
+        tasks = _read_catalog_file() if file_mtime is not None else None
+
+        if tasks is None or first_load:
+            changes = _reconcile_catalog(tasks or {})
+            _catalog = tasks or {}
+            _catalog_file_mtime = file_mtime
+            if changes or tasks is None:
+                _persist_catalog(changes)
+        else:
+            # 其他进程更新了索引，保留本进程已知的较新 mtime
+            for task_id, entry in tasks.items():
+                known = _catalog.get(task_id)
+                if known and (known.get("mtime") or 0) > (entry.get("mtime") or 0):
+                    entry["mtime"] = known["mtime"]
+            _catalog = tasks
+            _catalog_file_mtime = file_mtime
+
+        _reindex_catalog()
+        return _catalog
+
+
+def _mtime_is_current(entry: Dict[str, Any], mtime_ns: Optional[int]) -> bool:
+    """索引中的 mtime 是否足够新，不必为此落盘"""
+    if mtime_ns is None:
+        return True
+    return mtime_ns - (entry.get("mtime") or 0) <= CATALOG_MTIME_SLACK_NS
+
+
+def _catalog_update(task_id: str, config: Dict[str, Any], mtime_ns: Optional[int]) -> None:
+    """配置写入后同步索引条目"""
+    entry = _catalog_entry(config, mtime_ns)
+    try:
+        with _catalog_lock:
+            current = _load_catalog().get(task_id)
+            if current is not None and _mtime_is_current(current, mtime_ns) and all(
+                current.get(k) == entry[k] for k in _CATALOG_FIELDS
+            ):
+                return
+            _persist_catalog({task_id: entry})
+    except Exception as e:
+        logger.error(f"更新任务索引失败 [{task_id}]: {e}")
+
+
+def _catalog_patch(task_id: str, updates: Dict[str, Any], mtime_ns: Optional[int]) -> None:
+    """字段级更新后同步索引条目（mtime 为写入增量后的配置修改时间）"""
+    fields = {
+        _CATALOG_PATHS[path]: value
+        for path, value in updates.items()
+        if path in _CATALOG_PATHS
+    }
+
+    try:
+        with _catalog_lock:
+            current = _load_catalog().get(task_id)
+            if current is None:
+                # 尚未索引，首次加载对账时补齐
+                return
+            if _mtime_is_current(current, mtime_ns) and all(
+                current.get(k) == v for k, v in fields.items()
+            ):
+                return
+            if mtime_ns is not None:
+                fields["mtime"] = max(mtime_ns, current.get("mtime") or 0)
+            _persist_catalog({task_id: dict(current, **fields)})
+    except Exception as e:
+        logger.error(f"更新任务索引失败 [{task_id}]: {e}")
+
+
+def _catalog_remove(task_id: str) -> None:
+    """任务删除后移除索引条目"""
+    try:
+        with _catalog_lock:
+            if task_id in _load_catalog():
+                _persist_catalog({task_id: None})
+    except Exception as e:
+        logger.error(f"更新任务索引失败 [{task_id}]: {e}")
+
+
+def rebuild_task_catalog() -> int:
+    """
+    丢弃现有索引，全量扫描任务目录重建
+
+    Returns:
+        索引中的任务数量
+    """
+    global _catalog
+    engine = get_storage_engine()
+    if engine:
+        return engine.count_tasks()
+
+    with _catalog_lock:
+        ensure_base_dir()
+        with _locked_file(get_base_dir() / ".catalog.lock"):
+            changes = _reconcile_catalog({})
+            tasks = {k: v for k, v in changes.items() if v is not None}
+            _write_catalog_file(tasks)
+            _catalog = tasks
+            _reindex_catalog()
+        return len(tasks)
+
+
+def _match_task_ids(mode: Optional[str] = None, status: Optional[str] = None) -> Set[str]:
+    """通过 (mode, status) 二级索引查找匹配的任务 ID"""
+    catalog = _load_catalog()
+    if mode is None and status is None:
+        return set(catalog)
+
+    matched: Set[str] = set()
+    for (entry_mode, entry_status), task_ids in _catalog_index.items():
+        if mode is not None and entry_mode != mode:
             continue
-        if task_dir.name == "setting.json":
+        if status is not None and entry_status != status:
             continue
+        matched |= task_ids
+    return matched
+
 
-        config = load_task_config(task_dir.name)
+def list_task_summaries(
+    mode: Optional[str] = None,
+    status: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    列出任务摘要（只读索引，不解析 config.json）
+
+    Args:
+        mode: 按模式过滤 (probe/cron)
+        status: 按状态过滤
+
+    Returns:
+        摘要列表，按创建时间倒序
+    """
+    engine = get_storage_engine()
+    if engine:
+        return engine.list_task_summaries(mode, status)
+
+    with _catalog_lock:
+        catalog = _load_catalog()
+        summaries = [
+            dict(catalog[task_id], task_id=task_id)
+            for task_id in _match_task_ids(mode, status)
+        ]
+
+    summaries.sort(key=lambda x: x.get("created_at") or "", reverse=True)
+    return summaries
+
+
+def count_tasks(mode: Optional[str] = None, status: Optional[str] = None) -> int:
+    """统计任务数量（只读索引）"""
+    engine = get_storage_engine()
+    if engine:
+        return engine.count_tasks(mode, status)
+
+    with _catalog_lock:
+        return len(_match_task_ids(mode, status))
+
+
+def list_all_tasks(
+    mode: Optional[str] = None,
+    status: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    列出所有任务
+
+    先通过索引过滤，只加载匹配任务的配置
+
+    Args:
+        mode: 按模式过滤 (probe/cron)
+        status: 按状态过滤
+    """
+    engine = get_storage_engine()
+    if engine:
+        return engine.list_task_configs(mode, status)
+
+    tasks = []
+    for summary in list_task_summaries(mode, status):
+        config = load_task_config(summary["task_id"])
         if config:
             tasks.append(config)
+        else:
+            # 目录已被外部删除
+            _catalog_remove(summary["task_id"])
 
-    # 按创建时间排序
-    tasks.sort(key=lambda x: x.get("created_at", ""), reverse=True)
     return tasks
 
 
 def list_tasks_by_mode(mode: str) -> List[Dict[str, Any]]:
     """按模式列出任务"""
-    all_tasks = list_all_tasks()
-    return [t for t in all_tasks if t.get("mode") == mode]
+    return list_all_tasks(mode=mode)
 
 
 def list_active_tasks() -> List[Dict[str, Any]]:
     """列出所有活跃任务"""
-    all_tasks = list_all_tasks()
-    return [t for t in all_tasks if t.get("state", {}).get("status") == "active"]
+    return list_all_tasks(status="active")
 
 
 # ============ 日志 ============
+#
+# archon.log 超过 logging.max_log_size_mb 时轮转为 archon.log.1 ... archon.log.N，
+# 连同当前文件最多保留 logging.max_log_files 个。
+#
+# 每条日志同时以 JSON 行写入 events.jsonl，供结构化查询。events.idx 为稀疏索引，
+# 每隔 EVENT_INDEX_BYTES 字节记录一行 "<ts_ms> <偏移>"，按时间查询时二分定位后
+# 从该偏移开始顺序读取。两者与 archon.log 使用相同的轮转规则并一起轮转。
 
-def append_log(task_id: str, level: str, message: str) -> bool:
-    """追加日志"""
-    task_dir = ensure_task_dir(task_id)
-    log_file = task_dir / "archon.log"
+TAIL_BLOCK_SIZE = 8192
 
-    try:
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        log_line = f"[{timestamp}] [{level.upper()}] {message}\n"
+EVENT_INDEX_BYTES = 32 * 1024
+
+
+def _log_limits() -> Tuple[int, int]:
+    """日志轮转限制 (单文件字节数, 文件总数)"""
+    logging_settings = get_settings_section("logging")
+    max_bytes = int(float(logging_settings.get("max_log_size_mb", 10)) * 1024 * 1024)
+    max_files = max(1, int(logging_settings.get("max_log_files", 5)))
+    return max_bytes, max_files
+
+
+def rotate_log_file(log_file: Path, max_files: int) -> None:
+    """
+    轮转日志文件
+
+    archon.log -> archon.log.1 -> ... -> archon.log.{max_files-1}，最旧的被删除；
+    max_files 为 1 时直接清空当前文件
+    """
+    if max_files <= 1:
+        log_file.unlink()
+        return
+
+    oldest = log_file.with_name(f"{log_file.name}.{max_files - 1}")
+    if oldest.exists():
+        oldest.unlink()
+
+    for i in range(max_files - 2, 0, -1):
+        src = log_file.with_name(f"{log_file.name}.{i}")
+        if src.exists():
+            src.rename(log_file.with_name(f"{log_file.name}.{i + 1}"))
 
-        with open(log_file, 'a', encoding='utf-8') as f:
-            f.write(log_line)
+    log_file.rename(log_file.with_name(f"{log_file.name}.1"))
+
+
+def _write_log_lines(log_file: Path, lines: List[str]) -> None:
+    """追加日志行，超过大小上限时轮转"""
+    with open(log_file, 'a', encoding='utf-8') as f:
+        f.writelines(lines)
+        size = f.tell()
+
+    max_bytes, max_files = _log_limits()
+    if size < max_bytes:
+        return
+
+    # 多个进程可能同时触发，加锁后再确认一次
+    with _locked_file(log_file.with_name(f"{log_file.name}.lock")):
+        try:
+            if log_file.stat().st_size >= max_bytes:
+                rotate_log_file(log_file, max_files)
+        except FileNotFoundError:
+            pass
+
+
+def read_tail_lines(path: Path, lines: int) -> List[str]:
+    """
+    从文件末尾反向分块读取最后若干行
+
+    读取量与请求的行数成正比，与文件大小无关
+    """
+    if lines <= 0:
+        return []
+
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        buffer = b""
+
+        # 多读一个换行符，保证首行完整
+        while position > 0 and buffer.count(b"\n") <= lines:
+            read_size = min(TAIL_BLOCK_SIZE, position)
+            position -= read_size
+            f.seek(position)
+            buffer = f.read(read_size) + buffer
+
+    result = buffer.decode('utf-8', errors='replace').splitlines(keepends=True)
+    if position > 0:
+        # 第一行可能被截断
+        result = result[1:]
+    return result[-lines:]
+
+
+def _iter_lines_reversed(path: Path):
+    """从文件末尾开始逐行反向读取（bytes，不含换行符）"""
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        remainder = b""
+
+        while position > 0:
+            read_size = min(TAIL_BLOCK_SIZE, position)
+            position -= read_size
+            f.seek(position)
+            parts = (f.read(read_size) + remainder).split(b"\n")
+            remainder = parts[0]
+            for line in reversed(parts[1:]):
+                if line:
+                    yield line
+
+        if remainder:
+            yield remainder
+
+
+def _write_event_lines(task_dir: Path, events: List[Dict[str, Any]]) -> None:
+    """追加事件并维护稀疏索引，超过大小上限时与索引一起轮转"""
+    events_file = task_dir / "events.jsonl"
+    index_file = task_dir / "events.idx"
+
+    with _locked_file(task_dir / "events.lock"):
+        # 末行损坏（如写到一半中断）时视为没有索引，从当前偏移重新记录
+        last_indexed: Optional[int] = None
+        torn = False
+        if index_file.exists():
+            tail = read_tail_lines(index_file, 1)
+            if tail:
+                entry = _parse_index_line(tail[0])
+                if entry:
+                    last_indexed = entry[1]
+                torn = not tail[0].endswith("\n")
+
+        chunks: List[bytes] = []
+        index_lines: List[str] = []
+        with open(events_file, 'ab') as f:
+            offset = f.tell()
+            for event in events:
+                if last_indexed is None or offset - last_indexed >= EVENT_INDEX_BYTES:
+                    index_lines.append(f"{event['ts_ms']} {offset}\n")
+                    last_indexed = offset
+                line = (json.dumps(event, ensure_ascii=False) + "\n").encode('utf-8')
+                chunks.append(line)
+                offset += len(line)
+            f.write(b"".join(chunks))
+
+        # 索引在事件落盘后写入，只会落后不会超前；写入失败只影响查询定位，不影响事件本身
+        if index_lines:
+            if torn:
+                index_lines.insert(0, "\n")
+            try:
+                with open(index_file, 'a', encoding='utf-8') as f:
+                    f.writelines(index_lines)
+            except OSError as e:
+                logger.warning(f"写入事件索引失败 [{task_dir.name}]: {e}")
+
+        max_bytes, max_files = _log_limits()
+        if offset >= max_bytes:
+            rotate_log_file(events_file, max_files)
+            if index_file.exists():
+                rotate_log_file(index_file, max_files)
+
+
+def _write_log_entries(task_id: str, entries: List[Tuple[str, str, str, Dict[str, Any]]]) -> bool:
+    """
+    写入一批日志
+
+    Args:
+        entries: [(时间戳, 级别, 消息, 事件)]
+    """
+    engine = get_storage_engine()
+    if engine:
+        return engine.append_log_entries(task_id, entries)
+
+    try:
+        task_dir = ensure_task_dir(task_id)
+        _write_log_lines(task_dir / "archon.log", [
+            f"[{timestamp}] [{level}] {message}\n"
+            for timestamp, level, message, _ in entries
+        ])
+        _write_event_lines(task_dir, [entry[3] for entry in entries])
         return True
     except Exception as e:
         logger.error(f"写入日志失败 [{task_id}]: {e}")
         return False
 
 
+_log_writer: Optional[TaskLogWriter] = None
+
+
+def start_log_writer() -> None:
+    """
+    启动后台日志写入线程
+
+    启动后 append_log 只入队，按 logging.flush_interval_ms / flush_batch_size 批量写出；
+    未启动时（如命令行脚本）append_log 同步写入
+    """
+    global _log_writer
+    if _log_writer is not None and _log_writer.running:
+        return
+
+    logging_settings = get_settings_section("logging")
+    _log_writer = TaskLogWriter(
+        _write_log_entries,
+        flush_interval=float(logging_settings.get("flush_interval_ms", 500)) / 1000,
+        max_batch=int(logging_settings.get("flush_batch_size", 256))
+    )
+    _log_writer.start()
+    atexit.register(stop_log_writer)
+
+
+def stop_log_writer() -> None:
+    """写出缓冲中的日志并停止后台写入线程"""
+    global _log_writer
+    if _log_writer is not None:
+        _log_writer.stop()
+        _log_writer = None
+
+
+def flush_logs(timeout: float = 5.0) -> bool:
+    """等待后台写入线程写出已提交的日志"""
+    if _log_writer is None:
+        return True
+    return _log_writer.flush(timeout)
+
+
+def append_log(
+    task_id: str,
+    level: str,
+    message: str,
+    event: Optional[str] = None,
+    **fields: Any
+) -> bool:
+    """
+    追加日志
+
+    Args:
+        task_id: 任务 ID
+        level: 日志级别
+        message: 日志内容
+        event: 事件类型（默认 "log"）
+        **fields: 事件附加字段，如 status、duration_ms、correction_index，值为 None 的字段被忽略
+    """
+    now = datetime.now()
+    level = level.upper()
+    record = {
+        "ts_ms": int(now.timestamp() * 1000),
+        "time": now.isoformat(timespec='milliseconds'),
+        "task_id": task_id,
+        "type": event or "log",
+        "level": level,
+        "message": message,
+    }
+    record.update((key, value) for key, value in fields.items() if value is not None)
+
+    entry = (now.strftime("%Y-%m-%d %H:%M:%S"), level, message, record)
+
+    writer = _log_writer
+    if writer is not None and writer.running:
+        writer.submit(task_id, entry)
+        return True
+
+    return _write_log_entries(task_id, [entry])
+
+
 def read_log(task_id: str, lines: int = 100) -> List[str]:
-    """读取日志"""
-    log_file = get_task_dir(task_id) / "archon.log"
+    """读取最近的日志，当前文件不足时继续读取轮转文件"""
+    flush_logs()
 
-    if not log_file.exists():
-        return []
+    engine = get_storage_engine()
+    if engine:
+        return engine.read_log(task_id, lines)
 
+    log_file = get_task_dir(task_id) / "archon.log"
+    _, max_files = _log_limits()
+
+    result: List[str] = []
     try:
-        with open(log_file, 'r', encoding='utf-8') as f:
-            all_lines = f.readlines()
-        return all_lines[-lines:]
+        for i in range(max_files):
+            path = log_file if i == 0 else log_file.with_name(f"archon.log.{i}")
+            if not path.exists():
+                if i == 0:
+                    continue
+                break
+            result = read_tail_lines(path, lines - len(result)) + result
+            if len(result) >= lines:
+                break
+        return result
     except Exception as e:
         logger.error(f"读取日志失败 [{task_id}]: {e}")
-        return []
+        return result
 
 
-# ============ 纠偏历史 ============
+def _event_files(task_dir: Path) -> List[Tuple[Path, Path]]:
+    """事件文件及其索引，从旧到新"""
+    _, max_files = _log_limits()
+    files = []
+    for i in range(max_files - 1, -1, -1):
+        suffix = f".{i}" if i else ""
+        events_file = task_dir / f"events.jsonl{suffix}"
+        if events_file.exists():
+            files.append((events_file, task_dir / f"events.idx{suffix}"))
+    return files
 
-def load_corrections(task_id: str) -> str:
-    """加载纠偏历史"""
-    corrections_file = get_task_dir(task_id) / "corrections.md"
 
-    if not corrections_file.exists():
-        return ""
+def _parse_index_line(line: str) -> Optional[Tuple[int, int]]:
+    """解析一行索引 "<ts_ms> <偏移>"，格式不对时返回 None"""
+    parts = line.split()
+    if len(parts) != 2:
+        return None
+    try:
+        return int(parts[0]), int(parts[1])
+    except ValueError:
+        return None
+
 
+def _read_event_index(index_file: Path) -> List[Tuple[int, int]]:
+    """读取稀疏索引 [(ts_ms, 偏移)]，跳过损坏的行"""
+    index = []
     try:
-        return corrections_file.read_text(encoding='utf-8')
+        for line in index_file.read_text(encoding='utf-8', errors='replace').splitlines():
+            entry = _parse_index_line(line)
+            if entry:
+                index.append(entry)
+    except FileNotFoundError:
+        pass
+    return index
+
+
+def _match_event(event: Dict[str, Any], since_ms: Optional[int], event_type: Optional[str]) -> bool:
+    """事件是否满足查询条件"""
+    if since_ms is not None and event.get("ts_ms", 0) < since_ms:
+        return False
+    return not event_type or event.get("type") == event_type
+
+
+def query_events(
+    task_id: str,
+    since_ms: Optional[int] = None,
+    event_type: Optional[str] = None,
+    limit: int = 100
+) -> List[Dict[str, Any]]:
+    """
+    查询结构化事件
+
+    Args:
+        task_id: 任务 ID
+        since_ms: 起始时间（毫秒时间戳），指定时返回此后最早的 limit 条，
+                  否则返回最近的 limit 条
+        event_type: 事件类型过滤
+        limit: 最多返回条数
+
+    Returns:
+        按时间正序排列的事件列表
+    """
+    flush_logs()
+
+    engine = get_storage_engine()
+    if engine:
+        return engine.query_events(task_id, since_ms, event_type, limit)
+
+    if limit <= 0:
+        return []
+
+    files = _event_files(get_task_dir(task_id))
+    result: List[Dict[str, Any]] = []
+
+    try:
+        if since_ms is None:
+            for events_file, _ in reversed(files):
+                for raw in _iter_lines_reversed(events_file):
+                    try:
+                        event = json.loads(raw)
+                    except ValueError:
+                        continue
+                    if _match_event(event, None, event_type):
+                        result.append(event)
+                        if len(result) >= limit:
+                            return result[::-1]
+            return result[::-1]
+
+        # 从最新的文件往前找到第一个起点早于 since_ms 的文件，再用索引定位偏移
+        start, offset = 0, 0
+        for i in range(len(files) - 1, -1, -1):
+            index = _read_event_index(files[i][1])
+            if not index or index[0][0] < since_ms:
+                start = i
+                pos = bisect.bisect_left([ts for ts, _ in index], since_ms) - 1
+                offset = index[pos][1] if pos >= 0 else 0
+                break
+
+        for i in range(start, len(files)):
+            with open(files[i][0], 'rb') as f:
+                if i == start:
+                    f.seek(offset)
+                for raw in f:
+                    try:
+                        event = json.loads(raw)
+                    except ValueError:
+                        continue
+                    if _match_event(event, since_ms, event_type):
+                        result.append(event)
+                        if len(result) >= limit:
+                            return result
+        return result
     except Exception as e:
-        logger.error(f"读取纠偏历史失败 [{task_id}]: {e}")
-        return ""
+        logger.error(f"查询事件失败 [{task_id}]: {e}")
+        return result
 
 
-def save_corrections(task_id: str, content: str) -> bool:
-    """保存纠偏历史"""
-    task_dir = ensure_task_dir(task_id)
-    corrections_file = task_dir / "corrections.md"
+# ============ 执行输出 ============
+#
+# Cron 每次执行的输出流式写入 runs/<run_id>.log，run_id 以执行开始时间开头，
+# 按文件名排序即按时间排序。每个任务最多保留 runs.keep 个。
+
+_RUN_ID_PATTERN = re.compile(r"^[\w-]+$")
+
+
+def get_runs_dir(task_id: str) -> Path:
+    """获取执行输出目录"""
+    return get_task_dir(task_id) / "runs"
+
+
+def get_run_log_path(task_id: str, run_id: str) -> Path:
+    """获取单次执行的输出文件路径（目录不存在时创建）"""
+    runs_dir = get_runs_dir(task_id)
+    runs_dir.mkdir(parents=True, exist_ok=True)
+    return runs_dir / f"{run_id}.log"
+
+
+def list_run_logs(task_id: str) -> List[str]:
+    """列出已保留的执行输出（run_id，按时间升序）"""
+    runs_dir = get_runs_dir(task_id)
+    if not runs_dir.exists():
+        return []
+    return sorted(path.stem for path in runs_dir.glob("*.log"))
+
+
+def prune_run_logs(task_id: str, keep: int) -> int:
+    """删除最旧的执行输出，只保留最近 keep 个，返回删除数量"""
+    run_ids = list_run_logs(task_id)
+    removed = 0
+    for run_id in run_ids[:max(0, len(run_ids) - max(1, keep))]:
+        try:
+            (get_runs_dir(task_id) / f"{run_id}.log").unlink()
+            removed += 1
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"删除执行输出失败 [{task_id}]: {e}")
+    return removed
+
+
+def read_run_output(task_id: str, run_id: Optional[str] = None, lines: int = 100) -> Optional[Dict[str, Any]]:
+    """
+    读取执行输出的最后若干行
+
+    Args:
+        task_id: 任务 ID
+        run_id: 执行 ID，为空时读取最近一次
+        lines: 行数
 
+    Returns:
+        {run_id, lines}，输出不存在时返回 None
+    """
+    if run_id is None:
+        run_ids = list_run_logs(task_id)
+        if not run_ids:
+            return None
+        run_id = run_ids[-1]
+    elif not _RUN_ID_PATTERN.match(run_id):
+        return None
+
+    path = get_runs_dir(task_id) / f"{run_id}.log"
     try:
-        corrections_file.write_text(content, encoding='utf-8')
-        return True
+        return {"run_id": run_id, "lines": read_tail_lines(path, lines)}
+    except FileNotFoundError:
+        return None
     except Exception as e:
-        logger.error(f"保存纠偏历史失败 [{task_id}]: {e}")
-        return False
+        logger.error(f"读取执行输出失败 [{task_id}]: {e}")
+        return None
 
 
-def append_correction(task_id: str, record: Dict[str, Any]) -> bool:
-    """追加纠偏记录"""
-    existing = load_corrections(task_id)
+# ============ 纠偏历史 ============
+#
+# 纠偏记录以 JSON 行追加到 corrections.jsonl，序号保存在 corrections.seq，
+# 追加一条记录只需读写这两个小文件。corrections.md 只保存迁移前或通过
+# save_corrections 整体写入的文本，完整的 markdown 在 load_corrections 时渲染。
 
-    # 如果是空的，创建初始结构
-    if not existing:
-        existing = """# 纠偏历史
+CORRECTIONS_HEADER = """# 纠偏历史
 
 ## 摘要
 
 | # | 时间 | 纠偏者 | 原因 | 结果 |
 |---|------|--------|------|------|
-
----
-
-## 详细记录
-
 """
 
-    # 解析现有记录数量
-    import re
-    matches = re.findall(r'\| (\d+) \|', existing)
-    index = max([int(m) for m in matches], default=0) + 1
 
-    # 添加摘要行
+def _correction_summary_line(index: int, record: Dict[str, Any]) -> str:
+    """纠偏记录的摘要表格行"""
     timestamp = record.get("timestamp", datetime.now().strftime("%Y-%m-%d %H:%M"))
     corrector = record.get("corrector", "Archon")
     reason = record.get("reason", "")[:20]
     result = record.get("result", "")
+    return f"| {index} | {timestamp} | {corrector} | {reason} | {result} |\n"
 
-    summary_line = f"| {index} | {timestamp} | {corrector} | {reason} | {result} |\n"
 
-    # 在摘要表格末尾添加
-    parts = existing.split("---\n\n## 详细记录")
-    if len(parts) == 2:
-        # 在表格末尾添加新行
-        table_end = parts[0].rstrip()
-        parts[0] = table_end + "\n" + summary_line + "\n"
-        existing = parts[0] + "---\n\n## 详细记录" + parts[1]
-
-    # 添加详细记录
-    detail = f"""
+def _correction_detail(index: int, record: Dict[str, Any]) -> str:
+    """纠偏记录的详细段落"""
+    timestamp = record.get("timestamp", datetime.now().strftime("%Y-%m-%d %H:%M"))
+    corrector = record.get("corrector", "Archon")
+    result = record.get("result", "")
+    return f"""
 ### #{index} - {timestamp}
 
 **纠偏者**：{corrector}
@@ -427,9 +1766,144 @@ def append_correction(task_id: str, record: Dict[str, Any]) -> bool:
 
 ---
 """
-    existing += detail
 
-    return save_corrections(task_id, existing)
+
+def render_corrections(records: List[Dict[str, Any]], legacy: str = "") -> str:
+    """
+    把结构化纠偏记录渲染为 corrections.md 格式
+
+    Args:
+        records: 纠偏记录列表，每条包含 index 字段
+        legacy: 迁移前的 markdown 文本，附在末尾
+    """
+    if not records:
+        return legacy
+
+    rows = "".join(_correction_summary_line(r["index"], r) for r in records)
+    details = "".join(_correction_detail(r["index"], r) for r in records)
+    content = CORRECTIONS_HEADER + rows + "\n---\n\n## 详细记录\n\n" + details
+
+    if legacy:
+        content += "\n## 迁移前记录\n\n" + legacy
+    return content
+
+
+def max_correction_index(content: str) -> int:
+    """markdown 纠偏历史中的最大序号"""
+    return max((int(m) for m in re.findall(r'\| (\d+) \|', content)), default=0)
+
+
+def load_correction_records(records_file: Path) -> List[Dict[str, Any]]:
+    """读取结构化纠偏记录"""
+    records = []
+    if not records_file.exists():
+        return records
+
+    with open(records_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                logger.warning(f"跳过损坏的纠偏记录: {records_file}")
+    return records
+
+
+def _write_correction_seq(seq_file: Path, index: int) -> None:
+    """原子写入纠偏序号"""
+    _atomic_write_text(seq_file, str(index))
+
+
+def _read_correction_seq(task_dir: Path) -> int:
+    """
+    读取纠偏序号（调用方需持有 corrections.lock）
+
+    序号文件不存在时（旧任务）从已有的 markdown 和记录中推算一次
+    """
+    seq_file = task_dir / "corrections.seq"
+    try:
+        return int(seq_file.read_text().strip() or 0)
+    except FileNotFoundError:
+        pass
+
+    index = 0
+    legacy_file = task_dir / "corrections.md"
+    if legacy_file.exists():
+        index = max_correction_index(legacy_file.read_text(encoding='utf-8'))
+
+    for record in load_correction_records(task_dir / "corrections.jsonl"):
+        index = max(index, int(record.get("index", 0)))
+
+    _write_correction_seq(seq_file, index)
+    return index
+
+
+def load_corrections(task_id: str) -> str:
+    """加载纠偏历史（由结构化记录渲染）"""
+    engine = get_storage_engine()
+    if engine:
+        return engine.load_corrections(task_id)
+
+    task_dir = get_task_dir(task_id)
+    legacy_file = task_dir / "corrections.md"
+
+    try:
+        legacy = legacy_file.read_text(encoding='utf-8') if legacy_file.exists() else ""
+        records = load_correction_records(task_dir / "corrections.jsonl")
+        return render_corrections(records, legacy)
+    except Exception as e:
+        logger.error(f"读取纠偏历史失败 [{task_id}]: {e}")
+        return ""
+
+
+def save_corrections(task_id: str, content: str) -> bool:
+    """保存纠偏历史（整体替换为给定的 markdown 文本）"""
+    engine = get_storage_engine()
+    if engine:
+        return engine.save_corrections(task_id, content)
+
+    task_dir = ensure_task_dir(task_id)
+
+    try:
+        with _locked_file(task_dir / "corrections.lock"):
+            _atomic_write_text(task_dir / "corrections.md", content)
+            records_file = task_dir / "corrections.jsonl"
+            if records_file.exists():
+                records_file.unlink()
+            _write_correction_seq(task_dir / "corrections.seq", max_correction_index(content))
+        return True
+    except Exception as e:
+        logger.error(f"保存纠偏历史失败 [{task_id}]: {e}")
+        return False
+
+
+def append_correction(task_id: str, record: Dict[str, Any]) -> bool:
+    """追加纠偏记录"""
+    engine = get_storage_engine()
+    if engine:
+        return engine.append_correction(task_id, record)
+
+    task_dir = ensure_task_dir(task_id)
+
+    try:
+        with _locked_file(task_dir / "corrections.lock"):
+            # 先推进序号再写记录：中途崩溃只会跳过一个序号，不会重复
+            index = _read_correction_seq(task_dir) + 1
+            _write_correction_seq(task_dir / "corrections.seq", index)
+
+            record = dict(record, index=index)
+            record.setdefault("timestamp", datetime.now().strftime("%Y-%m-%d %H:%M"))
+            records_file = task_dir / "corrections.jsonl"
+            created = not records_file.exists()
+            with open(records_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                _sync_written(records_file, f, sync_dir=created)
+        return True
+    except Exception as e:
+        logger.error(f"追加纠偏记录失败 [{task_id}]: {e}")
+        return False
 
 
 # ============ Destination (Probe 模式) ============
@@ -454,7 +1928,7 @@ def save_destination(task_id: str, content: str) -> bool:
     destination_file = task_dir / "destination.md"
 
     try:
-        destination_file.write_text(content, encoding='utf-8')
+        _atomic_write_text(destination_file, content)
         return True
     except Exception as e:
         logger.error(f"保存任务目标失败 [{task_id}]: {e}")
@@ -462,6 +1936,32 @@ def save_destination(task_id: str, content: str) -> bool:
 
 
 # ============ Workflow (Cron 模式) ============
+#
+# task.md 和 workflow.md 是 Cron 提示词的输入。cron_inputs_signature 由两者的
+# 文件签名和进程内版本号组成，save_workflow / save_task_md 写入后版本号加一，
+# 调用方据此判断缓存的提示词是否仍然有效。
+
+_cron_inputs_versions: Dict[str, int] = {}
+_cron_inputs_lock = threading.Lock()
+
+
+def _bump_cron_inputs_version(task_id: str) -> None:
+    """提示词输入已改写，使基于旧签名的缓存失效"""
+    with _cron_inputs_lock:
+        _cron_inputs_versions[task_id] = _cron_inputs_versions.get(task_id, 0) + 1
+
+
+def cron_inputs_signature(task_id: str) -> Tuple:
+    """Cron 提示词输入签名：(版本号, task.md 签名, workflow.md 签名)"""
+    task_dir = get_task_dir(task_id)
+    with _cron_inputs_lock:
+        version = _cron_inputs_versions.get(task_id, 0)
+    return (
+        version,
+        _file_signature(task_dir / "task.md"),
+        _file_signature(task_dir / "workflow" / "workflow.md"),
+    )
+
 
 def ensure_workflow_dir(task_id: str) -> Path:
     """确保 workflow 目录存在"""
@@ -490,7 +1990,8 @@ def save_workflow(task_id: str, content: str) -> bool:
     workflow_file = workflow_dir / "workflow.md"
 
     try:
-        workflow_file.write_text(content, encoding='utf-8')
+        _atomic_write_text(workflow_file, content)
+        _bump_cron_inputs_version(task_id)
         return True
     except Exception as e:
         logger.error(f"保存 workflow 失败 [{task_id}]: {e}")
@@ -517,7 +2018,8 @@ def save_task_md(task_id: str, content: str) -> bool:
     task_md_file = task_dir / "task.md"
 
     try:
-        task_md_file.write_text(content, encoding='utf-8')
+        _atomic_write_text(task_md_file, content)
+        _bump_cron_inputs_version(task_id)
         return True
     except Exception as e:
         logger.error(f"保存任务描述失败 [{task_id}]: {e}")
@@ -12,8 +12,8 @@ from typing import Optional, List, Dict, Any
 
 from .types import StuckInfo, TaskMode
 from .state_store import (
-    get_base_dir, load_task_config, save_task_config,
-    get_task_status, set_task_status, append_log
+    get_base_dir, load_task_config, load_task_model, patch_task_config,
+    get_task_status, set_task_status, append_log, list_task_summaries
 )
 from .notifier import notify_task_stuck
 
@@ -28,14 +28,21 @@ STUCK_THRESHOLDS = {
 
 
 class StuckDetector:
-    """卡住检测器"""
+    """
+    卡住检测器
+
+    任务列表来自默认工作目录的任务索引，状态和配置也通过 state_store 读写，
+    因此只检测默认工作目录（get_base_dir）下的任务
+    """
 
-    def __init__(self, base_dir: Optional[Path] = None):
-        self.base_dir = base_dir or get_base_dir()
+    def __init__(self):
+        self.base_dir = get_base_dir()
 
     def scan_all_tasks(self) -> List[StuckInfo]:
         """
-        扫描所有任务，检测卡住状态
+        扫描所有活跃任务，检测卡住状态
+
+        通过任务索引只遍历 active 任务，已停止、已完成和已归档的任务不参与扫描
 
         Returns:
             卡住任务列表
@@ -45,16 +52,12 @@ class StuckDetector:
         if not self.base_dir.exists():
             return stuck_tasks
 
-        for task_dir in self.base_dir.iterdir():
-            if not task_dir.is_dir():
-                continue
-            if task_dir.name.startswith('.'):
-                continue
+        for summary in list_task_summaries(status="active"):
+            task_id = summary["task_id"]
+            task_dir = self.base_dir / task_id
+            task_mode = summary.get("mode") or self._get_task_mode(task_id)
 
-            task_id = task_dir.name
-            task_mode = self._get_task_mode(task_id)
-
-            if task_mode == "unknown":
+            if task_mode not in ("probe", "cron"):
                 continue
 
             # 检测是否卡住
@@ -131,16 +134,19 @@ class StuckDetector:
         task_dir: Path
     ) -> Optional[StuckInfo]:
         """检测 Probe 是否卡住"""
-        config = load_task_config(task_id)
+        config = load_task_model(task_id)
         if not config:
             return None
+        probe = config.get_field("probe")
+        if probe is None:
+            return None
 
         # 获取 transcript 路径
-        transcript_path = config.get("probe", {}).get("transcript_path")
+        transcript_path = probe.transcript_path
 
         if not transcript_path:
             # 尝试从 session_id 推断
-            session_id = config.get("probe", {}).get("session_id")
+            session_id = probe.session_id
             if session_id:
                 # 常见的 transcript 路径模式
                 possible_paths = [
@@ -162,7 +168,7 @@ class StuckDetector:
 
             if elapsed > STUCK_THRESHOLDS["probe_no_output"]:
                 # 检查进程是否存活
-                pid = config.get("probe", {}).get("pid")
+                pid = probe.pid
                 is_alive = self._is_process_alive(pid) if pid else False
 
                 return StuckInfo(
@@ -183,14 +189,16 @@ class StuckDetector:
         task_dir: Path
     ) -> Optional[StuckInfo]:
         """检测 Cron 任务是否卡住"""
-        config = load_task_config(task_id)
+        config = load_task_model(task_id)
         if not config:
             return None
+        execution = config.get_field("execution")
+        if execution is None:
+            return None
 
-        execution = config.get("execution", {})
-        last_run = execution.get("last_run")
-        last_result = execution.get("last_result")
-        timeout = config.get("execution", {}).get("timeout_minutes", STUCK_THRESHOLDS["cron_execution"])
+        last_run = execution.last_run
+        last_result = execution.last_result
+        timeout = execution.timeout_minutes or STUCK_THRESHOLDS["cron_execution"]
 
         # 检查是否正在执行中（有 last_run 但没有 last_result）
         if last_run and not last_result:
@@ -237,7 +245,11 @@ async def handle_stuck_tasks(stuck_tasks: List[StuckInfo]) -> None:
     """
     for stuck in stuck_tasks:
         logger.warning(f"检测到卡住任务: {stuck.task_id} ({stuck.stuck_type})")
-        append_log(stuck.task_id, "WARNING", f"任务卡住: {stuck.details}")
+        append_log(
+            stuck.task_id, "WARNING", f"任务卡住: {stuck.details}",
+            event="stuck", stuck_type=stuck.stuck_type,
+            stuck_minutes=stuck.stuck_duration_minutes
+        )
 
         # 发送通知
         notify_task_stuck(stuck.task_id, stuck.stuck_duration_minutes)
@@ -251,22 +263,18 @@ async def handle_stuck_tasks(stuck_tasks: List[StuckInfo]) -> None:
 
         elif stuck.stuck_type == "probe_no_output":
             # 更新任务状态
-            config = load_task_config(stuck.task_id)
-            if config:
-                config.setdefault("state", {})["status"] = "stuck"
-                save_task_config(stuck.task_id, config)
+            patch_task_config(stuck.task_id, {"state.status": "stuck"})
 
         elif stuck.stuck_type == "cron_execution_timeout":
             # 更新执行状态
-            config = load_task_config(stuck.task_id)
-            if config:
-                config.setdefault("execution", {})["last_result"] = "timeout"
-                config["execution"]["consecutive_failures"] = \
-                    config.get("execution", {}).get("consecutive_failures", 0) + 1
-                save_task_config(stuck.task_id, config)
+            patch_task_config(
+                stuck.task_id,
+                {"execution.last_result": "timeout"},
+                {"execution.consecutive_failures": 1}
+            )
 
 
-def run_stuck_detection(base_dir: Optional[Path] = None) -> List[StuckInfo]:
+def run_stuck_detection() -> List[StuckInfo]:
     """
     运行卡住检测的入口函数
 
@@ -278,12 +286,12 @@ def run_stuck_detection(base_dir: Optional[Path] = None) -> List[StuckInfo]:
     Returns:
         卡住任务列表（空列表表示没有卡住的任务）
     """
-    detector = StuckDetector(base_dir)
+    detector = StuckDetector()
     stuck_tasks = detector.scan_all_tasks()
 
     # 记录检测结果到日志
     if stuck_tasks:
-        log_file = (base_dir or get_base_dir()) / "stuck_detection.log"
+        log_file = detector.base_dir / "stuck_detection.log"
         timestamp = datetime.now().isoformat()
 
         try:
@@ -0,0 +1,301 @@
+"""
+daemon-archon 任务锁
+
+保证同一任务同一时刻只有一个检查/执行在运行：
+
+- 进程内：已持有的锁登记在内存中，同一守护进程内的重复触发直接拒绝，不访问文件系统
+- 跨进程：优先对 task.lock 加 fcntl.flock，进程退出时由内核自动释放；
+  不支持 flock 的平台用 O_CREAT|O_EXCL 原子创建锁文件，并写入租约，
+  持锁期间由心跳线程续租，租约过期或持有进程已退出的锁可被接管
+"""
+
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+from pathlib import Path
+from typing import Optional, Dict, Any
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# 租约时长与续租间隔（秒）
+LOCK_LEASE_SECONDS = 60
+LOCK_RENEW_INTERVAL = 20
+
+
+class _HeldLock:
+    """已持有的锁"""
+
+    __slots__ = ("path", "fd", "token")
+
+    def __init__(self, path: Path, fd: Optional[int], token: str):
+        self.path = path
+        self.fd = fd  # flock 模式下保持打开的文件描述符
+        self.token = token
+
+
+def _pid_alive(pid: Any) -> bool:
+    """检查进程是否存活"""
+    try:
+        os.kill(int(pid), 0)
+        return True
+    except (OSError, TypeError, ValueError):
+        return False
+
+
+class TaskLockManager:
+    """任务锁管理器"""
+
+    def __init__(
+        self,
+        lease_seconds: float = LOCK_LEASE_SECONDS,
+        renew_interval: float = LOCK_RENEW_INTERVAL,
+        use_flock: Optional[bool] = None
+    ):
+        """
+        初始化锁管理器
+
+        Args:
+            lease_seconds: 租约时长（秒）
+            renew_interval: 续租间隔（秒）
+            use_flock: 是否使用 flock，默认在支持时使用
+        """
+        self.lease_seconds = lease_seconds
+        self.renew_interval = renew_interval
+        self.use_flock = fcntl is not None if use_flock is None else use_flock
+        self._held: Dict[str, Optional[_HeldLock]] = {}
+        self._mutex = threading.Lock()
+        self._renewer: Optional[threading.Thread] = None
+
+    # ============ 对外接口 ============
+
+    def acquire(self, task_id: str, lock_file: Path) -> bool:
+        """
+        非阻塞获取任务锁
+
+        Returns:
+            是否成功获取
+        """
+        with self._mutex:
+            if task_id in self._held:
+                return False
+            # 占位，防止本进程内并发获取
+            self._held[task_id] = None
+
+        held = None
+        try:
+            if self.use_flock:
+                held = self._acquire_flock(lock_file)
+            else:
+                held = self._acquire_exclusive(lock_file)
+        finally:
+            with self._mutex:
+                if held is None:
+                    del self._held[task_id]
+                else:
+                    self._held[task_id] = held
+                    self._ensure_renewer()
+
+        return held is not None
+
+    def release(self, task_id: str) -> bool:
+        """释放本进程持有的任务锁"""
+        with self._mutex:
+            held = self._held.get(task_id)
+            if held is None:
+                return True
+            del self._held[task_id]
+
+        if held.fd is not None:
+            try:
+                os.ftruncate(held.fd, 0)
+                fcntl.flock(held.fd, fcntl.LOCK_UN)
+            finally:
+                os.close(held.fd)
+            return True
+
+        # 只删除自己的锁文件，已被接管的不动
+        if self._read_lease(held.path).get("token") == held.token:
+            try:
+                held.path.unlink()
+            except FileNotFoundError:
+                pass
+        return True
+
+    def is_locked(self, task_id: str, lock_file: Path) -> bool:
+        """任务是否被本进程或其他进程锁定"""
+        with self._mutex:
+            if task_id in self._held:
+                return True
+
+        if not lock_file.exists():
+            return False
+
+        if not self.use_flock:
+            return self._lease_valid(self._read_lease(lock_file))
+
+        try:
+            fd = os.open(str(lock_file), os.O_RDONLY)
+        except FileNotFoundError:
+            return False
+        try:
+            fcntl.flock(fd, fcntl.LOCK_SH | fcntl.LOCK_NB)
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            return False
+        except BlockingIOError:
+            return True
+        finally:
+            os.close(fd)
+
+    # ============ 租约 ============
+
+    def _lease_content(self, token: str) -> bytes:
+        """租约内容"""
+        return json.dumps({
+            "pid": os.getpid(),
+            "token": token,
+            "expires_at": time.time() + self.lease_seconds
+        }).encode('utf-8')
+
+    @staticmethod
+    def _read_lease(lock_file: Path) -> Dict[str, Any]:
+        """读取租约，文件不存在或格式不对（如旧版 "pid:时间" 格式）时返回空字典"""
+        try:
+            data = json.loads(lock_file.read_text())
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _lease_valid(lease: Dict[str, Any]) -> bool:
+        """租约未过期且持有进程存活"""
+        return lease.get("expires_at", 0) > time.time() and _pid_alive(lease.get("pid"))
+
+    def _write_lease(self, held: _HeldLock) -> None:
+        """写入（续期）租约"""
+        content = self._lease_content(held.token)
+
+        if held.fd is not None:
+            os.ftruncate(held.fd, 0)
+            os.pwrite(held.fd, content, 0)
+            return
+
+        if self._read_lease(held.path).get("token") != held.token:
+            logger.warning(f"任务锁已被其他进程接管: {held.path}")
+            return
+
+        temp_file = held.path.with_name(f"{held.path.name}.{held.token}")
+        temp_file.write_bytes(content)
+        os.replace(str(temp_file), str(held.path))
+
+    def _ensure_renewer(self) -> None:
+        """启动续租线程（调用方需持有 _mutex）"""
+        if self._renewer is not None and self._renewer.is_alive():
+            return
+
+        self._renewer = threading.Thread(
+            target=self._renew_loop,
+            name="archon-lock-renewer",
+            daemon=True
+        )
+        self._renewer.start()
+
+    def _renew_loop(self) -> None:
+        """定期续租，所有锁释放后退出"""
+        while True:
+            time.sleep(self.renew_interval)
+
+            with self._mutex:
+                held_locks = [h for h in self._held.values() if h is not None]
+                if not held_locks and not self._held:
+                    self._renewer = None
+                    return
+
+            for held in held_locks:
+                try:
+                    self._write_lease(held)
+                except Exception as e:
+                    logger.error(f"任务锁续租失败 [{held.path}]: {e}")
+
+    # ============ 加锁 ============
+
+    def _acquire_flock(self, lock_file: Path) -> Optional[_HeldLock]:
+        """用 flock 加锁"""
+        for _ in range(3):
+            fd = os.open(str(lock_file), os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                return None
+
+            # 打开与加锁之间文件可能被删除或替换，确认锁住的仍是路径上的文件
+            try:
+                same_file = os.fstat(fd).st_ino == os.stat(str(lock_file)).st_ino
+            except FileNotFoundError:
+                same_file = False
+
+            if same_file:
+                held = _HeldLock(lock_file, fd, uuid.uuid4().hex)
+                self._write_lease(held)
+                return held
+
+            os.close(fd)
+
+        return None
+
+    def _acquire_exclusive(self, lock_file: Path) -> Optional[_HeldLock]:
+        """用 O_CREAT|O_EXCL 创建锁文件"""
+        for _ in range(2):
+            token = uuid.uuid4().hex
+            try:
+                fd = os.open(str(lock_file), os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+            except FileExistsError:
+                if not self._break_stale_lock(lock_file):
+                    return None
+                continue
+
+            try:
+                os.write(fd, self._lease_content(token))
+            finally:
+                os.close(fd)
+            return _HeldLock(lock_file, None, token)
+
+        return None
+
+    def _break_stale_lock(self, lock_file: Path) -> bool:
+        """
+        接管过期的锁
+
+        先把锁文件原子改名，只有一个进程能改名成功；若改名拿到的是别人刚创建的
+        有效锁，再用 link 放回原处（原处已有文件时 link 失败，不会覆盖）
+
+        Returns:
+            是否可以重新尝试创建
+        """
+        if self._lease_valid(self._read_lease(lock_file)):
+            return False
+
+        stale_file = lock_file.with_name(f"{lock_file.name}.stale.{uuid.uuid4().hex}")
+        try:
+            os.rename(str(lock_file), str(stale_file))
+        except FileNotFoundError:
+            return True
+
+        try:
+            if self._lease_valid(self._read_lease(stale_file)):
+                try:
+                    os.link(str(stale_file), str(lock_file))
+                except FileExistsError:
+                    pass
+                return False
+            return True
+        finally:
+            stale_file.unlink()
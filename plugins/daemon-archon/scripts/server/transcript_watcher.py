@@ -0,0 +1,458 @@
+"""
+daemon-archon transcript 文件监听
+
+监听活跃 Probe 的 transcript 文件，有新内容写入时立即触发检查，
+不必等到下一次定时轮询。定时检查仍然保留，作为低频兜底。
+
+后端按 watcher.backend 选择：
+
+- watchdog：需要安装 watchdog，跨平台
+- inotify：Linux 下通过 ctypes 直接调用 inotify，无额外依赖
+- auto：优先 watchdog，其次 inotify，都不可用时只保留轮询（默认）
+- none：不监听
+
+监听的是 transcript 所在目录，文件在开始监听之后才创建或被替换时同样能收到事件。
+"""
+
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import asyncio
+import ctypes
+import ctypes.util
+import logging
+import threading
+from typing import Optional, Dict, Set, Any, Callable, Awaitable
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+logger = logging.getLogger(__name__)
+
+WATCHER_BACKENDS = ("auto", "watchdog", "inotify", "none")
+
+
+# ============ watchdog 后端 ============
+
+class _WatchdogHandler(FileSystemEventHandler):
+    """只关心写入类事件，读取 transcript 产生的打开/关闭事件不触发检查"""
+
+    def __init__(self, on_path: Callable[[str], None]):
+        super().__init__()
+        self._on_path = on_path
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self._on_path(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self._on_path(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self._on_path(event.dest_path)
+
+
+class _WatchdogBackend:
+    """基于 watchdog 的目录监听"""
+
+    name = "watchdog"
+
+    def __init__(self, on_path: Callable[[str], None]):
+        if Observer is None:
+            raise RuntimeError("未安装 watchdog")
+        self._handler = _WatchdogHandler(on_path)
+        self._observer = Observer()
+        self._watches: Dict[str, Any] = {}
+
+    def start(self) -> None:
+        self._observer.start()
+
+    def stop(self) -> None:
+        self._observer.stop()
+        self._observer.join(timeout=5)
+
+    def add_dir(self, directory: str) -> None:
+        self._watches[directory] = self._observer.schedule(self._handler, directory, recursive=False)
+
+    def remove_dir(self, directory: str) -> None:
+        watch = self._watches.pop(directory, None)
+        if watch is not None:
+            self._observer.unschedule(watch)
+
+
+# ============ inotify 后端 ============
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+
+# struct inotify_event { int wd; uint32_t mask; uint32_t cookie; uint32_t len; char name[]; }
+_INOTIFY_EVENT = struct.Struct("iIII")
+
+
+def _load_libc():
+    """加载支持 inotify 的 libc，不可用时返回 None"""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    except OSError:
+        return None
+    if not hasattr(libc, "inotify_init1"):
+        return None
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    return libc
+
+
+class _InotifyBackend:
+    """基于 Linux inotify 的目录监听（ctypes，后台线程读取事件）"""
+
+    name = "inotify"
+    MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+    def __init__(self, on_path: Callable[[str], None]):
+        self._libc = _load_libc()
+        if self._libc is None:
+            raise RuntimeError("当前平台不支持 inotify")
+
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_init1 失败: {os.strerror(err)}")
+
+        self._on_path = on_path
+        self._wds: Dict[int, str] = {}
+        self._dirs: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._stop_r, self._stop_w = os.pipe()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="archon-inotify", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        os.write(self._stop_w, b"\0")
+        if self._thread:
+            self._thread.join(timeout=5)
+        for fd in (self._fd, self._stop_r, self._stop_w):
+            os.close(fd)
+
+    def add_dir(self, directory: str) -> None:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), self.MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_add_watch 失败: {os.strerror(err)}", directory)
+        with self._lock:
+            self._wds[wd] = directory
+            self._dirs[directory] = wd
+
+    def remove_dir(self, directory: str) -> None:
+        with self._lock:
+            wd = self._dirs.pop(directory, None)
+            if wd is None:
+                return
+            self._wds.pop(wd, None)
+        self._libc.inotify_rm_watch(self._fd, wd)
+
+    def _run(self) -> None:
+        """读取 inotify 事件，直到收到停止信号"""
+        while True:
+            readable, _, _ = select.select([self._fd, self._stop_r], [], [])
+            if self._stop_r in readable:
+                return
+
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except OSError as e:
+                if e.errno in (errno.EAGAIN, errno.EINTR):
+                    continue
+                logger.error(f"读取 inotify 事件失败: {e}")
+                return
+
+            offset = 0
+            while offset + _INOTIFY_EVENT.size <= len(data):
+                wd, _mask, _cookie, length = _INOTIFY_EVENT.unpack_from(data, offset)
+                offset += _INOTIFY_EVENT.size
+                name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+
+                with self._lock:
+                    directory = self._wds.get(wd)
+                if directory and name:
+                    self._on_path(os.path.join(directory, os.fsdecode(name)))
+
+
+_BACKENDS = {
+    "watchdog": _WatchdogBackend,
+    "inotify": _InotifyBackend,
+}
+
+
+# ============ 监听器 ============
+
+class TranscriptWatcher:
+    """
+    transcript 文件监听器
+
+    文件变化由后端线程转交到事件循环；同一任务第一次变化后等待 debounce_ms，
+    期间的后续写入合并为一次检查，持续写入时也不会推迟检查。
+
+    同一任务两次检查之间至少间隔 min_interval（watch 时指定，包括定时检查），
+    间隔内的变化推迟到间隔结束后合并为一次检查；ignore_writes 标记的时间窗口内
+    的变化来自服务自身（注入纠偏指令），直接忽略
+    """
+
+    def __init__(
+        self,
+        on_change: Callable[[str], Awaitable[None]],
+        backend: str = "auto",
+        debounce_ms: int = 2000
+    ):
+        """
+        初始化监听器
+
+        Args:
+            on_change: 文件变化后调用的协程函数，参数为 task_id
+            backend: 监听后端 (auto/watchdog/inotify/none)
+            debounce_ms: 合并连续写入的时间窗口（毫秒）
+        """
+        self._on_change = on_change
+        self._backend_name = backend
+        self._debounce = max(0, debounce_ms) / 1000
+        self._backend = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        self._task_paths: Dict[str, str] = {}
+        self._path_tasks: Dict[str, Set[str]] = {}
+        self._dir_refs: Dict[str, int] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._running: Set[asyncio.Task] = set()
+        self._min_interval: Dict[str, float] = {}
+        self._last_check: Dict[str, float] = {}
+        self._ignore_until: Dict[str, float] = {}
+        self._events = 0
+        self._triggers = 0
+        self._deferred = 0
+        self._ignored = 0
+
+    @classmethod
+    def from_settings(
+        cls,
+        settings: Dict[str, Any],
+        on_change: Callable[[str], Awaitable[None]]
+    ) -> "TranscriptWatcher":
+        """按 watcher 配置创建监听器"""
+        backend = settings.get("backend", "auto") if settings.get("enabled", False) else "none"
+        if backend not in WATCHER_BACKENDS:
+            logger.warning(f"未知的监听后端 {backend}，使用 auto")
+            backend = "auto"
+        return cls(on_change, backend=backend, debounce_ms=int(settings.get("debounce_ms", 2000)))
+
+    @property
+    def active(self) -> bool:
+        """是否有可用的监听后端"""
+        return self._backend is not None
+
+    def start(self) -> None:
+        """在当前事件循环中启动监听"""
+        self._loop = asyncio.get_event_loop()
+
+        names = ("watchdog", "inotify") if self._backend_name == "auto" else (self._backend_name,)
+        for name in names:
+            if name not in _BACKENDS:
+                continue
+            try:
+                self._backend = _BACKENDS[name](self._on_path)
+                self._backend.start()
+                logger.info(f"transcript 监听已启动，后端: {name}")
+                return
+            except Exception as e:
+                self._backend = None
+                logger.info(f"transcript 监听后端 {name} 不可用: {e}")
+
+        if self._backend_name != "none":
+            logger.warning("没有可用的 transcript 监听后端，仅使用定时检查")
+
+    def stop(self) -> None:
+        """停止监听，取消尚未触发的检查"""
+        for handle in self._timers.values():
+            handle.cancel()
+        self._timers.clear()
+        self._last_check.clear()
+        self._ignore_until.clear()
+
+        if self._backend is not None:
+            try:
+                self._backend.stop()
+            except Exception as e:
+                logger.error(f"停止 transcript 监听失败: {e}")
+            self._backend = None
+
+        with self._lock:
+            self._task_paths.clear()
+            self._path_tasks.clear()
+            self._dir_refs.clear()
+            self._min_interval.clear()
+
+    # ============ 注册 ============
+
+    def watch(self, task_id: str, transcript_path: str, min_interval_seconds: float = 0) -> bool:
+        """
+        监听任务的 transcript 文件
+
+        Args:
+            task_id: 任务 ID
+            transcript_path: transcript 文件路径
+            min_interval_seconds: 两次检查之间的最小间隔（秒）
+
+        Returns:
+            是否处于监听状态
+        """
+        if self._backend is None or not transcript_path:
+            return False
+
+        directory = os.path.realpath(os.path.dirname(os.path.expanduser(transcript_path)))
+        path = os.path.join(directory, os.path.basename(transcript_path))
+
+        with self._lock:
+            if self._task_paths.get(task_id) == path:
+                self._min_interval[task_id] = max(0.0, min_interval_seconds)
+                return True
+
+        self.unwatch(task_id)
+
+        with self._lock:
+            if directory not in self._dir_refs:
+                try:
+                    self._backend.add_dir(directory)
+                except Exception as e:
+                    logger.warning(f"监听 transcript 目录失败 [{task_id}]: {e}")
+                    return False
+            self._dir_refs[directory] = self._dir_refs.get(directory, 0) + 1
+            self._task_paths[task_id] = path
+            self._path_tasks.setdefault(path, set()).add(task_id)
+            self._min_interval[task_id] = max(0.0, min_interval_seconds)
+
+        logger.info(f"开始监听 transcript [{task_id}]: {path}")
+        return True
+
+    def unwatch(self, task_id: str) -> None:
+        """取消监听任务的 transcript 文件"""
+        handle = self._timers.pop(task_id, None)
+        if handle:
+            handle.cancel()
+        self._last_check.pop(task_id, None)
+        self._ignore_until.pop(task_id, None)
+
+        with self._lock:
+            self._min_interval.pop(task_id, None)
+            path = self._task_paths.pop(task_id, None)
+            if path is None:
+                return
+
+            tasks = self._path_tasks.get(path)
+            if tasks:
+                tasks.discard(task_id)
+                if not tasks:
+                    del self._path_tasks[path]
+
+            directory = os.path.dirname(path)
+            self._dir_refs[directory] -= 1
+            if self._dir_refs[directory] > 0:
+                return
+            del self._dir_refs[directory]
+
+            try:
+                self._backend.remove_dir(directory)
+            except Exception as e:
+                logger.warning(f"取消监听 transcript 目录失败 [{task_id}]: {e}")
+
+    def is_watching(self, task_id: str) -> bool:
+        """任务的 transcript 是否处于监听状态"""
+        with self._lock:
+            return task_id in self._task_paths
+
+    def note_check(self, task_id: str) -> None:
+        """记录一次检查（定时或文件变化触发），最小间隔从此刻开始计算"""
+        self._last_check[task_id] = time.monotonic()
+
+    def ignore_writes(self, task_id: str, seconds: float) -> None:
+        """接下来 seconds 秒内的变化来自服务自身的写入，不触发检查"""
+        self._ignore_until[task_id] = time.monotonic() + max(0.0, seconds)
+
+    # ============ 事件 ============
+
+    def _on_path(self, path: str) -> None:
+        """后端线程回调：文件发生变化"""
+        with self._lock:
+            task_ids = list(self._path_tasks.get(path, ()))
+        if not task_ids or self._loop is None:
+            return
+
+        self._events += 1
+        for task_id in task_ids:
+            try:
+                self._loop.call_soon_threadsafe(self._schedule, task_id)
+            except RuntimeError:
+                # 事件循环已关闭
+                return
+
+    def _schedule(self, task_id: str) -> None:
+        """窗口内第一次变化时安排检查，后续变化合并；距上次检查不足最小间隔时推迟"""
+        if task_id in self._timers or not self.is_watching(task_id):
+            return
+
+        now = time.monotonic()
+        if now < self._ignore_until.get(task_id, 0.0):
+            self._ignored += 1
+            return
+
+        delay = self._debounce
+        last = self._last_check.get(task_id)
+        if last is not None:
+            remaining = last + self._min_interval.get(task_id, 0.0) - now
+            if remaining > delay:
+                delay = remaining
+                self._deferred += 1
+        self._timers[task_id] = self._loop.call_later(delay, self._fire, task_id)
+
+    def _fire(self, task_id: str) -> None:
+        """触发检查"""
+        self._timers.pop(task_id, None)
+        self.note_check(task_id)
+        self._triggers += 1
+        task = self._loop.create_task(self._run(task_id))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, task_id: str) -> None:
+        try:
+            await self._on_change(task_id)
+        except Exception as e:
+            logger.error(f"transcript 变化处理失败 [{task_id}]: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """监听统计"""
+        with self._lock:
+            return {
+                "backend": self._backend.name if self._backend else None,
+                "watched_tasks": len(self._task_paths),
+                "watched_dirs": len(self._dir_refs),
+                "pending": len(self._timers),
+                "events": self._events,
+                "triggers": self._triggers,
+                "deferred": self._deferred,
+                "ignored": self._ignored,
+            }
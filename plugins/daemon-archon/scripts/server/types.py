@@ -2,13 +2,19 @@
 daemon-archon 类型定义
 
 定义所有核心数据结构和类型
+
+任务配置相关的数据类由 @state_model 声明：带 __slots__，并提供 from_dict / to_dict
+编解码。状态存储读出配置后直接物化为这些对象，执行器按属性访问字段。
 """
 
 from enum import Enum
-from typing import Optional, List, Dict, Any
-from dataclasses import dataclass, field
+from typing import Optional, List, Dict, Any, Union, Callable
+from dataclasses import dataclass, field, fields, MISSING
 from datetime import datetime
 
+# 任务配置结构版本，写入 config.json 的 schema_version 字段
+SCHEMA_VERSION = 1
+
 
 class TaskMode(str, Enum):
     """任务模式"""
@@ -21,6 +27,8 @@ class TaskStatus(str, Enum):
     ACTIVE = "active"
     STOPPED = "stopped"
     PAUSED = "paused"
+    STUCK = "stuck"
+    COMPLETED = "completed"
 
 
 class ProbeStatus(str, Enum):
@@ -41,8 +49,200 @@ class CronScheduleKind(str, Enum):
     CRON = "cron"       # Cron 表达式
 
 
-@dataclass
-class CronSchedule:
+# ============ 状态模型 ============
+
+def _copy_value(value: Any) -> Any:
+    """复制 JSON 结构"""
+    if isinstance(value, dict):
+        return {k: _copy_value(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy_value(v) for v in value]
+    return value
+
+
+def _coerce_enum(enum_type: type, value: Any) -> Any:
+    """转换为枚举，未知取值原样保留"""
+    try:
+        return enum_type(value)
+    except ValueError:
+        return value
+
+
+class StateModel:
+    """
+    状态模型基类
+
+    from_dict 时未识别的字段保存在 _extras 中，to_dict 时原样写回，
+    新版本写入的字段经旧版本读写后不会丢失。输入中缺失的字段记录在 _absent 中
+    （字段名 -> 补上的初始值），未被写入前 to_dict 不输出，不会凭空多出
+    name: None 或默认的 state 等字段。
+    """
+
+    __slots__ = ("_extras", "_absent")
+
+    # [(字段名, 嵌套模型类型, 枚举类型)]，由 state_model 生成
+    _codec_fields: tuple = ()
+    _codec_names: frozenset = frozenset()
+    _codec_required: frozenset = frozenset()
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]):
+        """从字典构造（data 中的列表和字典直接引用，不复制）"""
+        kwargs = {}
+        absent = []
+        for name, model, enum_type in cls._codec_fields:
+            if name in data:
+                value = data[name]
+                if model is not None:
+                    if isinstance(value, dict):
+                        value = model.from_dict(value)
+                elif enum_type is not None and value is not None:
+                    value = _coerce_enum(enum_type, value)
+                kwargs[name] = value
+            else:
+                absent.append(name)
+                if name in cls._codec_required:
+                    kwargs[name] = None
+
+        obj = cls(**kwargs)
+        if absent:
+            obj._mark_absent(absent)
+        if not cls._codec_names.issuperset(data):
+            obj._extras = {k: v for k, v in data.items() if k not in cls._codec_names}
+        return obj
+
+    def _mark_absent(self, names) -> None:
+        """记录缺失字段及补上的初始值；缺失的嵌套模型整体视为缺失"""
+        absent = {}
+        for name in names:
+            value = getattr(self, name)
+            if isinstance(value, StateModel):
+                value._mark_absent(value._codec_names)
+                absent[name] = None
+            else:
+                absent[name] = _copy_value(value)
+        self._absent = absent
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可直接序列化的字典（新对象，修改不影响模型）"""
+        data = {}
+        absent = getattr(self, "_absent", None)
+        for name, _, _ in self._codec_fields:
+            value = getattr(self, name)
+            if isinstance(value, StateModel):
+                value = value.to_dict()
+                if not value and absent and name in absent:
+                    continue
+            elif absent and name in absent and value == absent[name]:
+                continue
+            elif isinstance(value, Enum):
+                value = value.value
+            elif isinstance(value, (dict, list)):
+                value = _copy_value(value)
+            data[name] = value
+
+        extras = getattr(self, "_extras", None)
+        if extras:
+            for key, value in extras.items():
+                data[key] = _copy_value(value)
+        return data
+
+    def clone(self):
+        """深复制（不经过字典）"""
+        obj = object.__new__(type(self))
+        for name, _, _ in self._codec_fields:
+            value = getattr(self, name)
+            if isinstance(value, StateModel):
+                value = value.clone()
+            elif isinstance(value, (dict, list)):
+                value = _copy_value(value)
+            object.__setattr__(obj, name, value)
+
+        extras = getattr(self, "_extras", None)
+        if extras:
+            obj._extras = _copy_value(extras)
+        absent = getattr(self, "_absent", None)
+        if absent:
+            obj._absent = _copy_value(absent)
+        return obj
+
+    def get_field(self, name: str, default: Any = None) -> Any:
+        """读取字段，未声明的字段从 _extras 中读取"""
+        if name in self._codec_names:
+            return getattr(self, name)
+        return (getattr(self, "_extras", None) or {}).get(name, default)
+
+    def set_field(self, name: str, value: Any) -> None:
+        """写入字段：字典写入嵌套模型字段时转换为模型，未声明的字段写入 _extras"""
+        absent = getattr(self, "_absent", None)
+        if absent:
+            absent.pop(name, None)
+
+        if name not in self._codec_names:
+            extras = getattr(self, "_extras", None)
+            if extras is None:
+                extras = self._extras = {}
+            extras[name] = value
+            return
+
+        for field_name, model, enum_type in self._codec_fields:
+            if field_name == name:
+                if model is not None and isinstance(value, dict):
+                    value = model.from_dict(value)
+                elif enum_type is not None and value is not None:
+                    value = _coerce_enum(enum_type, value)
+                break
+        setattr(self, name, value)
+
+
+def _codec_target(tp: Any) -> tuple:
+    """字段类型 -> (嵌套模型类型, 枚举类型)，Optional[X] 按 X 处理"""
+    if getattr(tp, "__origin__", None) is Union:
+        args = [a for a in tp.__args__ if a is not type(None)]
+        tp = args[0] if len(args) == 1 else None
+
+    if isinstance(tp, type):
+        if issubclass(tp, StateModel):
+            return tp, None
+        if issubclass(tp, Enum):
+            return None, tp
+    return None, None
+
+
+def state_model(cls):
+    """
+    声明状态模型：生成 dataclass，并重建为带 __slots__ 的类
+
+    Python 3.10 之前 dataclass 不支持 slots=True，这里按字段名生成 __slots__，
+    同时预先计算编解码用到的字段表，from_dict / to_dict 时不再反射字段类型。
+    """
+    cls = dataclass(cls)
+    all_fields = fields(cls)
+    inherited = set()
+    for base in cls.__mro__[1:]:
+        inherited.update(getattr(base, "__slots__", ()))
+
+    namespace = dict(cls.__dict__)
+    own = tuple(f.name for f in all_fields if f.name not in inherited)
+    for name in own:
+        # 默认值已记录在生成的 __init__ 中，同名类属性会与 slot 冲突
+        namespace.pop(name, None)
+    namespace.pop("__dict__", None)
+    namespace.pop("__weakref__", None)
+    namespace["__slots__"] = own
+
+    namespace["_codec_fields"] = tuple((f.name,) + _codec_target(f.type) for f in all_fields)
+    namespace["_codec_names"] = frozenset(f.name for f in all_fields)
+    namespace["_codec_required"] = frozenset(
+        f.name for f in all_fields
+        if f.default is MISSING and f.default_factory is MISSING
+    )
+
+    return type(cls)(cls.__name__, cls.__bases__, namespace)
+
+
+@state_model
+class CronSchedule(StateModel):
     """Cron 调度配置"""
     kind: CronScheduleKind
     # at 模式: 执行时间戳 (毫秒)
@@ -57,8 +257,8 @@ class CronSchedule:
     tz: Optional[str] = None
 
 
-@dataclass
-class ProbeConfig:
+@state_model
+class ProbeConfig(StateModel):
     """Probe 配置"""
     session_id: str
     pid: Optional[int] = None
@@ -69,8 +269,8 @@ class ProbeConfig:
     transcript_path: Optional[str] = None
 
 
-@dataclass
-class ScheduleConfig:
+@state_model
+class ScheduleConfig(StateModel):
     """调度配置"""
     check_interval_minutes: int = 5
     next_check: Optional[str] = None
@@ -78,24 +278,24 @@ class ScheduleConfig:
     next_run: Optional[str] = None
 
 
-@dataclass
-class CorrectionConfig:
+@state_model
+class CorrectionConfig(StateModel):
     """纠偏配置"""
     max_auto_corrections: int = 3
     current_count: int = 0
     escalate_after_failures: int = 2
 
 
-@dataclass
-class CriteriaConfig:
+@state_model
+class CriteriaConfig(StateModel):
     """判断标准配置"""
     success_indicators: List[str] = field(default_factory=lambda: ["任务完成", "测试通过"])
     failure_indicators: List[str] = field(default_factory=lambda: ["错误", "失败", "Error"])
     completion_keywords: List[str] = field(default_factory=lambda: ["任务完成"])
 
 
-@dataclass
-class ExecutionConfig:
+@state_model
+class ExecutionConfig(StateModel):
     """执行配置 (Cron 模式)"""
     timeout_minutes: int = 10
     last_run: Optional[str] = None
@@ -103,10 +303,23 @@ class ExecutionConfig:
     run_count: int = 0
     consecutive_failures: int = 0
     max_consecutive_failures: int = 3
+    last_run_id: Optional[str] = None  # 最近一次执行的 run_id，输出位于 runs/<run_id>.log
 
 
-@dataclass
-class NotificationRules:
+@state_model
+class MemoizeConfig(StateModel):
+    """结果复用配置 (Cron 模式)：输入指纹未变化且未超过 TTL 时不调用 Claude CLI，复用上次结果"""
+    enabled: bool = False
+    files: List[str] = field(default_factory=list)  # project_path 下的文件或 glob，内容计入指纹
+    commands: List[str] = field(default_factory=list)  # 在 project_path 下执行，退出码和标准输出计入指纹
+    ttl_minutes: float = 60  # 0 表示不过期
+    fingerprint: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    result_at_ms: Optional[int] = None
+
+
+@state_model
+class NotificationRules(StateModel):
     """通知规则"""
     notify_on_error: bool = True
     notify_on_success: bool = False
@@ -117,16 +330,18 @@ class NotificationRules:
     quiet_hours: Optional[str] = None
 
 
-@dataclass
-class TaskState:
+@state_model
+class TaskState(StateModel):
     """任务状态"""
     status: TaskStatus = TaskStatus.ACTIVE
     last_check: Optional[str] = None
     last_correction: Optional[str] = None
+    last_transcript_offset: int = 0
+    adaptive_interval_minutes: Optional[float] = None  # 自适应调整后的检查间隔，为空时使用配置值
 
 
-@dataclass
-class CronJobState:
+@state_model
+class CronJobState(StateModel):
     """Cron 任务运行时状态 (借鉴 OpenClaw)"""
     next_run_at_ms: Optional[int] = None
     last_run_at_ms: Optional[int] = None
@@ -136,8 +351,8 @@ class CronJobState:
     last_error: Optional[str] = None
 
 
-@dataclass
-class TaskConfig:
+@state_model
+class TaskConfig(StateModel):
     """任务配置基类"""
     task_id: str
     mode: TaskMode
@@ -155,8 +370,11 @@ class TaskConfig:
     # 通知规则
     notification: NotificationRules = field(default_factory=NotificationRules)
 
+    # 配置结构版本
+    schema_version: int = SCHEMA_VERSION
 
-@dataclass
+
+@state_model
 class ProbeTaskConfig(TaskConfig):
     """Probe 模式任务配置"""
     probe: ProbeConfig = field(default_factory=lambda: ProbeConfig(session_id=""))
@@ -164,15 +382,47 @@ class ProbeTaskConfig(TaskConfig):
     criteria: CriteriaConfig = field(default_factory=CriteriaConfig)
 
 
-@dataclass
+@state_model
 class CronTaskConfig(TaskConfig):
     """Cron 模式任务配置"""
     execution: ExecutionConfig = field(default_factory=ExecutionConfig)
     cron_state: CronJobState = field(default_factory=CronJobState)
+    # 调度类型 (at/every/cron)，为空时按 schedule 中的 cron_expression / check_interval_minutes
+    cron_schedule: Optional[CronSchedule] = None
+    # 结果复用，为空时每次都调用 Claude CLI
+    memoize: Optional[MemoizeConfig] = None
     workflow_path: Optional[str] = None
     task_md_path: Optional[str] = None
 
 
+# 旧版本配置 -> 下一版本的迁移函数，按版本号依次执行
+_CONFIG_MIGRATIONS: Dict[int, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+    # 版本 0：没有 schema_version 字段的配置，结构与版本 1 相同
+    0: lambda data: data,
+}
+
+_TASK_MODELS = {
+    TaskMode.PROBE.value: ProbeTaskConfig,
+    TaskMode.CRON.value: CronTaskConfig,
+}
+
+
+def migrate_config(data: Dict[str, Any]) -> Dict[str, Any]:
+    """把旧版本配置迁移到 SCHEMA_VERSION（原地修改）"""
+    version = data.get("schema_version") or 0
+    while version < SCHEMA_VERSION:
+        data = _CONFIG_MIGRATIONS[version](data)
+        version += 1
+        data["schema_version"] = version
+    return data
+
+
+def task_config_from_dict(data: Dict[str, Any]) -> TaskConfig:
+    """按 mode 把配置字典物化为 ProbeTaskConfig / CronTaskConfig"""
+    model = _TASK_MODELS.get(data.get("mode"), TaskConfig)
+    return model.from_dict(migrate_config(data))
+
+
 @dataclass
 class StuckInfo:
     """卡住信息"""
@@ -237,8 +487,76 @@ class GlobalSettings:
         level: str = "INFO"
         max_log_size_mb: int = 10
         max_log_files: int = 5
+        flush_interval_ms: int = 500
+        flush_batch_size: int = 256
+
+    @dataclass
+    class StorageSettings:
+        engine: str = "json"  # json / sqlite
+        sqlite_path: Optional[str] = None
+        config_cache_size: int = 256
+        durability: str = "none"  # none / fsync / group
+        group_commit_ms: int = 50
+        serializer: str = "json"  # json / compact / msgpack
+
+    @dataclass
+    class ArchiveSettings:
+        enabled: bool = False
+        after_days: int = 30
+        interval_minutes: int = 60
+        path: Optional[str] = None
+
+    @dataclass
+    class SchedulerSettings:
+        jobstore: str = "sqlite"  # sqlite / memory
+        jobstore_path: Optional[str] = None
+        catch_up: str = "run_once"  # skip / run_once / run_all
+        max_catch_up_runs: int = 3
+        jitter: str = "none"  # none / hash / spread
+        cron_jitter_seconds: int = 60
+        adaptive_probe_interval: bool = False
+        min_probe_interval_minutes: float = 1
+        max_probe_interval_minutes: float = 30
+        probe_backoff_factor: float = 2
+
+    @dataclass
+    class WatcherSettings:
+        enabled: bool = False
+        backend: str = "auto"  # auto / watchdog / inotify / none
+        debounce_ms: int = 2000
+        poll_interval_minutes: int = 30
+
+    @dataclass
+    class WorkerSettings:
+        count: int = 0  # 0 表示单进程
+        vnodes: int = 64
+        restart_delay_seconds: int = 5
+
+    @dataclass
+    class RunSettings:
+        keep: int = 20
+        max_output_mb: int = 20
+        tail_kb: int = 64
+        history_keep: int = 500
+        history_path: Optional[str] = None
+
+    @dataclass
+    class ConcurrencySettings:
+        enabled: bool = False  # 关闭时不限制并发，只做统计
+        max_total: int = 4  # 0 表示不限制
+        max_per_project: int = 2  # 0 表示不限制
+        max_per_mode: Dict[str, int] = field(default_factory=lambda: {"probe": 4, "cron": 2})
+        weights: Dict[str, int] = field(default_factory=lambda: {"probe": 1, "cron": 1})
+        manual_wait_seconds: float = 30  # 手动触发最长排队时间，超时返回 429
 
     notification: NotificationSettings = field(default_factory=NotificationSettings)
     defaults: DefaultSettings = field(default_factory=DefaultSettings)
     claude_cli: ClaudeCliSettings = field(default_factory=ClaudeCliSettings)
     logging: LoggingSettings = field(default_factory=LoggingSettings)
+    storage: StorageSettings = field(default_factory=StorageSettings)
+    archive: ArchiveSettings = field(default_factory=ArchiveSettings)
+    scheduler: SchedulerSettings = field(default_factory=SchedulerSettings)
+    concurrency: ConcurrencySettings = field(default_factory=ConcurrencySettings)
+    watcher: WatcherSettings = field(default_factory=WatcherSettings)
+    workers: WorkerSettings = field(default_factory=WorkerSettings)
+    runs: RunSettings = field(default_factory=RunSettings)
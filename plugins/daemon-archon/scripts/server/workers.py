@@ -0,0 +1,580 @@
+"""
+daemon-archon 多进程 worker
+
+workers.count 大于 0 时，服务进程只作为协调者：启动 N 个 worker 进程，
+按 task_id 的一致性哈希把任务分配给各 worker。每个 worker 运行独立的调度器
+（独立的任务存储和 transcript 监听），负责所属任务的定时检查、执行和分析；
+协调者把调度相关的 API 调用转发给任务所属的 worker。
+
+并发额度（concurrency）由协调者的 ConcurrencyGovernor 统一分配：worker 执行前
+通过管道申请额度，结束后归还，所有 worker 共享同一组上限。
+
+worker 退出后从哈希环中移除，其任务由其余 worker 接管；
+workers.restart_delay_seconds 秒后重新启动并加回哈希环。
+一致性哈希保证增减 worker 时只有少量任务改变归属。
+"""
+
+import bisect
+import hashlib
+import asyncio
+import itertools
+import logging
+import threading
+import multiprocessing
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, List, Any, Iterable, Tuple, Callable
+
+from .state_store import (
+    ensure_base_dir, get_settings_section,
+    start_log_writer, stop_log_writer, stop_group_commit
+)
+from .scheduler import ConcurrencyGovernor, ConcurrencyLimitError, get_scheduler, task_project
+from .probe_executor import probe_check_callback
+from .cron_executor import cron_execute_callback
+
+logger = logging.getLogger(__name__)
+
+# 协调者可以转发给 worker 的调度器方法
+WORKER_OPS = (
+    "add_probe_task", "add_cron_task", "remove_task", "pause_task", "resume_task",
+    "trigger_task", "get_job_info", "list_jobs", "get_concurrency_stats", "get_watcher_stats",
+)
+
+
+# ============ 一致性哈希 ============
+
+class HashRing:
+    """一致性哈希环：每个节点对应 vnodes 个虚拟节点"""
+
+    def __init__(self, nodes: Iterable[str] = (), vnodes: int = 64):
+        self.vnodes = max(1, vnodes)
+        self._keys: List[int] = []
+        self._owners: List[str] = []
+        self._nodes: set = set()
+        for node in nodes:
+            self.add(node)
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        """与进程无关的哈希（不使用内置 hash）"""
+        return int.from_bytes(hashlib.sha1(key.encode('utf-8')).digest()[:8], "big")
+
+    @property
+    def nodes(self) -> List[str]:
+        return sorted(self._nodes)
+
+    def add(self, node: str) -> None:
+        """加入节点"""
+        if node in self._nodes:
+            return
+        self._nodes.add(node)
+        for i in range(self.vnodes):
+            key = self._hash(f"{node}#{i}")
+            index = bisect.bisect(self._keys, key)
+            self._keys.insert(index, key)
+            self._owners.insert(index, node)
+
+    def remove(self, node: str) -> None:
+        """移除节点"""
+        if node not in self._nodes:
+            return
+        self._nodes.discard(node)
+        kept = [(key, owner) for key, owner in zip(self._keys, self._owners) if owner != node]
+        self._keys = [key for key, _ in kept]
+        self._owners = [owner for _, owner in kept]
+
+    def set_nodes(self, nodes: Iterable[str]) -> None:
+        """替换为给定的节点集合"""
+        nodes = set(nodes)
+        for node in self._nodes - nodes:
+            self.remove(node)
+        for node in sorted(nodes - self._nodes):
+            self.add(node)
+
+    def node_for(self, key: str) -> str:
+        """key 所属的节点"""
+        if not self._keys:
+            raise RuntimeError("没有可用的 worker")
+        index = bisect.bisect(self._keys, self._hash(key)) % len(self._keys)
+        return self._owners[index]
+
+
+# ============ worker 进程 ============
+
+class RemoteGovernor:
+    """
+    worker 一侧的并发额度
+
+    向协调者申请额度（("slot", "acquire", slot_id, (task_id, project, mode))），
+    协调者放行后回复 (slot_id, "slot_granted", ())；执行结束发送 release，
+    排队期间被取消时发送 cancel，由协调者撤销排队或归还已放行的额度
+    """
+
+    def __init__(self, send: Callable[[Tuple], None]):
+        self._send = send
+        self._seq = itertools.count()
+        self._waiting: Dict[int, asyncio.Future] = {}
+        self._running = 0
+        self._granted = 0
+
+    def on_granted(self, slot_id: int) -> None:
+        """协调者已放行（在事件循环线程中调用）"""
+        future = self._waiting.pop(slot_id, None)
+        if future is not None and not future.done():
+            future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, task_id: str, project: str, mode: str, timeout: Optional[float] = None):
+        """在协调者分配的额度内执行，timeout 同 ConcurrencyGovernor.slot"""
+        slot_id = next(self._seq)
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[slot_id] = future
+        self._send(("slot", "acquire", slot_id, (task_id, project, mode)))
+        try:
+            await asyncio.wait_for(future, timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError) as e:
+            self._waiting.pop(slot_id, None)
+            self._send(("slot", "cancel", slot_id, ()))
+            if isinstance(e, asyncio.TimeoutError):
+                raise ConcurrencyLimitError(f"并发已满，{timeout} 秒内未获得执行额度")
+            raise
+
+        self._running += 1
+        self._granted += 1
+        try:
+            yield
+        finally:
+            self._running -= 1
+            self._send(("slot", "release", slot_id, ()))
+
+    def stats(self) -> Dict[str, Any]:
+        """本 worker 的占用情况（上限与排队见协调者的统计）"""
+        return {
+            "running": self._running,
+            "waiting": len(self._waiting),
+            "granted": self._granted,
+        }
+
+
+def _worker_main(name: str, nodes: List[str], vnodes: int, conn) -> None:
+    """worker 进程入口"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f'%(asctime)s - {name} - %(name)s - %(levelname)s - %(message)s'
+    )
+    try:
+        asyncio.run(_worker_loop(name, nodes, vnodes, conn))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _worker_loop(name: str, nodes: List[str], vnodes: int, conn) -> None:
+    """运行调度器，处理协调者发来的请求，直到收到 shutdown 或连接断开"""
+    ensure_base_dir()
+    start_log_writer()
+
+    loop = asyncio.get_running_loop()
+    stopping = asyncio.Event()
+    send_lock = threading.Lock()
+
+    def send(message: Tuple) -> None:
+        with send_lock:
+            try:
+                conn.send(message)
+            except (OSError, EOFError):
+                # 协调者已退出
+                pass
+
+    def reply(req_id: int, ok: bool, value: Any) -> None:
+        send((req_id, ok, value))
+
+    governor = RemoteGovernor(send)
+    ring = HashRing(nodes, vnodes)
+    scheduler = get_scheduler()
+    scheduler.configure(
+        probe_callback=probe_check_callback,
+        cron_callback=cron_execute_callback,
+        task_filter=lambda task_id: ring.node_for(task_id) == name,
+        jobstore_suffix=name,
+        governor=governor
+    )
+    await scheduler.start()
+    logger.info(f"worker {name} 已启动")
+
+    async def handle(req_id: int, op: str, args: Tuple) -> None:
+        try:
+            if op == "assign":
+                ring.set_nodes(args[0])
+                await scheduler.rebalance()
+                value = None
+            elif op == "shutdown":
+                stopping.set()
+                value = None
+            elif op in WORKER_OPS:
+                value = getattr(scheduler, op)(*args)
+                if asyncio.iscoroutine(value):
+                    value = await value
+            else:
+                raise ValueError(f"不支持的操作: {op}")
+            reply(req_id, True, value)
+        except Exception as e:
+            logger.error(f"处理请求失败 [{op}]: {e}")
+            reply(req_id, False, str(e))
+
+    def reader() -> None:
+        while True:
+            try:
+                req_id, op, args = conn.recv()
+            except (EOFError, OSError):
+                loop.call_soon_threadsafe(stopping.set)
+                return
+            if op == "slot_granted":
+                loop.call_soon_threadsafe(governor.on_granted, req_id)
+                continue
+            asyncio.run_coroutine_threadsafe(handle(req_id, op, args), loop)
+
+    threading.Thread(target=reader, name=f"archon-{name}-reader", daemon=True).start()
+
+    await stopping.wait()
+
+    await scheduler.stop()
+    stop_log_writer()
+    stop_group_commit()
+    logger.info(f"worker {name} 已停止")
+
+
+# ============ 协调者 ============
+
+class _WorkerHandle:
+    """协调者一侧的 worker 记录"""
+
+    __slots__ = ("name", "process", "conn", "lock")
+
+    def __init__(self, name: str, process, conn):
+        self.name = name
+        self.process = process
+        self.conn = conn
+        self.lock = threading.Lock()
+
+
+class WorkerPool:
+    """worker 进程池：启动 worker、按 task_id 路由请求、worker 退出后重新分配"""
+
+    def __init__(self, count: int, vnodes: int = 64, restart_delay_seconds: float = 5):
+        """
+        初始化 worker 池
+
+        Args:
+            count: worker 进程数
+            vnodes: 每个 worker 在哈希环上的虚拟节点数
+            restart_delay_seconds: worker 退出后重新启动前的等待时间（秒）
+        """
+        self.count = count
+        self.vnodes = vnodes
+        self.restart_delay = restart_delay_seconds
+        self.ring = HashRing(vnodes=vnodes)
+        self.running = False
+        self._ctx = multiprocessing.get_context("spawn")
+        self._workers: Dict[str, _WorkerHandle] = {}
+        self._pending: Dict[int, Tuple[str, asyncio.Future]] = {}
+        self._seq = itertools.count()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._restarts = 0
+        # 全局并发额度：(worker, slot_id) -> 已放行的 (项目, 模式, 权重) / 排队中的申请
+        self.governor: Optional[ConcurrencyGovernor] = None
+        self._slots: Dict[Tuple[str, int], Tuple[str, str, int]] = {}
+        self._slot_waits: Dict[Tuple[str, int], asyncio.Task] = {}
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any]) -> "WorkerPool":
+        """按 workers 配置创建"""
+        return cls(
+            count=int(settings.get("count", 0)),
+            vnodes=int(settings.get("vnodes", 64)),
+            restart_delay_seconds=float(settings.get("restart_delay_seconds", 5))
+        )
+
+    async def start(self) -> None:
+        """启动全部 worker"""
+        if self.running:
+            return
+
+        self._loop = asyncio.get_running_loop()
+        self.governor = ConcurrencyGovernor.from_settings(get_settings_section("concurrency"))
+        names = [f"w{i}" for i in range(self.count)]
+        for name in names:
+            self.ring.add(name)
+        for name in names:
+            self._spawn(name)
+
+        self.running = True
+        logger.info(f"已启动 {self.count} 个 worker")
+
+    async def stop(self, timeout: float = 30) -> None:
+        """通知全部 worker 退出并等待结束"""
+        if not self.running:
+            return
+        self.running = False
+
+        try:
+            await asyncio.wait_for(self._broadcast("shutdown"), timeout)
+        except Exception as e:
+            logger.warning(f"通知 worker 退出失败: {e}")
+
+        for task in list(self._slot_waits.values()):
+            task.cancel()
+
+        for handle in list(self._workers.values()):
+            await self._loop.run_in_executor(None, handle.process.join, timeout)
+            if handle.process.is_alive():
+                logger.warning(f"worker {handle.name} 未按时退出，强制结束")
+                handle.process.terminate()
+            handle.conn.close()
+        self._workers.clear()
+        logger.info("全部 worker 已停止")
+
+    # ============ 进程管理 ============
+
+    def _spawn(self, name: str) -> None:
+        """启动 worker 进程，按当前哈希环确定其初始任务"""
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(name, self.ring.nodes, self.vnodes, child_conn),
+            name=f"archon-{name}",
+            daemon=True
+        )
+        process.start()
+        child_conn.close()
+
+        handle = _WorkerHandle(name, process, parent_conn)
+        self._workers[name] = handle
+        threading.Thread(
+            target=self._read_replies, args=(handle,), name=f"archon-{name}-replies", daemon=True
+        ).start()
+        logger.info(f"worker {name} 已启动, PID: {process.pid}")
+
+    def _read_replies(self, handle: _WorkerHandle) -> None:
+        """读取 worker 的响应（后台线程），连接断开表示 worker 已退出"""
+        while True:
+            try:
+                message = handle.conn.recv()
+            except (EOFError, OSError):
+                message = None
+
+            try:
+                if message is None:
+                    self._loop.call_soon_threadsafe(self._on_worker_exit, handle)
+                    return
+                if message[0] == "slot":
+                    self._loop.call_soon_threadsafe(self._on_slot_message, handle, message)
+                else:
+                    self._loop.call_soon_threadsafe(self._resolve, message)
+            except RuntimeError:
+                # 事件循环已关闭
+                return
+
+    def _resolve(self, message: Tuple[int, bool, Any]) -> None:
+        req_id, ok, value = message
+        entry = self._pending.pop(req_id, None)
+        if entry is None or entry[1].done():
+            return
+        if ok:
+            entry[1].set_result(value)
+        else:
+            entry[1].set_exception(RuntimeError(value))
+
+    def _on_worker_exit(self, handle: _WorkerHandle) -> None:
+        """worker 退出：让出其任务，稍后重新启动"""
+        if self._workers.get(handle.name) is not handle:
+            return
+        del self._workers[handle.name]
+
+        for req_id, (name, future) in list(self._pending.items()):
+            if name == handle.name:
+                del self._pending[req_id]
+                if not future.done():
+                    future.set_exception(RuntimeError(f"worker {name} 已退出"))
+
+        # 归还该 worker 占用和排队中的额度
+        for key in [key for key in self._slot_waits if key[0] == handle.name]:
+            self._slot_waits.pop(key).cancel()
+        for key in [key for key in self._slots if key[0] == handle.name]:
+            self._release_slot(key)
+
+        if not self.running:
+            return
+
+        # 连接先于进程结束断开，短暂等待以回收进程、取得退出码
+        handle.process.join(0.5)
+        logger.warning(f"worker {handle.name} 已退出, 退出码: {handle.process.exitcode}")
+        self.ring.remove(handle.name)
+        self._loop.create_task(self._assign())
+        self._loop.call_later(self.restart_delay, self._restart, handle.name)
+
+    def _restart(self, name: str) -> None:
+        """重新启动退出的 worker 并加回哈希环"""
+        if not self.running or name in self._workers:
+            return
+        self._restarts += 1
+        self.ring.add(name)
+        self._spawn(name)
+        self._loop.create_task(self._assign())
+
+    async def _assign(self) -> None:
+        """把当前哈希环同步给全部 worker"""
+        nodes = self.ring.nodes
+        results = await asyncio.gather(
+            *(self._call(name, "assign", nodes) for name in list(self._workers)),
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"同步任务归属失败: {result}")
+
+    # ============ 并发额度 ============
+
+    def _on_slot_message(self, handle: _WorkerHandle, message: Tuple) -> None:
+        """处理 worker 的额度申请 / 取消 / 归还"""
+        _, op, slot_id, args = message
+        key = (handle.name, slot_id)
+        if op == "acquire":
+            self._slot_waits[key] = self._loop.create_task(self._grant_slot(handle, slot_id, *args))
+        elif op == "cancel":
+            task = self._slot_waits.pop(key, None)
+            if task is not None:
+                # 排队中撤销；已放行但尚未通知时由 acquire 归还
+                task.cancel()
+            else:
+                self._release_slot(key)
+        elif op == "release":
+            self._release_slot(key)
+
+    async def _grant_slot(self, handle: _WorkerHandle, slot_id: int, task_id: str, project: str, mode: str) -> None:
+        """在全局额度内放行 worker 的执行"""
+        key = (handle.name, slot_id)
+        try:
+            weight = await self.governor.acquire(task_id, project, mode)
+        finally:
+            self._slot_waits.pop(key, None)
+
+        self._slots[key] = (project, mode, weight)
+        if self._workers.get(handle.name) is not handle:
+            self._release_slot(key)
+            return
+        try:
+            with handle.lock:
+                handle.conn.send((slot_id, "slot_granted", ()))
+        except (OSError, EOFError):
+            self._release_slot(key)
+
+    def _release_slot(self, key: Tuple[str, int]) -> None:
+        """归还已放行的额度"""
+        slot = self._slots.pop(key, None)
+        if slot is not None:
+            self.governor.release(*slot)
+
+    # ============ 请求 ============
+
+    async def _call(self, name: str, op: str, *args) -> Any:
+        """向指定 worker 发送请求并等待结果"""
+        handle = self._workers.get(name)
+        if handle is None:
+            raise RuntimeError(f"worker {name} 不可用")
+
+        req_id = next(self._seq)
+        future = self._loop.create_future()
+        self._pending[req_id] = (name, future)
+        try:
+            with handle.lock:
+                handle.conn.send((req_id, op, args))
+        except (OSError, EOFError) as e:
+            self._pending.pop(req_id, None)
+            raise RuntimeError(f"worker {name} 不可用: {e}")
+        return await future
+
+    async def _broadcast(self, op: str, *args) -> Dict[str, Any]:
+        """向全部 worker 发送请求，返回 worker 名称 -> 结果"""
+        names = list(self._workers)
+        results = await asyncio.gather(*(self._call(name, op, *args) for name in names))
+        return dict(zip(names, results))
+
+    def owner(self, task_id: str) -> str:
+        """任务所属的 worker"""
+        return self.ring.node_for(task_id)
+
+    async def _route(self, op: str, task_id: str, *args) -> Any:
+        return await self._call(self.owner(task_id), op, task_id, *args)
+
+    # 以下方法与 ArchonScheduler 同名，请求转发给任务所属的 worker
+
+    async def add_probe_task(self, task_id: str, config: Optional[Dict[str, Any]] = None):
+        await self._route("add_probe_task", task_id, config)
+
+    async def add_cron_task(self, task_id: str, config: Optional[Dict[str, Any]] = None):
+        await self._route("add_cron_task", task_id, config)
+
+    async def remove_task(self, task_id: str, mode: str):
+        await self._route("remove_task", task_id, mode)
+
+    async def pause_task(self, task_id: str, mode: str):
+        await self._route("pause_task", task_id, mode)
+
+    async def resume_task(self, task_id: str, mode: str):
+        await self._route("resume_task", task_id, mode)
+
+    async def trigger_task(self, task_id: str, mode: str):
+        await self._route("trigger_task", task_id, mode)
+
+    async def get_job_info(self, task_id: str, mode: str) -> Optional[Dict[str, Any]]:
+        return await self._route("get_job_info", task_id, mode)
+
+    async def list_jobs(self) -> List[Dict[str, Any]]:
+        """全部 worker 的调度任务，附带所属 worker"""
+        jobs = []
+        for name, worker_jobs in (await self._broadcast("list_jobs")).items():
+            for job in worker_jobs:
+                job["worker"] = name
+                jobs.append(job)
+        return jobs
+
+    def concurrency_slot(self, task_id: str, mode: str, timeout: Optional[float] = None):
+        """在协调者的全局额度内执行（手动执行在协调者进程中进行）"""
+        return self.governor.slot(task_id, task_project(task_id), mode, timeout)
+
+    async def get_concurrency_stats(self) -> Dict[str, Any]:
+        """全局并发统计（协调者统一分配的额度），附带各 worker 的占用"""
+        stats = self.governor.stats() if self.governor else {}
+        stats["workers"] = await self._broadcast("get_concurrency_stats")
+        return stats
+
+    async def get_watcher_stats(self) -> Dict[str, Any]:
+        """各 worker 的 transcript 监听统计"""
+        return await self._broadcast("get_watcher_stats")
+
+    def stats(self) -> Dict[str, Any]:
+        """worker 状态"""
+        return {
+            "count": self.count,
+            "ring": self.ring.nodes,
+            "restarts": self._restarts,
+            "pending_requests": len(self._pending),
+            "workers": [
+                {"name": name, "pid": handle.process.pid, "alive": handle.process.is_alive()}
+                for name, handle in sorted(self._workers.items())
+            ],
+        }
+
+
+# 全局 worker 池实例
+_pool: Optional[WorkerPool] = None
+
+
+def get_worker_pool() -> Optional[WorkerPool]:
+    """获取 worker 池（workers.count 为 0 时未启用，返回 None）"""
+    global _pool
+    if _pool is None:
+        settings = get_settings_section("workers")
+        if int(settings.get("count", 0)) > 0:
+            _pool = WorkerPool.from_settings(settings)
+    return _pool
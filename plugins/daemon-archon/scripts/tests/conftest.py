@@ -0,0 +1,41 @@
+"""
+daemon-archon 测试公共夹具
+
+每个测试使用独立的 HOME（工作目录为 ~/.claude/daemon-archon），
+并重置 state_store 的进程内缓存，测试之间互不影响
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from server import archive, run_history, state_store  # noqa: E402
+
+
+def reset_state_store() -> None:
+    """清空 state_store 的进程内状态（模拟新进程）"""
+    state_store._settings_cache = None
+    state_store._storage_engine = None
+    state_store._storage_engine_resolved = False
+    state_store._config_cache.clear()
+    state_store._config_cache_stats.update(hits=0, misses=0)
+    state_store._catalog = None
+    state_store._catalog_index = {}
+    state_store._catalog_file_mtime = None
+    state_store._cron_inputs_versions.clear()
+    # 依赖工作目录的单例
+    run_history._run_history = None
+    archive._archive = None
+
+
+@pytest.fixture(autouse=True)
+def archon_home(tmp_path, monkeypatch):
+    """独立的工作目录"""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    reset_state_store()
+    yield state_store.get_base_dir()
+    state_store.stop_log_writer()
+    reset_state_store()
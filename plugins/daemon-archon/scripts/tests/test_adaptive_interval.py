@@ -0,0 +1,67 @@
+"""Probe 自适应检查间隔测试"""
+
+import asyncio
+
+from server import state_store
+from server.scheduler import ArchonScheduler, next_probe_interval
+from server.types import AnalysisResult
+
+
+SETTINGS = {"min_probe_interval_minutes": 1, "max_probe_interval_minutes": 30, "probe_backoff_factor": 2}
+
+
+def _result(status, message_count=None):
+    metrics = {} if message_count is None else {"message_count": message_count}
+    return AnalysisResult(status=status, summary="", metrics=metrics)
+
+
+def test_errors_shorten_interval_to_floor():
+    assert next_probe_interval(5, 20, _result("error", 3), SETTINGS) == 1
+
+
+def test_idle_backs_off_up_to_cap():
+    assert next_probe_interval(5, 5, _result("running", 0), SETTINGS) == 10
+    assert next_probe_interval(5, 10, _result("idle", 4), SETTINGS) == 20
+    assert next_probe_interval(5, 20, _result("stuck", 0), SETTINGS) == 30
+
+
+def test_activity_returns_to_configured_interval():
+    assert next_probe_interval(5, 20, _result("running", 7), SETTINGS) == 5
+
+
+def test_unknown_or_finished_keeps_interval():
+    assert next_probe_interval(5, 10, _result("running"), SETTINGS) is None
+    assert next_probe_interval(5, 10, _result("completed", 0), SETTINGS) is None
+
+
+def test_limits_never_exclude_configured_interval():
+    # 配置间隔小于下限或大于上限时以配置间隔为准
+    assert next_probe_interval(0.5, 0.5, _result("error", 1), SETTINGS) == 0.5
+    assert next_probe_interval(60, 60, _result("idle", 0), SETTINGS) == 60
+
+
+def test_scheduler_persists_adjusted_interval():
+    task_id = "20260101_000000_probe"
+    state_store.save_task_config(task_id, {
+        "task_id": task_id, "mode": "probe", "name": task_id,
+        "schedule": {"check_interval_minutes": 5},
+    })
+    state_store.set_task_status(task_id, "active")
+    state_store.save_global_settings({"scheduler": {
+        "jobstore": "memory", "jitter": "none", "adaptive_probe_interval": True
+    }})
+
+    async def scenario():
+        scheduler = ArchonScheduler()
+        await scheduler.start()
+        scheduler._adapt_probe_interval(task_id, _result("running", 0))
+        trigger = scheduler.scheduler.get_job(f"probe_{task_id}").trigger
+        await scheduler.stop()
+        return trigger
+
+    trigger = asyncio.run(scenario())
+    assert trigger.interval.total_seconds() == 600
+    assert state_store.load_task_config(task_id)["state"]["adaptive_interval_minutes"] == 10
+
+    event = state_store.query_events(task_id, event_type="interval_adjusted")[-1]
+    assert event["interval_minutes"] == 10 and event["previous_minutes"] == 5
@@ -0,0 +1,63 @@
+"""Cron 输出增量分析测试"""
+
+from server.analyzer import CronResultAnalyzer, IncrementalOutputAnalyzer
+from server.state_store import (
+    get_run_log_path, list_run_logs, prune_run_logs, read_run_output
+)
+
+
+RESULT = '```json\n{"status": "warning", "summary": "磁盘 85%", "metrics": {"disk": 85}}\n```\n'
+
+
+def _feed(analyzer, text, size):
+    partial = None
+    for i in range(0, len(text), size):
+        partial = analyzer.feed(text[i:i + size]) or partial
+    return partial
+
+
+def test_small_output_matches_full_analysis():
+    output = "检查中\n" + RESULT + "完成\n"
+    for size in (1, 7, 1000):
+        analyzer = IncrementalOutputAnalyzer({})
+        _feed(analyzer, output, size)
+        assert analyzer.output == output
+        expected = CronResultAnalyzer({}).analyze_output(output)
+        assert analyzer.finish().__dict__ == expected.__dict__
+
+
+def test_json_result_is_reported_once_while_streaming():
+    analyzer = IncrementalOutputAnalyzer({})
+    assert analyzer.feed("前言\n```json\n{\"status\": ") is None
+    partial = analyzer.feed("\"success\", \"summary\": \"ok\"}\n```\n")
+    assert partial.status == "success"
+    assert analyzer.feed(RESULT) is None
+    assert analyzer.finish().status == "success"
+
+
+def test_large_output_keeps_head_and_tail_only():
+    analyzer = IncrementalOutputAnalyzer({}, tail_chars=2048)
+    body = "".join(f"第 {i} 行\n" for i in range(20000))
+    _feed(analyzer, RESULT + body, 4096)
+
+    assert analyzer.total_chars == len(RESULT) + len(body)
+    output = analyzer.output
+    assert len(output) < 4096
+    assert output.startswith("```json")
+    assert output.endswith("第 19999 行\n")
+    assert "省略" in output
+    # JSON 结果在开头，已在流式处理中识别
+    assert analyzer.finish().status == "warning"
+
+
+def test_run_logs_are_pruned_and_readable():
+    task_id = "20260101_000000_cron"
+    for i in range(5):
+        get_run_log_path(task_id, f"20260101_00000{i}_000_abc").write_text(f"run {i}\n")
+
+    assert prune_run_logs(task_id, keep=3) == 2
+    assert list_run_logs(task_id) == [f"20260101_00000{i}_000_abc" for i in (2, 3, 4)]
+    assert read_run_output(task_id)["lines"] == ["run 4\n"]
+    assert read_run_output(task_id, "20260101_000002_000_abc", lines=5)["lines"] == ["run 2\n"]
+    assert read_run_output(task_id, "../config") is None
+    assert read_run_output(task_id, "missing") is None
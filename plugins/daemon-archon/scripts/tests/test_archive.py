@@ -0,0 +1,109 @@
+"""任务归档测试"""
+
+import os
+import time
+
+from server import state_store
+from server.archive import (
+    archive_stale_tasks, list_archived_tasks, load_archived_task, restore_task
+)
+
+from conftest import reset_state_store
+
+DAY_SECONDS = 86400
+
+
+def _create_task(task_id: str, status: str = "active") -> None:
+    state_store.save_task_config(task_id, {
+        "task_id": task_id,
+        "mode": "cron",
+        "name": task_id,
+        "created_at": "2026-01-01T00:00:00Z",
+        "state": {"status": status},
+    })
+
+
+def _age_task(task_id: str, days: float) -> None:
+    """把任务配置文件的修改时间改为若干天前，并按新进程重建索引"""
+    stamp = time.time() - days * DAY_SECONDS
+    task_dir = state_store.get_task_dir(task_id)
+    for name in ("config.json", "config.journal"):
+        if (task_dir / name).exists():
+            os.utime(task_dir / name, (stamp, stamp))
+    reset_state_store()
+    state_store.rebuild_task_catalog()
+
+
+def test_stale_terminal_task_is_archived():
+    _create_task("old", status="stopped")
+    _age_task("old", 40)
+
+    assert archive_stale_tasks(after_days=30) == 1
+    assert load_archived_task("old")["task_id"] == "old"
+    assert state_store.load_task_config("old") is None
+
+
+def test_recent_or_active_tasks_are_kept():
+    _create_task("recent", status="completed")
+    _create_task("running", status="active")
+    _age_task("running", 40)
+
+    assert archive_stale_tasks(after_days=30) == 0
+    assert state_store.load_task_config("recent") is not None
+    assert state_store.load_task_config("running") is not None
+
+
+def test_restore_brings_back_directory_and_status():
+    _create_task("old", status="stopped")
+    state_store.append_log("old", "info", "归档前的日志")
+    _age_task("old", 40)
+    assert archive_stale_tasks(after_days=30) == 1
+
+    archived = list_archived_tasks(mode="cron")
+    assert [c["task_id"] for c in archived] == ["old"]
+    assert "archived_at" in archived[0]
+
+    assert restore_task("old")
+    assert state_store.get_task_status("old") == "stopped"
+    assert any("归档前的日志" in line for line in state_store.read_log("old"))
+    assert load_archived_task("old") is None
+    assert not restore_task("old")
+
+
+def test_journal_update_refreshes_catalog_mtime():
+    _create_task("t1")
+    _age_task("t1", 40)
+
+    # 只经过增量写入的状态变更也算作最近变动
+    assert state_store.set_task_status("t1", "stopped")
+
+    summary = state_store.list_task_summaries(status="stopped")[0]
+    assert summary["mtime"] >= time.time_ns() - 60 * 10 ** 9
+    assert archive_stale_tasks(after_days=30) == 0
+
+
+def test_catalog_mtime_is_visible_to_other_processes():
+    _create_task("t1")
+    _age_task("t1", 40)
+    state_store.patch_task_config("t1", {"execution.last_result": "success"})
+
+    # 新进程只读索引文件
+    reset_state_store()
+    catalog = state_store._read_catalog_file()
+    assert catalog["t1"]["mtime"] >= time.time_ns() - 60 * 10 ** 9
+
+
+def test_archive_checks_actual_mtime_when_catalog_lags():
+    _create_task("t1", status="stopped")
+    _age_task("t1", 40)
+
+    # 其他进程写入增量，本进程的索引仍是旧的 mtime
+    journal = state_store.get_task_dir("t1") / "config.journal"
+    journal.write_text('{"set":{"execution.last_result":"success"},"inc":{}}\n', encoding="utf-8")
+
+    assert archive_stale_tasks(after_days=30) == 0
+    assert state_store.load_task_config("t1") is not None
+
+
+def test_archiving_is_disabled_by_default():
+    assert state_store.get_settings_section("archive")["enabled"] is False
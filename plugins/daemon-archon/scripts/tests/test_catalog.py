@@ -0,0 +1,62 @@
+"""任务索引（.catalog.json）测试"""
+
+import json
+import shutil
+
+from server.state_store import (
+    count_tasks, get_catalog_file, get_task_dir, list_task_summaries,
+    rebuild_task_catalog, save_task_config, set_task_status
+)
+
+from conftest import reset_state_store
+
+
+def _config(task_id, mode="cron"):
+    return {"task_id": task_id, "mode": mode, "name": task_id, "created_at": task_id[:15]}
+
+
+def test_catalog_follows_status_changes():
+    for task_id, mode in (("20260101_000001_cron", "cron"), ("20260101_000002_probe", "probe")):
+        save_task_config(task_id, _config(task_id, mode))
+        set_task_status(task_id, "active")
+    set_task_status("20260101_000001_cron", "stopped")
+
+    assert count_tasks() == 2
+    assert count_tasks(mode="probe", status="active") == 1
+    assert [s["task_id"] for s in list_task_summaries(status="stopped")] == ["20260101_000001_cron"]
+
+
+def test_catalog_reconciles_with_task_dirs():
+    kept, removed = "20260101_000001_cron", "20260101_000002_cron"
+    for task_id in (kept, removed):
+        save_task_config(task_id, _config(task_id))
+        set_task_status(task_id, "active")
+    assert count_tasks() == 2
+
+    # 绕过 state_store 修改磁盘：删除一个任务目录、新建一个任务
+    shutil.rmtree(get_task_dir(removed))
+    added = "20260101_000003_probe"
+    get_task_dir(added).mkdir(parents=True)
+    (get_task_dir(added) / "config.json").write_text(json.dumps(_config(added, "probe")))
+
+    reset_state_store()
+    assert {s["task_id"] for s in list_task_summaries()} == {kept, added}
+    assert count_tasks(mode="probe") == 1
+
+    # 对账结果写回索引文件
+    on_disk = json.loads(get_catalog_file().read_text())["tasks"]
+    assert set(on_disk) == {kept, added}
+    assert on_disk[added]["mode"] == "probe"
+
+
+def test_corrupt_catalog_is_rebuilt():
+    task_id = "20260101_000001_cron"
+    save_task_config(task_id, _config(task_id))
+    set_task_status(task_id, "active")
+
+    get_catalog_file().write_text("{not json")
+    reset_state_store()
+    assert count_tasks(mode="cron") == 1
+
+    assert rebuild_task_catalog() == 1
+    assert list(json.loads(get_catalog_file().read_text())["tasks"]) == [task_id]
@@ -0,0 +1,63 @@
+"""任务配置缓存测试"""
+
+import json
+
+from server.state_store import (
+    get_config_cache_stats, get_task_dir, load_task_config, patch_task_config,
+    save_global_settings, save_task_config
+)
+
+
+def _config(task_id):
+    return {"task_id": task_id, "mode": "cron", "name": "原名", "created_at": task_id[:15]}
+
+
+def test_repeated_loads_hit_cache():
+    task_id = "20260101_000000_cron"
+    save_task_config(task_id, _config(task_id))
+    hits = get_config_cache_stats()["hits"]
+
+    for _ in range(3):
+        assert load_task_config(task_id)["name"] == "原名"
+    stats = get_config_cache_stats()
+    assert stats["enabled"] and stats["hits"] == hits + 3 and stats["size"] == 1
+
+
+def test_callers_get_copies():
+    task_id = "20260101_000000_cron"
+    save_task_config(task_id, _config(task_id))
+
+    load_task_config(task_id)["name"] = "被调用方修改"
+    assert load_task_config(task_id)["name"] == "原名"
+
+
+def test_patch_writes_through():
+    task_id = "20260101_000000_cron"
+    save_task_config(task_id, _config(task_id))
+    load_task_config(task_id)
+
+    patch_task_config(task_id, {"name": "新名"})
+    assert load_task_config(task_id)["name"] == "新名"
+
+
+def test_external_write_invalidates_entry():
+    task_id = "20260101_000000_cron"
+    save_task_config(task_id, _config(task_id))
+    load_task_config(task_id)
+
+    # 其他进程改写 config.json（大小不同，签名必然变化）
+    config = dict(_config(task_id), name="其他进程写入的名称")
+    (get_task_dir(task_id) / "config.json").write_text(json.dumps(config, ensure_ascii=False))
+
+    assert load_task_config(task_id)["name"] == "其他进程写入的名称"
+
+
+def test_zero_capacity_disables_cache():
+    save_global_settings({"storage": {"config_cache_size": 0}})
+    task_id = "20260101_000000_cron"
+    save_task_config(task_id, _config(task_id))
+
+    load_task_config(task_id)
+    load_task_config(task_id)
+    stats = get_config_cache_stats()
+    assert not stats["enabled"] and stats["hits"] == 0 and stats["size"] == 0
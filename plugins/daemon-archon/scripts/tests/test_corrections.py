@@ -0,0 +1,62 @@
+"""纠偏历史测试"""
+
+from server.state_store import (
+    append_correction, ensure_task_dir, get_task_dir, load_corrections, save_corrections
+)
+
+
+TASK_ID = "20260101_000000_probe"
+
+
+def _record(reason):
+    return {"reason": reason, "result": "成功", "timestamp": "2026-01-01 00:00"}
+
+
+def test_append_correction_numbers_records_and_renders_markdown():
+    for i in range(3):
+        assert append_correction(TASK_ID, _record(f"原因 {i}"))
+
+    task_dir = get_task_dir(TASK_ID)
+    assert (task_dir / "corrections.seq").read_text() == "3"
+    assert len((task_dir / "corrections.jsonl").read_text().splitlines()) == 3
+    assert not (task_dir / "corrections.md").exists()
+
+    content = load_corrections(TASK_ID)
+    assert "| 3 | 2026-01-01 00:00 | Archon | 原因 2 | 成功 |" in content
+    assert "### #1 - 2026-01-01 00:00" in content
+
+
+def test_counter_is_seeded_from_legacy_markdown():
+    task_dir = ensure_task_dir(TASK_ID)
+    (task_dir / "corrections.md").write_text(
+        "# 纠偏历史\n\n| 1 | t | Archon | 旧 | 成功 |\n| 2 | t | Archon | 旧 | 成功 |\n",
+        encoding="utf-8"
+    )
+
+    assert append_correction(TASK_ID, _record("新"))
+    content = load_corrections(TASK_ID)
+    assert "| 3 | 2026-01-01 00:00 | Archon | 新 | 成功 |" in content
+    # 旧文本保留
+    assert "| 2 | t | Archon | 旧 | 成功 |" in content
+
+
+def test_save_corrections_replaces_records():
+    append_correction(TASK_ID, _record("a"))
+    append_correction(TASK_ID, _record("b"))
+
+    assert save_corrections(TASK_ID, "# 纠偏历史\n\n| 5 | t | 用户 | 手动 | 成功 |\n")
+    assert not (get_task_dir(TASK_ID) / "corrections.jsonl").exists()
+    assert load_corrections(TASK_ID).startswith("# 纠偏历史")
+
+    append_correction(TASK_ID, _record("c"))
+    assert "| 6 | 2026-01-01 00:00 | Archon | c | 成功 |" in load_corrections(TASK_ID)
+
+
+def test_corrupt_record_lines_are_skipped():
+    append_correction(TASK_ID, _record("a"))
+    with open(get_task_dir(TASK_ID) / "corrections.jsonl", "a", encoding="utf-8") as f:
+        f.write("{broken\n")
+    append_correction(TASK_ID, _record("b"))
+
+    content = load_corrections(TASK_ID)
+    assert "| 1 |" in content and "| 2 |" in content
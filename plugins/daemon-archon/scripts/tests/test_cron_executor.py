@@ -0,0 +1,273 @@
+"""Cron 执行器测试（子进程、输出流、结果复用）"""
+
+import asyncio
+import os
+import stat
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from server import cron_executor
+from server.cron_executor import (
+    CronExecutor, _RunLogWriter, _command_output, _communicate, _hash_input_files,
+    compute_input_fingerprint, kill_process_group, memoized_result
+)
+from server.state_store import get_runs_dir, query_events, read_run_output, save_global_settings
+from server.types import AnalysisResult, MemoizeConfig, task_config_from_dict
+
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="依赖 POSIX 进程组")
+
+
+@pytest.fixture
+def fake_claude(tmp_path, monkeypatch):
+    """PATH 中放一个假的 claude，脚本内容由测试写入"""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    script = bin_dir / "claude"
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+
+    def install(body):
+        script.write_text("#!/bin/sh\n" + body + "\n")
+        script.chmod(script.stat().st_mode | stat.S_IEXEC)
+
+    return install
+
+
+def _process_running(pid):
+    """进程是否仍在运行（已退出但未被回收的僵尸进程视为已结束）"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except OSError:
+        return True
+
+
+def _executor(tmp_path, timeout_minutes=10):
+    executor = CronExecutor("20260101_000000_cron")
+    executor.config = task_config_from_dict({
+        "task_id": executor.task_id, "mode": "cron", "name": "n",
+        "project_path": str(tmp_path), "execution": {"timeout_minutes": timeout_minutes},
+    })
+    return executor
+
+
+def test_large_output_on_both_streams_is_drained():
+    async def scenario():
+        code = "import sys; sys.stdout.write('o' * 300000); sys.stderr.write('e' * 300000)"
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, "-c", code,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+        stdout, stderr = [], []
+        await asyncio.wait_for(_communicate(process, stdout.append, stderr.append), 10)
+        return len(b"".join(stdout)), len(b"".join(stderr)), process.returncode
+
+    assert asyncio.run(scenario()) == (300000, 300000, 0)
+
+
+def test_kill_process_group_also_kills_children(monkeypatch):
+    monkeypatch.setattr(cron_executor, "KILL_GRACE_SECONDS", 0.5)
+
+    async def scenario():
+        process = await asyncio.create_subprocess_exec(
+            "sh", "-c", "sleep 30 & echo $!; wait",
+            stdout=asyncio.subprocess.PIPE, start_new_session=True
+        )
+        child_pid = int((await process.stdout.readline()).strip())
+        await kill_process_group(process)
+        return child_pid
+
+    child_pid = asyncio.run(scenario())
+    for _ in range(50):
+        if not _process_running(child_pid):
+            break
+        time.sleep(0.02)
+    else:
+        pytest.fail("子进程未被结束")
+
+
+def test_cli_run_does_not_block_event_loop(tmp_path, fake_claude):
+    fake_claude('sleep 0.3; echo "$2"')
+    executor = _executor(tmp_path)
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.ensure_future(ticker())
+        result = await executor._execute_claude_cli("你好", "run1")
+        task.cancel()
+        return result, ticks
+
+    result, ticks = asyncio.run(scenario())
+    assert result["output"].strip() == "你好"
+    assert result["returncode"] == 0
+    assert ticks >= 10
+
+
+def test_cli_timeout_raises_and_kills(tmp_path, fake_claude, monkeypatch):
+    monkeypatch.setattr(cron_executor, "KILL_GRACE_SECONDS", 0.5)
+    fake_claude("echo partial; sleep 30")
+    executor = _executor(tmp_path, timeout_minutes=0.005)
+
+    started = time.monotonic()
+    with pytest.raises(subprocess.TimeoutExpired) as excinfo:
+        asyncio.run(executor._execute_claude_cli("p", "run1"))
+    assert time.monotonic() - started < 5
+    assert excinfo.value.output.strip() == "partial"
+    # 超时前的输出已写入执行日志
+    assert read_run_output(executor.task_id, "run1")["lines"] == ["partial\n"]
+
+
+def test_output_is_streamed_to_run_log_and_analyzed(tmp_path, fake_claude):
+    fake_claude(
+        "echo 开始; printf '```json\\n{\"status\": \"success\", \"summary\": \"完成\"}\\n```\\n'; "
+        "sleep 0.2; echo 结束"
+    )
+    executor = _executor(tmp_path)
+
+    result = asyncio.run(executor._execute_claude_cli("p", "run1"))
+    assert result["analysis"].status == "success"
+    assert result["analysis"].summary == "完成"
+    assert result["output"].startswith("开始")
+
+    lines = read_run_output(executor.task_id)["lines"]
+    assert lines[0] == "开始\n" and lines[-1] == "结束\n"
+
+    partial = query_events(executor.task_id, event_type="run_partial")
+    assert [e["status"] for e in partial] == ["success"]
+
+
+def test_run_log_respects_max_output(tmp_path, fake_claude):
+    save_global_settings({"runs": {"max_output_mb": 0.01}})
+    fake_claude(f"{sys.executable} -c \"import sys; sys.stdout.write('x' * 100000)\"")
+    executor = _executor(tmp_path)
+
+    result = asyncio.run(executor._execute_claude_cli("p", "run1"))
+    assert len(result["output"]) <= 64 * 1024 + 2048
+    run_log = get_runs_dir(executor.task_id) / "run1.log"
+    assert run_log.stat().st_size < 12 * 1024
+    assert "max_output_mb" in run_log.read_text()
+
+
+def test_run_log_is_written_off_the_event_loop(tmp_path, monkeypatch):
+    monkeypatch.setattr(cron_executor, "RUN_LOG_FLUSH_BYTES", 100)
+    writer_threads = set()
+
+    class _File:
+        def __init__(self, path, mode):
+            self._f = open(path, mode)
+
+        def write(self, data):
+            writer_threads.add(threading.get_ident())
+            return self._f.write(data)
+
+        def close(self):
+            self._f.close()
+
+    monkeypatch.setattr(cron_executor, "open", _File, raising=False)
+    path = tmp_path / "run.log"
+
+    async def scenario():
+        run_log = _RunLogWriter(path)
+        await run_log.open()
+        for i in range(50):
+            run_log.write(b"%02d" % i * 20)
+            await asyncio.sleep(0)
+        await run_log.close(b"end")
+
+    asyncio.run(scenario())
+    assert path.read_bytes() == b"".join(b"%02d" % i * 20 for i in range(50)) + b"end"
+    assert writer_threads and threading.get_ident() not in writer_threads
+
+
+# ============ 结果复用 ============
+
+@pytest.fixture
+def fixed_prompt(monkeypatch):
+    monkeypatch.setattr(cron_executor, "get_cron_prompt", lambda task_id: "prompt")
+
+
+def test_fingerprint_tracks_declared_files(tmp_path, fixed_prompt):
+    (tmp_path / "logs").mkdir()
+    log = tmp_path / "logs" / "app.log"
+    log.write_text("v1")
+    (tmp_path / "other.txt").write_text("ignored")
+    memoize = MemoizeConfig(enabled=True, files=["logs/*.log"])
+
+    def fingerprint():
+        return asyncio.run(compute_input_fingerprint("task", str(tmp_path), memoize))
+
+    first = fingerprint()
+    (tmp_path / "other.txt").write_text("changed")
+    assert fingerprint() == first
+
+    log.write_text("v2")
+    assert fingerprint() != first
+
+
+def test_files_outside_project_are_ignored(tmp_path):
+    project = tmp_path / "project"
+    project.mkdir()
+    (tmp_path / "secret.txt").write_text("s1")
+    before = _hash_input_files(project, ["../secret.txt"])
+    (tmp_path / "secret.txt").write_text("s2")
+    assert _hash_input_files(project, ["../secret.txt"]) == before
+
+
+def test_commands_do_not_go_through_a_shell(tmp_path):
+    returncode, stdout = asyncio.run(_command_output("echo a; touch pwned", str(tmp_path)))
+    assert returncode == 0
+    assert stdout.strip() == b"a; touch pwned"
+    assert not (tmp_path / "pwned").exists()
+
+
+def test_hanging_command_times_out(tmp_path, monkeypatch, fixed_prompt):
+    monkeypatch.setattr(cron_executor, "FINGERPRINT_COMMAND_TIMEOUT", 0.2)
+    memoize = MemoizeConfig(enabled=True, commands=[f"{sys.executable} -c 'import time; time.sleep(30)'"])
+
+    started = time.monotonic()
+    assert asyncio.run(compute_input_fingerprint("task", str(tmp_path), memoize)) is None
+    assert time.monotonic() - started < 10
+
+
+def test_command_output_is_part_of_fingerprint(tmp_path, fixed_prompt):
+    marker = tmp_path / "marker"
+    marker.write_text("1")
+    memoize = MemoizeConfig(enabled=True, commands=["cat marker"])
+
+    first = asyncio.run(compute_input_fingerprint("task", str(tmp_path), memoize))
+    marker.write_text("2")
+    assert asyncio.run(compute_input_fingerprint("task", str(tmp_path), memoize)) != first
+
+    memoize.commands = ["cat 'unterminated"]
+    assert asyncio.run(compute_input_fingerprint("task", str(tmp_path), memoize)) is None
+
+
+def test_memoized_result_respects_fingerprint_and_ttl():
+    result = AnalysisResult(status="success", summary="ok")
+    memoize = MemoizeConfig(
+        enabled=True, ttl_minutes=1, fingerprint="abc",
+        result=dict(result.__dict__), result_at_ms=1_000
+    )
+
+    assert memoized_result(memoize, "abc", 1_000 + 30_000).summary == "ok"
+    assert memoized_result(memoize, "def", 1_000 + 30_000) is None
+    assert memoized_result(memoize, None, 1_000) is None
+    assert memoized_result(memoize, "abc", 1_000 + 61_000) is None
+
+    memoize.ttl_minutes = 0
+    assert memoized_result(memoize, "abc", 10 ** 12) is not None
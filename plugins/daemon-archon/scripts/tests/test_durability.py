@@ -0,0 +1,89 @@
+"""写入持久化策略测试"""
+
+import os
+
+import pytest
+
+from server import state_store
+from server.durability import GroupCommitter
+
+
+TASK_ID = "20260101_000000_cron"
+
+
+@pytest.fixture
+def fsync_calls(monkeypatch):
+    """记录 fsync 调用次数"""
+    calls = []
+    real_fsync = os.fsync
+
+    def fake_fsync(fd):
+        calls.append(fd)
+        real_fsync(fd)
+
+    monkeypatch.setattr(os, "fsync", fake_fsync)
+    return calls
+
+
+def _config():
+    return {"task_id": TASK_ID, "mode": "cron", "name": "n", "created_at": "2026-01-01T00:00:00"}
+
+
+def test_default_policy_never_fsyncs(fsync_calls):
+    assert state_store.save_task_config(TASK_ID, _config())
+    assert state_store.patch_task_config(TASK_ID, {"name": "m"})
+    assert state_store.set_task_status(TASK_ID, "active")
+    assert fsync_calls == []
+
+
+def test_fsync_policy_syncs_every_state_write(fsync_calls):
+    state_store.save_global_settings({"storage": {"durability": "fsync"}})
+    fsync_calls.clear()
+
+    assert state_store.save_task_config(TASK_ID, _config())
+    after_save = len(fsync_calls)
+    assert after_save >= 2
+
+    assert state_store.patch_task_config(TASK_ID, {"name": "m"})
+    assert len(fsync_calls) > after_save
+    assert state_store.load_task_config(TASK_ID)["name"] == "m"
+
+
+def test_group_policy_defers_to_committer(fsync_calls):
+    state_store.save_global_settings({"storage": {"durability": "group", "group_commit_ms": 60000}})
+    try:
+        fsync_calls.clear()
+        assert state_store.save_task_config(TASK_ID, _config())
+        assert state_store.set_task_status(TASK_ID, "active")
+        assert fsync_calls == []
+
+        state_store.stop_group_commit()
+        assert fsync_calls
+    finally:
+        state_store.stop_group_commit()
+        state_store._group_committer = None
+
+
+def test_group_committer_merges_writes(tmp_path, fsync_calls):
+    first, second = tmp_path / "a", tmp_path / "b"
+    first.write_text("1")
+    second.write_text("2")
+
+    committer = GroupCommitter(interval=60)
+    committer.add(first)
+    committer.add(first, sync_dir=True)
+    committer.add(second, sync_dir=True)
+    # 两个文件 + 共享的目录
+    assert committer.commit() == 3
+    assert committer.commit() == 0
+    committer.stop()
+
+
+def test_group_committer_ignores_deleted_files(tmp_path):
+    path = tmp_path / "gone"
+    path.write_text("x")
+    committer = GroupCommitter(interval=60)
+    committer.add(path)
+    path.unlink()
+    assert committer.commit() == 0
+    committer.stop()
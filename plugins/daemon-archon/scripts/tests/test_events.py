@@ -0,0 +1,84 @@
+"""结构化事件流测试"""
+
+import json
+
+from server import state_store
+
+
+TASK_ID = "20260101_000000_cron"
+
+
+def _write_events(count, start_ms=1_000_000):
+    """以固定时间戳写入 count 条事件"""
+    for i in range(count):
+        state_store._write_event_lines(
+            state_store.ensure_task_dir(TASK_ID),
+            [{"ts_ms": start_ms + i * 10, "type": "tick" if i % 2 else "tock", "n": i}]
+        )
+
+
+def test_append_log_writes_event_with_fields():
+    assert state_store.append_log(TASK_ID, "info", "执行完成", event="run_finished", status="success")
+    state_store.append_log(TASK_ID, "info", "普通日志")
+
+    events = state_store.query_events(TASK_ID)
+    assert [e["type"] for e in events] == ["run_finished", "log"]
+    assert events[0]["status"] == "success"
+    assert events[0]["message"] == "执行完成"
+    assert state_store.query_events(TASK_ID, event_type="run_finished", limit=5) == events[:1]
+
+
+def test_query_since_uses_sparse_index(monkeypatch):
+    monkeypatch.setattr(state_store, "EVENT_INDEX_BYTES", 256)
+    _write_events(200)
+
+    index = state_store._read_event_index(state_store.get_task_dir(TASK_ID) / "events.idx")
+    assert len(index) > 10
+    assert index[0] == (1_000_000, 0)
+
+    events = state_store.query_events(TASK_ID, since_ms=1_000_000 + 1234, limit=3)
+    assert [e["n"] for e in events] == [124, 125, 126]
+
+    events = state_store.query_events(TASK_ID, since_ms=1_000_000 + 1234, event_type="tick", limit=2)
+    assert [e["n"] for e in events] == [125, 127]
+
+
+def test_query_latest_returns_newest_in_order():
+    _write_events(50)
+    events = state_store.query_events(TASK_ID, limit=4)
+    assert [e["n"] for e in events] == [46, 47, 48, 49]
+
+
+def test_events_rotate_with_index(monkeypatch):
+    monkeypatch.setattr(state_store, "EVENT_INDEX_BYTES", 128)
+    state_store.save_global_settings({"logging": {"max_log_size_mb": 0.002, "max_log_files": 5}})
+    _write_events(150)
+
+    task_dir = state_store.get_task_dir(TASK_ID)
+    assert (task_dir / "events.jsonl.1").exists()
+    assert (task_dir / "events.idx.1").exists()
+
+    # 跨轮转文件按时间查询
+    first = json.loads((task_dir / "events.jsonl.1").read_text().splitlines()[0])
+    events = state_store.query_events(TASK_ID, since_ms=first["ts_ms"] + 5, limit=3)
+    assert [e["n"] for e in events] == [first["n"] + 1, first["n"] + 2, first["n"] + 3]
+    assert [e["n"] for e in state_store.query_events(TASK_ID, limit=2)] == [148, 149]
+
+
+def test_corrupt_index_tail_does_not_block_appends(monkeypatch):
+    monkeypatch.setattr(state_store, "EVENT_INDEX_BYTES", 256)
+    _write_events(20)
+    task_dir = state_store.get_task_dir(TASK_ID)
+    # 写到一半中断的索引行
+    with open(task_dir / "events.idx", "a") as f:
+        f.write("1000500 12x")
+    size = (task_dir / "events.jsonl").stat().st_size
+
+    assert state_store.append_log(TASK_ID, "info", "索引损坏后的日志")
+    assert state_store.read_log(TASK_ID, 1)[0].rstrip().endswith("索引损坏后的日志")
+
+    # 损坏的行被跳过，新事件从当前偏移重新建立索引
+    index = state_store._read_event_index(task_dir / "events.idx")
+    assert index[-1][1] == size
+    events = state_store.query_events(TASK_ID, since_ms=1_000_000 + 150, limit=100)
+    assert [e.get("n") for e in events] == list(range(15, 20)) + [None]
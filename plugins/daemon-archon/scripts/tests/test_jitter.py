@@ -0,0 +1,72 @@
+"""调度错峰测试"""
+
+import asyncio
+from datetime import datetime, timezone
+
+from apscheduler.triggers.interval import IntervalTrigger
+
+from server import state_store
+from server.scheduler import ArchonScheduler, OffsetTrigger, task_phase
+
+
+def _cron_config(task_id):
+    return {"task_id": task_id, "mode": "cron", "name": task_id, "schedule": {"check_interval_minutes": 60}}
+
+
+def _offsets(jitter, task_ids, remove=()):
+    """按错峰模式添加任务，返回 {task_id: 偏移秒数}"""
+    state_store.save_global_settings({"scheduler": {"jobstore": "memory", "jitter": jitter}})
+
+    async def scenario():
+        scheduler = ArchonScheduler()
+        await scheduler.start()
+        for task_id in task_ids:
+            await scheduler.add_cron_task(task_id, _cron_config(task_id))
+        for task_id in remove:
+            await scheduler.remove_task(task_id, "cron")
+
+        offsets = {}
+        for job in scheduler.scheduler.get_jobs():
+            trigger = job.trigger
+            offsets[job.args[0]] = trigger.offset.total_seconds() if isinstance(trigger, OffsetTrigger) else None
+        await scheduler.stop()
+        return offsets
+
+    return asyncio.run(scenario())
+
+
+def test_task_phase_is_stable_and_bounded():
+    assert task_phase("a") == task_phase("a")
+    assert task_phase("a") != task_phase("b")
+    assert all(0 <= task_phase(str(i)) < 1 for i in range(100))
+
+
+def test_offset_trigger_shifts_fire_times():
+    base = IntervalTrigger(minutes=60, start_date=datetime(2026, 1, 1, tzinfo=timezone.utc))
+    trigger = OffsetTrigger(base, 600)
+    now = datetime(2026, 1, 1, 0, 30, tzinfo=timezone.utc)
+
+    first = trigger.get_next_fire_time(None, now)
+    assert first == datetime(2026, 1, 1, 1, 10, tzinfo=timezone.utc)
+    second = trigger.get_next_fire_time(first, first)
+    assert second == datetime(2026, 1, 1, 2, 10, tzinfo=timezone.utc)
+
+
+def test_hash_mode_uses_fixed_phase():
+    offsets = _offsets("hash", ["t1", "t2"])
+    assert offsets == {
+        "t1": round(task_phase("t1") * 3600, 3),
+        "t2": round(task_phase("t2") * 3600, 3),
+    }
+
+
+def test_spread_mode_distributes_evenly_and_respreads():
+    offsets = _offsets("spread", ["t1", "t2", "t3", "t4"])
+    assert offsets == {"t1": 0, "t2": 900, "t3": 1800, "t4": 2700}
+
+    offsets = _offsets("spread", ["t1", "t2", "t3", "t4"], remove=["t4"])
+    assert offsets == {"t1": 0, "t2": 1200, "t3": 2400}
+
+
+def test_none_mode_keeps_plain_triggers():
+    assert _offsets("none", ["t1"]) == {"t1": None}
@@ -0,0 +1,130 @@
+"""调度任务持久化与补执行测试"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.interval import IntervalTrigger
+
+from server import state_store
+from server.jobstore import SQLiteJobStore
+from server.scheduler import ArchonScheduler, run_cron_task
+
+
+TASK_ID = "20260101_000000_cron"
+
+
+def _create_cron_task():
+    state_store.save_task_config(TASK_ID, {
+        "task_id": TASK_ID,
+        "mode": "cron",
+        "name": "备份",
+        "schedule": {"check_interval_minutes": 60},
+    })
+    state_store.set_task_status(TASK_ID, "active")
+
+
+async def _seed_missed_job(hours: float) -> None:
+    """模拟停机前保存的调度任务：下次运行时间已过去若干小时（不错峰）"""
+    scheduler = AsyncIOScheduler(jobstores={"default": SQLiteJobStore(state_store.get_base_dir() / "scheduler.db")})
+    scheduler.start(paused=True)
+    scheduler.add_job(
+        run_cron_task,
+        trigger=IntervalTrigger(minutes=60),
+        id=f"cron_{TASK_ID}",
+        args=[TASK_ID],
+        next_run_time=datetime.now(timezone.utc) - timedelta(hours=hours)
+    )
+    scheduler.shutdown(wait=False)
+    await asyncio.sleep(0)
+
+
+def test_restart_keeps_next_run_time():
+    _create_cron_task()
+
+    async def scenario():
+        first = ArchonScheduler()
+        await first.start()
+        before = first.get_job_info(TASK_ID, "cron")
+        await first.stop()
+
+        second = ArchonScheduler()
+        await second.start()
+        after = second.get_job_info(TASK_ID, "cron")
+        await second.stop()
+        return before, after
+
+    before, after = asyncio.run(scenario())
+    assert before["next_run_time"] is not None
+    assert after["next_run_time"] == before["next_run_time"]
+
+
+def test_jobs_of_stopped_tasks_are_dropped():
+    _create_cron_task()
+
+    async def scenario():
+        first = ArchonScheduler()
+        await first.start()
+        await first.stop()
+
+        state_store.set_task_status(TASK_ID, "stopped")
+        second = ArchonScheduler()
+        await second.start()
+        jobs = second.list_jobs()
+        await second.stop()
+        return jobs
+
+    assert asyncio.run(scenario()) == []
+
+
+def test_run_all_catches_up_missed_runs_with_cap():
+    _create_cron_task()
+    state_store.save_global_settings({"scheduler": {
+        "catch_up": "run_all", "max_catch_up_runs": 2, "jitter": "none"
+    }})
+
+    async def scenario():
+        await _seed_missed_job(hours=5)
+        scheduler = ArchonScheduler()
+        await scheduler.start()
+        catch_up = scheduler.scheduler.get_job(f"catchup_cron_{TASK_ID}")
+        job = scheduler.scheduler.get_job(f"cron_{TASK_ID}")
+        result = (catch_up.args if catch_up else None, job.next_run_time)
+        await scheduler.stop()
+        return result
+
+    args, next_run_time = asyncio.run(scenario())
+    assert list(args) == ["cron", TASK_ID, 2]
+    assert next_run_time > datetime.now(timezone.utc)
+
+    events = state_store.query_events(TASK_ID, event_type="catch_up")
+    assert events[-1]["runs"] == 2 and events[-1]["policy"] == "run_all"
+
+
+def test_skip_policy_only_reschedules():
+    _create_cron_task()
+    state_store.save_global_settings({"scheduler": {"catch_up": "skip", "jitter": "none"}})
+
+    async def scenario():
+        await _seed_missed_job(hours=5)
+        scheduler = ArchonScheduler()
+        await scheduler.start()
+        catch_up = scheduler.scheduler.get_job(f"catchup_cron_{TASK_ID}")
+        await scheduler.stop()
+        return catch_up
+
+    assert asyncio.run(scenario()) is None
+    assert state_store.query_events(TASK_ID, event_type="catch_up")[-1]["runs"] == 0
+
+
+def test_memory_jobstore_does_not_persist():
+    _create_cron_task()
+    state_store.save_global_settings({"scheduler": {"jobstore": "memory"}})
+
+    async def scenario():
+        scheduler = ArchonScheduler()
+        await scheduler.start()
+        await scheduler.stop()
+
+    asyncio.run(scenario())
+    assert not (state_store.get_base_dir() / "scheduler.db").exists()
@@ -0,0 +1,94 @@
+"""后台日志写入线程测试"""
+
+import threading
+
+from server import state_store
+from server.log_writer import TaskLogWriter
+
+
+class _Sink:
+    """记录每次批量写入"""
+
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, task_id, entries):
+        with self.lock:
+            self.calls.append((task_id, list(entries)))
+
+
+def test_writer_groups_entries_per_task_and_keeps_order():
+    sink = _Sink()
+    writer = TaskLogWriter(sink, flush_interval=60, max_batch=1000)
+    writer.start()
+    for i in range(5):
+        writer.submit("a", i)
+        writer.submit("b", i)
+    assert writer.flush(5)
+    writer.stop()
+
+    assert sink.calls == [("a", [0, 1, 2, 3, 4]), ("b", [0, 1, 2, 3, 4])]
+
+
+def test_writer_flushes_when_batch_is_full():
+    sink = _Sink()
+    writer = TaskLogWriter(sink, flush_interval=60, max_batch=3)
+    writer.start()
+    for i in range(7):
+        writer.submit("a", i)
+    assert writer.flush(5)
+    writer.stop()
+
+    assert [entries for _, entries in sink.calls] == [[0, 1, 2], [3, 4, 5], [6]]
+
+
+def test_writer_survives_sink_errors():
+    calls = []
+
+    def sink(task_id, entries):
+        calls.append(task_id)
+        if task_id == "bad":
+            raise OSError("磁盘已满")
+
+    writer = TaskLogWriter(sink, flush_interval=60)
+    writer.start()
+    writer.submit("bad", 1)
+    writer.submit("good", 1)
+    assert writer.flush(5)
+    assert writer.running
+    writer.stop()
+
+    assert calls == ["bad", "good"]
+
+
+def test_stop_writes_pending_entries():
+    sink = _Sink()
+    writer = TaskLogWriter(sink, flush_interval=60)
+    writer.start()
+    writer.submit("a", 1)
+    writer.stop()
+
+    assert sink.calls == [("a", [1])]
+    assert not writer.running
+
+
+def test_append_log_goes_through_writer_and_read_log_flushes():
+    state_store.start_log_writer()
+    for i in range(10):
+        assert state_store.append_log("t1", "info", f"消息 {i}")
+
+    lines = state_store.read_log("t1", lines=3)
+    assert [line.rstrip().split("消息 ")[1] for line in lines] == ["7", "8", "9"]
+    assert "[INFO]" in lines[-1]
+
+
+def test_stop_log_writer_falls_back_to_sync_writes():
+    state_store.start_log_writer()
+    state_store.append_log("t1", "info", "异步")
+    state_store.stop_log_writer()
+    state_store.append_log("t1", "info", "同步")
+
+    lines = state_store.read_log("t1")
+    assert lines[-2].rstrip().endswith("异步")
+    assert lines[-1].rstrip().endswith("同步")
@@ -0,0 +1,36 @@
+"""archon.log 轮转与尾部读取测试"""
+
+from server import state_store
+from server.state_store import (
+    append_log, get_task_dir, read_log, read_tail_lines, save_global_settings
+)
+
+
+def test_read_tail_lines_across_blocks(tmp_path, monkeypatch):
+    monkeypatch.setattr(state_store, "TAIL_BLOCK_SIZE", 16)
+    path = tmp_path / "log"
+    path.write_text("".join(f"line {i}\n" for i in range(100)))
+
+    assert read_tail_lines(path, 3) == ["line 97\n", "line 98\n", "line 99\n"]
+    assert len(read_tail_lines(path, 1000)) == 100
+    assert read_tail_lines(path, 0) == []
+
+
+def test_log_rotates_and_reads_through_rotated_files():
+    # 单文件约 1 KB，最多保留 3 个文件
+    save_global_settings({"logging": {"max_log_size_mb": 0.001, "max_log_files": 3}})
+    task_id = "20260101_000000_cron"
+    for i in range(150):
+        append_log(task_id, "INFO", f"消息 {i:03d}")
+
+    logs = read_log(task_id, lines=1000)
+    task_dir = get_task_dir(task_id)
+    assert (task_dir / "archon.log.1").exists()
+    assert not (task_dir / "archon.log.3").exists()
+
+    # 最新的日志完整且有序，最旧的已随轮转删除
+    assert "消息 149" in logs[-1]
+    numbers = [int(line.rsplit(" ", 1)[1]) for line in logs]
+    assert numbers == sorted(numbers) and numbers[0] > 0
+
+    assert [int(line.rsplit(" ", 1)[1]) for line in read_log(task_id, lines=5)] == list(range(145, 150))
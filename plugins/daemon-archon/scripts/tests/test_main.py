@@ -0,0 +1,42 @@
+"""HTTP API 辅助函数测试"""
+
+import asyncio
+import time
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from server.main import _parse_since, get_task_events, get_task_logs
+from server.state_store import append_log
+
+
+def test_parse_since_utc_and_offsets():
+    expected = int(datetime(2026, 1, 1, tzinfo=timezone.utc).timestamp() * 1000)
+    assert _parse_since("2026-01-01T00:00:00Z") == expected
+    assert _parse_since("2026-01-01T08:00:00+08:00") == expected
+    assert _parse_since(str(expected)) == expected
+
+
+def test_parse_since_naive_is_local_time():
+    local = datetime(2026, 1, 1, 12, 30)
+    assert _parse_since("2026-01-01T12:30:00") == int(local.timestamp() * 1000)
+
+
+def test_parse_since_rejects_garbage():
+    with pytest.raises(HTTPException) as excinfo:
+        _parse_since("yesterday")
+    assert excinfo.value.status_code == 400
+
+
+def test_log_and_event_handlers_read_flushed_entries():
+    task_id = "20260101_000000_cron"
+    before_ms = int(time.time() * 1000) - 1000
+    append_log(task_id, "INFO", "执行完成", event="run_finished", status="success")
+
+    logs = asyncio.run(get_task_logs(task_id, lines=10))["logs"]
+    assert any("执行完成" in line for line in logs)
+
+    events = asyncio.run(get_task_events(task_id, since=str(before_ms), type="run_finished"))
+    assert events["count"] == 1
+    assert events["events"][0]["status"] == "success"
@@ -0,0 +1,103 @@
+"""任务配置模型测试"""
+
+import pytest
+
+from server import state_store
+from server.types import (
+    SCHEMA_VERSION, CronTaskConfig, ExecutionConfig, ProbeTaskConfig, TaskStatus,
+    task_config_from_dict
+)
+
+
+def _cron_config():
+    return {
+        "task_id": "20260101_000000_cron",
+        "mode": "cron",
+        "name": "备份",
+        "state": {"status": "paused", "future_field": 1},
+        "execution": {"run_count": 3, "last_result": "success"},
+        "added_by_newer_version": {"a": [1, 2]},
+    }
+
+
+def test_models_use_slots():
+    model = task_config_from_dict(_cron_config())
+    assert isinstance(model, CronTaskConfig)
+    assert not hasattr(model, "__dict__")
+    with pytest.raises(AttributeError):
+        model.execution.not_a_field = 1
+
+
+def test_from_dict_materializes_nested_models_and_enums():
+    model = task_config_from_dict(_cron_config())
+    assert model.state.status is TaskStatus.PAUSED
+    assert isinstance(model.execution, ExecutionConfig)
+    assert model.execution.run_count == 3
+    assert model.schema_version == SCHEMA_VERSION
+    assert isinstance(task_config_from_dict({"task_id": "p", "mode": "probe", "name": "p"}), ProbeTaskConfig)
+
+
+def test_unknown_fields_survive_round_trip():
+    data = task_config_from_dict(_cron_config()).to_dict()
+    assert data["added_by_newer_version"] == {"a": [1, 2]}
+    assert data["state"]["future_field"] == 1
+    assert data["state"]["status"] == "paused"
+    assert data["execution"]["run_count"] == 3
+
+
+def test_clone_is_independent():
+    model = task_config_from_dict(_cron_config())
+    copy = model.clone()
+    copy.execution.run_count = 99
+    copy.set_field("added_by_newer_version", None)
+    assert model.execution.run_count == 3
+    assert model.get_field("added_by_newer_version") == {"a": [1, 2]}
+
+
+def test_set_field_converts_dicts_to_models():
+    model = task_config_from_dict(_cron_config())
+    model.set_field("execution", {"run_count": 7})
+    assert model.execution.run_count == 7
+    model.set_field("state", {"status": "stopped"})
+    assert model.state.status is TaskStatus.STOPPED
+
+
+def test_load_task_model_returns_copies_and_patches_apply():
+    task_id = "20260101_000000_cron"
+    assert state_store.save_task_config(task_id, _cron_config())
+
+    model = state_store.load_task_model(task_id)
+    assert model.execution.run_count == 3
+    model.execution.run_count = 100
+    assert state_store.load_task_model(task_id).execution.run_count == 3
+
+    assert state_store.patch_task_config(task_id, increments={"execution.run_count": 1})
+    assert state_store.load_task_model(task_id).execution.run_count == 4
+    assert state_store.load_task_config(task_id)["execution"]["run_count"] == 4
+
+
+def test_missing_fields_are_not_invented():
+    data = {"task_id": "x", "mode": "cron"}
+    model = task_config_from_dict(dict(data))
+    assert model.to_dict() == dict(data, schema_version=SCHEMA_VERSION)
+    assert model.clone().to_dict() == model.to_dict()
+
+    # 写入缺失的字段后才输出，嵌套模型只输出写入过的字段
+    model.name = "n"
+    model.state.set_field("status", "stopped")
+    assert model.to_dict() == dict(data, name="n", state={"status": "stopped"}, schema_version=SCHEMA_VERSION)
+
+
+def test_load_task_config_returns_stored_fields():
+    task_id = "20260101_000000_cron"
+    stored = {"task_id": task_id, "mode": "cron", "schema_version": SCHEMA_VERSION}
+    assert state_store.save_task_config(task_id, stored)
+    assert state_store.load_task_config(task_id) == stored
+
+    assert state_store.patch_task_config(task_id, updates={"state.status": "stopped"})
+    expected = dict(stored, state={"status": "stopped"})
+    assert state_store.load_task_config(task_id) == expected
+
+    # 不经过缓存，从快照和增量重新读取
+    state_store._config_cache.clear()
+    assert state_store.load_task_config(task_id) == expected
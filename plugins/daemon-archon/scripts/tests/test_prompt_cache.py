@@ -0,0 +1,56 @@
+"""Cron 提示词缓存测试"""
+
+import pytest
+
+from server import cron_executor
+from server.cron_executor import PROMPT_PREAMBLE, get_cron_prompt, render_cron_prompt
+from server.state_store import get_task_dir, save_task_md, save_workflow
+
+
+TASK_ID = "20260101_000000_cron"
+
+
+@pytest.fixture(autouse=True)
+def clear_prompt_cache():
+    cron_executor._prompt_cache.clear()
+    cron_executor._prompt_cache_stats.update(hits=0, misses=0)
+    yield
+    cron_executor._prompt_cache.clear()
+
+
+def _stats():
+    return dict(cron_executor._prompt_cache_stats)
+
+
+def test_stable_prefix_and_normalized_sections():
+    prompt = render_cron_prompt("任务\r\n内容\n\n", "  流程\r\n")
+    assert prompt.startswith(PROMPT_PREAMBLE)
+    assert prompt.index("# 工作流程") < prompt.index("# 任务描述")
+    assert "\r" not in prompt
+    assert prompt == render_cron_prompt("任务\n内容", "流程")
+    # 不同任务共享相同的前缀
+    assert render_cron_prompt("a", "流程").startswith(prompt[:prompt.index("# 任务描述")])
+
+
+def test_prompt_is_cached_until_inputs_change():
+    save_task_md(TASK_ID, "检查磁盘")
+    save_workflow(TASK_ID, "1. df -h")
+
+    first = get_cron_prompt(TASK_ID)
+    assert get_cron_prompt(TASK_ID) is first
+    assert _stats() == {"hits": 1, "misses": 1}
+
+    save_workflow(TASK_ID, "1. df -h\n2. du -sh")
+    second = get_cron_prompt(TASK_ID)
+    assert "du -sh" in second
+    assert _stats()["misses"] == 2
+
+
+def test_external_edits_invalidate_cache():
+    save_task_md(TASK_ID, "检查磁盘")
+    save_workflow(TASK_ID, "1. df -h")
+    get_cron_prompt(TASK_ID)
+
+    (get_task_dir(TASK_ID) / "task.md").write_text("检查磁盘和内存", encoding="utf-8")
+    assert "检查磁盘和内存" in get_cron_prompt(TASK_ID)
+    assert _stats()["misses"] == 2
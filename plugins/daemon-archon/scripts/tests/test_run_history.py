@@ -0,0 +1,60 @@
+"""Cron 执行历史测试"""
+
+from server.archive import archive_task, restore_task
+from server.run_history import get_run_history, percentile, query_runs, record_run
+from server.state_store import delete_task_config, save_task_config, set_task_status
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile(values, 100) == 100
+    assert percentile([7], 99) == 7
+    assert percentile([], 50) is None
+
+
+def test_stats_and_keep_limit():
+    history = get_run_history()
+    history.keep = 5
+    statuses = ["success", "error", "success", "timeout", "success", "success", "success"]
+    for i, status in enumerate(statuses):
+        record_run("task", f"run_{i}", 1_000 * i, duration_ms=100 * (i + 1), status=status)
+
+    result = query_runs("task")
+    assert [run["run_id"] for run in result["runs"]] == ["run_6", "run_5", "run_4", "run_3", "run_2"]
+    stats = result["stats"]
+    assert stats["runs"] == 5
+    assert stats["failures"] == 1
+    assert stats["failure_rate"] == 0.2
+    assert stats["duration_ms"]["p50"] == 500
+    assert stats["duration_ms"]["max"] == 700
+    assert query_runs("task", window=2)["stats"]["duration_ms"]["avg"] == 650
+
+
+def _create_task(task_id):
+    save_task_config(task_id, {"task_id": task_id, "mode": "cron", "name": "t", "created_at": "2026-01-01"})
+    set_task_status(task_id, "stopped")
+    record_run(task_id, "run_1", 1_000, duration_ms=10, status="success", metrics={"n": 1})
+
+
+def test_deleting_task_removes_its_history():
+    _create_task("20260101_000000_cron")
+    record_run("other", "run_1", 1_000, duration_ms=10, status="success")
+
+    assert delete_task_config("20260101_000000_cron")
+    assert query_runs("20260101_000000_cron")["runs"] == []
+    assert len(query_runs("other")["runs"]) == 1
+
+
+def test_archive_keeps_history_for_restore():
+    task_id = "20260101_000000_cron"
+    _create_task(task_id)
+
+    assert archive_task(task_id)
+    assert query_runs(task_id)["runs"] == []
+
+    assert restore_task(task_id)
+    runs = query_runs(task_id)["runs"]
+    assert [(run["run_id"], run["metrics"]) for run in runs] == [("run_1", {"n": 1})]
@@ -0,0 +1,87 @@
+"""Cron 调度类型测试"""
+
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.date import DateTrigger
+
+from server import state_store
+from server.scheduler import (
+    ArchonScheduler, anchored_interval_trigger, resolve_cron_schedule, validate_cron_schedule
+)
+from server.types import CronSchedule, CronScheduleKind
+
+
+def _utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def test_legacy_configs_resolve_to_cron_or_every():
+    schedule = resolve_cron_schedule({"schedule": {"cron_expression": "0 9 * * *"}})
+    assert schedule.kind == CronScheduleKind.CRON and schedule.expr == "0 9 * * *"
+
+    schedule = resolve_cron_schedule({"schedule": {"check_interval_minutes": 15}})
+    assert schedule.kind == CronScheduleKind.EVERY and schedule.every_ms == 15 * 60000
+
+    schedule = resolve_cron_schedule({"cron_schedule": {"kind": "at", "at_ms": 1}})
+    assert schedule.kind == CronScheduleKind.AT and schedule.at_ms == 1
+
+
+@pytest.mark.parametrize("schedule", [
+    CronSchedule(kind=CronScheduleKind.AT),
+    CronSchedule(kind=CronScheduleKind.EVERY, every_ms=10),
+    CronSchedule(kind=CronScheduleKind.CRON),
+    CronSchedule(kind=CronScheduleKind.CRON, expr="0 9 * * *", tz="Mars/Olympus"),
+    CronSchedule(kind="weekly"),
+])
+def test_invalid_schedules_are_rejected(schedule):
+    with pytest.raises(ValueError):
+        validate_cron_schedule(schedule)
+
+
+def test_anchored_interval_fires_on_fixed_slots():
+    anchor_ms = int(_utc(2026, 1, 1, 0, 7).timestamp() * 1000)
+    trigger = anchored_interval_trigger(15 * 60000, anchor_ms)
+
+    now = _utc(2026, 3, 1, 12, 0)
+    first = trigger.get_next_fire_time(None, now)
+    assert first == _utc(2026, 3, 1, 12, 7)
+    assert trigger.get_next_fire_time(first, first) == _utc(2026, 3, 1, 12, 22)
+
+
+def _trigger_for(cron_schedule):
+    task_id = "20260101_000000_cron"
+    config = {"task_id": task_id, "mode": "cron", "name": task_id, "cron_schedule": cron_schedule}
+    state_store.save_global_settings({"scheduler": {"jobstore": "memory", "jitter": "hash"}})
+
+    async def scenario():
+        scheduler = ArchonScheduler()
+        await scheduler.start()
+        await scheduler.add_cron_task(task_id, config)
+        job = scheduler.scheduler.get_job(f"cron_{task_id}")
+        await scheduler.stop()
+        return job.trigger
+
+    return asyncio.run(scenario())
+
+
+def test_at_schedule_uses_date_trigger():
+    at_ms = int(_utc(2030, 1, 1).timestamp() * 1000)
+    trigger = _trigger_for({"kind": "at", "at_ms": at_ms})
+    assert isinstance(trigger, DateTrigger)
+    assert trigger.run_date == _utc(2030, 1, 1)
+
+
+def test_cron_schedule_keeps_time_zone():
+    trigger = _trigger_for({"kind": "cron", "expr": "0 9 * * *", "tz": "Asia/Shanghai"})
+    base = getattr(trigger, "trigger", trigger)
+    assert isinstance(base, CronTrigger)
+    assert str(base.timezone) == "Asia/Shanghai"
+
+
+def test_anchored_every_is_not_jittered():
+    anchor_ms = int(_utc(2026, 1, 1, 0, 7).timestamp() * 1000)
+    trigger = _trigger_for({"kind": "every", "every_ms": 15 * 60000, "anchor_ms": anchor_ms})
+    assert trigger.offset.total_seconds() == 7 * 60
@@ -0,0 +1,114 @@
+"""调度器并发控制测试"""
+
+import asyncio
+
+import pytest
+
+from server.scheduler import ConcurrencyGovernor, ConcurrencyLimitError, get_scheduler
+
+
+def test_limits_and_release_accounting():
+    async def scenario():
+        governor = ConcurrencyGovernor(max_total=3, max_per_project=2, max_per_mode={"cron": 1})
+        assert await governor.acquire("a", "/p1", "probe") == 1
+        assert await governor.acquire("b", "/p1", "cron") == 1
+
+        # /p1 已达项目上限，cron 已达模式上限
+        blocked_project = asyncio.ensure_future(governor.acquire("c", "/p1", "probe"))
+        blocked_mode = asyncio.ensure_future(governor.acquire("d", "/p2", "cron"))
+        await asyncio.sleep(0)
+        assert governor.stats()["running"] == 2
+        assert governor.queue_depth() == 2
+
+        governor.release("/p1", "cron", 1)
+        await asyncio.sleep(0)
+        assert blocked_project.done() and blocked_mode.done()
+        assert governor.stats()["running_by_project"] == {"/p1": 2, "/p2": 1}
+
+        for project, mode in (("/p1", "probe"), ("/p1", "probe"), ("/p2", "cron")):
+            governor.release(project, mode, 1)
+        stats = governor.stats()
+        assert stats["running"] == 0
+        assert stats["running_by_project"] == {} and stats["running_by_mode"] == {}
+        assert stats["granted"] == 4 and stats["delayed"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_queued_projects_are_released_round_robin():
+    async def scenario():
+        governor = ConcurrencyGovernor(max_total=1, max_per_project=0)
+        order = []
+
+        async def run(task_id, project):
+            async with governor.slot(task_id, project, "cron"):
+                order.append(task_id)
+                await asyncio.sleep(0)
+
+        await asyncio.gather(
+            run("busy", "/p0"),
+            run("a1", "/a"), run("a2", "/a"), run("a3", "/a"),
+            run("b1", "/b")
+        )
+        assert order == ["busy", "a1", "b1", "a2", "a3"]
+
+    asyncio.run(scenario())
+
+
+def test_weight_never_exceeds_total():
+    async def scenario():
+        governor = ConcurrencyGovernor(max_total=2, weights={"cron": 5})
+        async with governor.slot("a", "/p", "cron"):
+            assert governor.stats()["running"] == 2
+        assert governor.stats()["running"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_slot_timeout_does_not_leak():
+    async def scenario():
+        governor = ConcurrencyGovernor(max_total=1)
+        async with governor.slot("a", "/p", "cron"):
+            with pytest.raises(ConcurrencyLimitError):
+                async with governor.slot("b", "/p", "cron", timeout=0.01):
+                    pass
+            assert governor.queue_depth() == 0
+        assert governor.stats()["running"] == 0
+
+        async with governor.slot("c", "/p", "cron", timeout=0.01):
+            assert governor.stats()["running"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_manual_and_scheduled_runs_share_slots():
+    async def scenario():
+        scheduler = get_scheduler()
+        scheduler.governor = ConcurrencyGovernor(max_total=1)
+        try:
+            async with scheduler.concurrency_slot("task_a", "cron"):
+                with pytest.raises(ConcurrencyLimitError):
+                    async with scheduler.concurrency_slot("task_b", "probe", timeout=0.01):
+                        pass
+            assert scheduler.governor.stats()["running"] == 0
+        finally:
+            scheduler.governor = None
+
+    asyncio.run(scenario())
+
+
+def test_governor_is_unlimited_unless_enabled():
+    async def scenario():
+        governor = ConcurrencyGovernor.from_settings({"max_total": 1})
+        for task_id in ("a", "b", "c"):
+            await governor.acquire(task_id, "/p", "cron")
+        assert governor.stats()["running"] == 3
+        assert governor.queue_depth() == 0
+
+        limited = ConcurrencyGovernor.from_settings({"enabled": True, "max_total": 1})
+        await limited.acquire("a", "/p", "cron")
+        with pytest.raises(ConcurrencyLimitError):
+            async with limited.slot("b", "/p", "cron", timeout=0.01):
+                pass
+
+    asyncio.run(scenario())
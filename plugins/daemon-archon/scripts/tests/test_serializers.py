@@ -0,0 +1,51 @@
+"""任务配置序列化测试"""
+
+import pytest
+
+from server import serializers, state_store
+from server.serializers import (
+    MSGPACK_MAGIC, available_serializers, decode_config, encode_config, resolve_serializer
+)
+
+
+CONFIG = {"task_id": "20260101_000000_cron", "mode": "cron", "name": "中文", "n": [1, 2.5, None]}
+
+
+@pytest.mark.parametrize("name", available_serializers())
+def test_round_trip(name):
+    assert decode_config(encode_config(CONFIG, name)) == CONFIG
+
+
+def test_formats_are_detected_from_content():
+    pretty = encode_config(CONFIG, "json")
+    compact = encode_config(CONFIG, "compact")
+    assert b"\n" in pretty and b"\n" not in compact
+    assert decode_config(pretty) == decode_config(compact) == CONFIG
+
+
+def test_unknown_serializer_falls_back_to_json():
+    assert resolve_serializer("yaml") == "json"
+    if "msgpack" not in available_serializers():
+        assert resolve_serializer("msgpack") == "json"
+
+
+def test_msgpack_file_without_msgpack_is_rejected(monkeypatch):
+    monkeypatch.setattr(serializers, "msgpack", None)
+    with pytest.raises(ValueError):
+        decode_config(MSGPACK_MAGIC + b"\x80")
+
+
+def test_switching_serializer_converts_on_next_save():
+    task_id = CONFIG["task_id"]
+    assert state_store.save_task_config(task_id, dict(CONFIG))
+    config_file = state_store.get_task_dir(task_id) / "config.json"
+    assert b"\n" in config_file.read_bytes()
+
+    state_store.save_global_settings({"storage": {"serializer": "compact"}})
+    state_store._config_cache.clear()
+    assert state_store.load_task_config(task_id)["name"] == "中文"
+
+    assert state_store.save_task_config(task_id, dict(CONFIG, name="新"))
+    assert b"\n" not in config_file.read_bytes()
+    state_store._config_cache.clear()
+    assert state_store.load_task_config(task_id)["name"] == "新"
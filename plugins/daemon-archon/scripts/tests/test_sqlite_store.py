@@ -0,0 +1,87 @@
+"""SQLite 存储引擎测试"""
+
+from server.sqlite_store import SqliteStateStore, migrate_directory_layout
+from server.state_store import (
+    append_correction, append_log, count_tasks, delete_task_config, get_base_dir,
+    get_storage_engine, get_task_status, list_task_summaries, load_corrections,
+    load_task_config, query_events, read_log, save_global_settings, save_task_config,
+    set_task_status
+)
+
+from conftest import reset_state_store
+
+
+def _config(task_id, mode="cron"):
+    return {"task_id": task_id, "mode": mode, "name": task_id, "created_at": task_id[:15]}
+
+
+def _use_sqlite():
+    save_global_settings({"storage": {"engine": "sqlite"}})
+    reset_state_store()
+    assert isinstance(get_storage_engine(), SqliteStateStore)
+
+
+def test_directory_store_is_default():
+    assert get_storage_engine() is None
+
+
+def test_state_store_api_on_sqlite():
+    _use_sqlite()
+    task_id = "20260101_000001_cron"
+    assert save_task_config(task_id, _config(task_id))
+    assert set_task_status(task_id, "active")
+    save_task_config("20260101_000002_probe", _config("20260101_000002_probe", "probe"))
+
+    assert load_task_config(task_id)["name"] == task_id
+    assert get_task_status(task_id) == "active"
+    assert count_tasks(mode="cron", status="active") == 1
+    assert [s["task_id"] for s in list_task_summaries(mode="probe")] == ["20260101_000002_probe"]
+    # 任务数据保存在数据库中，不创建任务目录
+    assert not (get_base_dir() / task_id / "config.json").exists()
+
+    append_log(task_id, "INFO", "第一条")
+    append_log(task_id, "ERROR", "第二条")
+    logs = read_log(task_id, lines=1)
+    assert len(logs) == 1 and "第二条" in logs[0]
+
+    append_correction(task_id, {"reason": "测试"})
+    append_correction(task_id, {"reason": "再次"})
+    assert "测试" in load_corrections(task_id) and "再次" in load_corrections(task_id)
+
+    assert delete_task_config(task_id)
+    assert load_task_config(task_id) is None
+    assert count_tasks() == 1
+
+
+def test_migrate_directory_layout(tmp_path):
+    task_id = "20260101_000001_cron"
+    save_task_config(task_id, _config(task_id))
+    set_task_status(task_id, "stopped")
+    append_log(task_id, "INFO", "迁移前的日志")
+    append_correction(task_id, {"reason": "迁移前的纠偏"})
+
+    store = SqliteStateStore(tmp_path / "archon.db")
+    stats = migrate_directory_layout(store)
+    assert stats["tasks"] == 1 and stats["logs"] >= 1
+
+    assert store.load_task_config(task_id)["name"] == task_id
+    assert store.get_task_status(task_id) == "stopped"
+    assert any("迁移前的日志" in line for line in store.read_log(task_id))
+    assert "迁移前的纠偏" in store.load_corrections(task_id)
+
+    # 可重复执行
+    assert migrate_directory_layout(store)["tasks"] == 1
+    assert store.count_tasks() == 1
+
+
+def test_events_on_sqlite():
+    _use_sqlite()
+    task_id = "20260101_000001_cron"
+    save_task_config(task_id, _config(task_id))
+    append_log(task_id, "info", "开始", event="run_started")
+    append_log(task_id, "info", "完成", event="run_finished", status="success", duration_ms=12)
+
+    events = query_events(task_id)
+    assert [e["type"] for e in events] == ["run_started", "run_finished"]
+    assert events[1]["duration_ms"] == 12
+    assert query_events(task_id, since_ms=events[1]["ts_ms"], event_type="run_finished") == events[1:]
@@ -0,0 +1,100 @@
+"""state_store 配置存储测试：字段级更新、增量重放与合并"""
+
+import json
+
+import pytest
+
+from server import state_store
+from server.state_store import (
+    get_task_dir, load_task_config, patch_task_config, save_global_settings, save_task_config
+)
+
+from conftest import reset_state_store
+
+
+def _config(task_id, mode="cron"):
+    return {
+        "task_id": task_id,
+        "mode": mode,
+        "name": task_id,
+        "created_at": task_id[:15],
+        "execution": {"run_count": 0, "last_result": None},
+    }
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def engine(request):
+    """分别在目录存储和 SQLite 存储下运行"""
+    if request.param == "sqlite":
+        save_global_settings({"storage": {"engine": "sqlite"}})
+        reset_state_store()
+    return request.param
+
+
+def test_patch_sets_fields_and_accumulates_increments(engine):
+    task_id = "20260101_000000_cron"
+    assert save_task_config(task_id, _config(task_id))
+
+    assert patch_task_config(task_id, {"execution.last_result": "success"}, {"execution.run_count": 1})
+    assert patch_task_config(task_id, None, {"execution.run_count": 2, "execution.failures": 1})
+    assert patch_task_config(task_id, {"state.next_run": "soon"})
+
+    # 新进程（没有内存缓存）读到同样的结果
+    reset_state_store()
+    config = load_task_config(task_id)
+    assert config["execution"]["last_result"] == "success"
+    assert config["execution"]["run_count"] == 3
+    assert config["execution"]["failures"] == 1
+    assert config["state"]["next_run"] == "soon"
+
+
+def test_patch_missing_task_fails(engine):
+    assert not patch_task_config("20260101_000000_cron", {"state.status": "active"})
+
+
+def test_journal_replays_on_snapshot():
+    task_id = "20260101_000000_cron"
+    save_task_config(task_id, _config(task_id))
+    patch_task_config(task_id, {"execution.last_result": "error"}, {"execution.run_count": 1})
+
+    task_dir = get_task_dir(task_id)
+    assert json.loads((task_dir / "config.json").read_text())["execution"]["run_count"] == 0
+    assert (task_dir / "config.journal").exists()
+
+    # 崩溃时写了一半的行被跳过
+    with open(task_dir / "config.journal", "a", encoding="utf-8") as f:
+        f.write('{"set": {"execution.last_result": "tor')
+
+    reset_state_store()
+    config = load_task_config(task_id)
+    assert config["execution"]["run_count"] == 1
+    assert config["execution"]["last_result"] == "error"
+
+
+def test_save_discards_journal():
+    task_id = "20260101_000000_cron"
+    save_task_config(task_id, _config(task_id))
+    patch_task_config(task_id, None, {"execution.run_count": 5})
+
+    save_task_config(task_id, _config(task_id))
+    assert not (get_task_dir(task_id) / "config.journal").exists()
+    reset_state_store()
+    assert load_task_config(task_id)["execution"]["run_count"] == 0
+
+
+def test_journal_is_compacted_into_snapshot(monkeypatch):
+    monkeypatch.setattr(state_store, "JOURNAL_COMPACT_BYTES", 200)
+    task_id = "20260101_000000_cron"
+    save_task_config(task_id, _config(task_id))
+
+    for _ in range(20):
+        patch_task_config(task_id, {"execution.last_result": "success"}, {"execution.run_count": 1})
+
+    task_dir = get_task_dir(task_id)
+    journal = task_dir / "config.journal"
+    assert not journal.exists() or journal.stat().st_size <= 200
+    snapshot = json.loads((task_dir / "config.json").read_text())
+    assert snapshot["execution"]["run_count"] >= 1
+
+    reset_state_store()
+    assert load_task_config(task_id)["execution"]["run_count"] == 20
@@ -0,0 +1,38 @@
+"""卡住检测测试"""
+
+import time
+
+from server import state_store
+from server.stuck_detector import StuckDetector, STUCK_THRESHOLDS
+
+
+def _create_task(task_id: str, status: str) -> None:
+    state_store.save_task_config(task_id, {
+        "task_id": task_id,
+        "mode": "cron",
+        "name": task_id,
+        "state": {"status": status},
+    })
+    state_store.set_task_status(task_id, status)
+
+
+def _mark_check_started(task_id: str, minutes_ago: float) -> None:
+    check_file = state_store.get_task_dir(task_id) / ".check_start"
+    check_file.write_text(str(time.time() - minutes_ago * 60))
+
+
+def test_scan_detects_only_active_tasks():
+    overdue = STUCK_THRESHOLDS["archon_check_timeout"] + 1
+    _create_task("active_cron", "active")
+    _create_task("stopped_cron", "stopped")
+    _mark_check_started("active_cron", overdue)
+    _mark_check_started("stopped_cron", overdue)
+
+    stuck = StuckDetector().scan_all_tasks()
+
+    assert [s.task_id for s in stuck] == ["active_cron"]
+    assert stuck[0].stuck_type == "archon_check_timeout"
+
+
+def test_detector_uses_default_base_dir():
+    assert StuckDetector().base_dir == state_store.get_base_dir()
@@ -0,0 +1,92 @@
+"""任务锁测试"""
+
+import json
+import os
+import time
+
+import pytest
+
+from server.task_lock import TaskLockManager
+
+
+@pytest.fixture
+def lock_file(tmp_path):
+    return tmp_path / "task.lock"
+
+
+def test_same_process_rejects_second_acquire(lock_file):
+    manager = TaskLockManager()
+    assert manager.acquire("t1", lock_file)
+    assert not manager.acquire("t1", lock_file)
+    assert manager.is_locked("t1", lock_file)
+
+    assert manager.release("t1")
+    assert not manager.is_locked("t1", lock_file)
+    assert manager.acquire("t1", lock_file)
+    manager.release("t1")
+
+
+def test_flock_excludes_other_holders(lock_file):
+    # 不同的管理器使用各自的文件描述符，效果等同于不同进程
+    first, second = TaskLockManager(use_flock=True), TaskLockManager(use_flock=True)
+    assert first.acquire("t1", lock_file)
+    assert second.is_locked("t1", lock_file)
+    assert not second.acquire("t1", lock_file)
+
+    first.release("t1")
+    assert not second.is_locked("t1", lock_file)
+    assert second.acquire("t1", lock_file)
+    second.release("t1")
+
+
+def test_lease_excludes_other_holders_until_released(lock_file):
+    first, second = TaskLockManager(use_flock=False), TaskLockManager(use_flock=False)
+    assert first.acquire("t1", lock_file)
+    assert json.loads(lock_file.read_text())["pid"] == os.getpid()
+    assert second.is_locked("t1", lock_file)
+    assert not second.acquire("t1", lock_file)
+
+    first.release("t1")
+    assert not lock_file.exists()
+    assert second.acquire("t1", lock_file)
+    second.release("t1")
+
+
+def test_expired_or_legacy_lease_is_taken_over(lock_file):
+    manager = TaskLockManager(use_flock=False)
+
+    lock_file.write_text(json.dumps({"pid": os.getpid(), "token": "x", "expires_at": time.time() - 1}))
+    assert not manager.is_locked("t1", lock_file)
+    assert manager.acquire("t1", lock_file)
+    manager.release("t1")
+
+    # 旧版 "pid:时间" 格式
+    lock_file.write_text(f"{os.getpid()}:2026-01-01T00:00:00")
+    assert manager.acquire("t1", lock_file)
+    assert json.loads(lock_file.read_text())["pid"] == os.getpid()
+    manager.release("t1")
+
+
+def test_release_keeps_lock_taken_over_by_others(lock_file):
+    manager = TaskLockManager(use_flock=False)
+    assert manager.acquire("t1", lock_file)
+
+    other = {"pid": os.getpid(), "token": "other", "expires_at": time.time() + 60}
+    lock_file.write_text(json.dumps(other))
+    manager.release("t1")
+    assert json.loads(lock_file.read_text())["token"] == "other"
+
+
+def test_renewer_extends_lease(lock_file):
+    manager = TaskLockManager(lease_seconds=1, renew_interval=0.05, use_flock=False)
+    assert manager.acquire("t1", lock_file)
+    expires_at = json.loads(lock_file.read_text())["expires_at"]
+
+    deadline = time.time() + 2
+    while time.time() < deadline:
+        time.sleep(0.05)
+        if json.loads(lock_file.read_text())["expires_at"] > expires_at:
+            break
+    else:
+        pytest.fail("租约未续期")
+    manager.release("t1")
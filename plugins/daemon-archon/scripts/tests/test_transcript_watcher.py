@@ -0,0 +1,164 @@
+"""transcript 监听测试（用内存中的后端代替 watchdog / inotify）"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+from server.transcript_watcher import TranscriptWatcher
+
+
+class _FakeBackend:
+    name = "fake"
+
+    def __init__(self):
+        self.dirs = []
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def add_dir(self, directory):
+        self.dirs.append(directory)
+
+    def remove_dir(self, directory):
+        self.dirs.remove(directory)
+
+
+def _watcher(tmp_path, min_interval_seconds=0.0, debounce_ms=10):
+    checks = []
+
+    async def on_change(task_id):
+        checks.append(task_id)
+
+    watcher = TranscriptWatcher(on_change, backend="none", debounce_ms=debounce_ms)
+    watcher._backend = _FakeBackend()
+    watcher._loop = asyncio.get_running_loop()
+
+    path = os.path.realpath(str(tmp_path / "session.jsonl"))
+    assert watcher.watch("task", path, min_interval_seconds=min_interval_seconds)
+    return watcher, path, checks
+
+
+def test_burst_of_writes_is_one_check(tmp_path):
+    async def scenario():
+        watcher, path, checks = _watcher(tmp_path)
+        for _ in range(5):
+            watcher._on_path(path)
+        watcher._on_path(path + ".other")
+        await asyncio.sleep(0.05)
+        assert checks == ["task"]
+        assert watcher.stats()["events"] == 5
+
+    asyncio.run(scenario())
+
+
+def test_checks_respect_min_interval(tmp_path):
+    async def scenario():
+        watcher, path, checks = _watcher(tmp_path, min_interval_seconds=0.2)
+        watcher._on_path(path)
+        await asyncio.sleep(0.05)
+        assert checks == ["task"]
+
+        # 间隔内持续写入：推迟到间隔结束后只检查一次
+        for _ in range(5):
+            watcher._on_path(path)
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.05)
+        assert checks == ["task"]
+        await asyncio.sleep(0.2)
+        assert checks == ["task", "task"]
+        assert watcher.stats()["deferred"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_scheduled_check_counts_toward_interval(tmp_path):
+    async def scenario():
+        watcher, path, checks = _watcher(tmp_path, min_interval_seconds=0.2)
+        watcher.note_check("task")
+        watcher._on_path(path)
+        await asyncio.sleep(0.05)
+        assert checks == []
+        await asyncio.sleep(0.25)
+        assert checks == ["task"]
+
+    asyncio.run(scenario())
+
+
+def test_own_writes_are_ignored(tmp_path):
+    async def scenario():
+        watcher, path, checks = _watcher(tmp_path)
+        watcher.ignore_writes("task", 0.1)
+        watcher._on_path(path)
+        await asyncio.sleep(0.05)
+        assert checks == []
+        assert watcher.stats()["ignored"] == 1
+
+        await asyncio.sleep(0.1)
+        watcher._on_path(path)
+        await asyncio.sleep(0.05)
+        assert checks == ["task"]
+
+    asyncio.run(scenario())
+
+
+def test_unwatch_cancels_pending_check(tmp_path):
+    async def scenario():
+        watcher, path, checks = _watcher(tmp_path, debounce_ms=50)
+        watcher._on_path(path)
+        await asyncio.sleep(0)
+        watcher.unwatch("task")
+        await asyncio.sleep(0.1)
+        assert checks == []
+        assert not watcher.is_watching("task")
+
+    asyncio.run(scenario())
+
+
+def test_shared_directory_is_watched_once(tmp_path):
+    async def scenario():
+        watcher, path, _ = _watcher(tmp_path)
+        assert watcher.watch("other", os.path.join(os.path.dirname(path), "b.jsonl"))
+        backend = watcher._backend
+        assert backend.dirs == [os.path.dirname(path)]
+
+        watcher.unwatch("task")
+        assert backend.dirs == [os.path.dirname(path)]
+        watcher.unwatch("other")
+        assert backend.dirs == []
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify 仅在 Linux 上可用")
+def test_inotify_backend_reports_appends(tmp_path):
+    async def scenario():
+        checks = []
+
+        async def on_change(task_id):
+            checks.append(task_id)
+
+        watcher = TranscriptWatcher(on_change, backend="inotify", debounce_ms=10)
+        watcher.start()
+        if not watcher.active:
+            pytest.skip("inotify 不可用")
+        try:
+            path = tmp_path / "session.jsonl"
+            path.write_text("")
+            assert watcher.watch("task", str(path))
+            with open(path, "a") as f:
+                f.write("{}\n")
+
+            for _ in range(100):
+                if checks:
+                    break
+                await asyncio.sleep(0.02)
+            assert checks == ["task"]
+        finally:
+            watcher.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,194 @@
+"""多进程 worker 测试（不启动进程，用内存中的连接代替管道）"""
+
+import asyncio
+from collections import Counter
+
+import pytest
+
+from server import state_store
+from server.scheduler import ArchonScheduler, ConcurrencyGovernor, ConcurrencyLimitError
+from server.workers import HashRing, RemoteGovernor, WorkerPool, _WorkerHandle
+
+
+class _FakeProcess:
+    pid = 0
+    exitcode = None
+
+    def is_alive(self):
+        return True
+
+    def join(self, timeout=None):
+        pass
+
+
+class _FakeConn:
+    """协调者 -> worker 的连接：slot_granted 直接交给 worker 的 RemoteGovernor"""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.governor = None
+
+    def send(self, message):
+        slot_id, op, _ = message
+        assert op == "slot_granted"
+        self.loop.call_soon(self.governor.on_granted, slot_id)
+
+
+def _wire_pool(max_total: int, names=("w0", "w1")):
+    """协调者与若干 worker 的额度通道"""
+    loop = asyncio.get_running_loop()
+    pool = WorkerPool(count=len(names))
+    pool._loop = loop
+    pool.governor = ConcurrencyGovernor(max_total=max_total, max_per_project=0)
+
+    governors = {}
+    for name in names:
+        conn = _FakeConn(loop)
+        handle = _WorkerHandle(name, _FakeProcess(), conn)
+        pool._workers[name] = handle
+        governor = RemoteGovernor(
+            lambda message, handle=handle: loop.call_soon(pool._on_slot_message, handle, message)
+        )
+        conn.governor = governor
+        governors[name] = governor
+    return pool, governors
+
+
+def test_hash_ring_is_stable_and_balanced():
+    ring = HashRing(["w0", "w1", "w2"], vnodes=64)
+    keys = [f"task_{i}" for i in range(3000)]
+    owners = {key: ring.node_for(key) for key in keys}
+
+    counts = Counter(owners.values())
+    assert set(counts) == {"w0", "w1", "w2"}
+    assert min(counts.values()) > 600
+
+    # 移除节点只影响原属于该节点的 key
+    ring.remove("w1")
+    moved = [key for key in keys if ring.node_for(key) != owners[key]]
+    assert all(owners[key] == "w1" for key in moved)
+    assert HashRing(["w2", "w0"], vnodes=64).node_for("task_1") == ring.node_for("task_1")
+
+
+def test_hash_ring_without_nodes():
+    with pytest.raises(RuntimeError):
+        HashRing().node_for("task")
+
+
+def test_slots_are_shared_across_workers():
+    async def scenario():
+        pool, governors = _wire_pool(max_total=1)
+        running = []
+        peak = []
+
+        async def run(worker, task_id):
+            async with governors[worker].slot(task_id, "/p", "cron"):
+                running.append(task_id)
+                peak.append(len(running))
+                await asyncio.sleep(0.01)
+                running.remove(task_id)
+
+        await asyncio.gather(run("w0", "a"), run("w1", "b"), run("w0", "c"))
+        await asyncio.sleep(0)
+
+        assert max(peak) == 1
+        assert pool.governor.stats()["running"] == 0
+        assert pool.governor.stats()["granted"] == 3
+        assert not pool._slots and not pool._slot_waits
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_does_not_leak_slot():
+    async def scenario():
+        pool, governors = _wire_pool(max_total=1)
+        release = asyncio.Event()
+
+        async def hold():
+            async with governors["w0"].slot("a", "/p", "cron"):
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0.01)
+
+        waiter = asyncio.create_task(governors["w1"].slot("b", "/p", "cron").__aenter__())
+        await asyncio.sleep(0.01)
+        assert pool.governor.queue_depth() == 1
+        waiter.cancel()
+        await asyncio.sleep(0.01)
+
+        release.set()
+        await holder
+        await asyncio.sleep(0.01)
+        assert pool.governor.stats()["running"] == 0
+        assert pool.governor.queue_depth() == 0
+
+    asyncio.run(scenario())
+
+
+def test_remote_slot_timeout_withdraws_request():
+    async def scenario():
+        pool, governors = _wire_pool(max_total=1)
+        async with governors["w0"].slot("a", "/p", "cron"):
+            with pytest.raises(ConcurrencyLimitError):
+                async with governors["w1"].slot("b", "/p", "cron", timeout=0.01):
+                    pass
+            await asyncio.sleep(0.01)
+            assert pool.governor.queue_depth() == 0
+        await asyncio.sleep(0.01)
+        assert pool.governor.stats()["running"] == 0
+        assert governors["w1"].stats()["waiting"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_worker_exit_releases_its_slots():
+    async def scenario():
+        pool, governors = _wire_pool(max_total=1)
+        pool.running = False  # 不重启
+
+        entered = asyncio.Event()
+
+        async def hold():
+            async with governors["w0"].slot("a", "/p", "cron"):
+                entered.set()
+                await asyncio.sleep(10)
+
+        holder = asyncio.create_task(hold())
+        await entered.wait()
+        assert pool.governor.stats()["running"] == 1
+
+        pool._on_worker_exit(pool._workers["w0"])
+        assert pool.governor.stats()["running"] == 0
+        holder.cancel()
+
+    asyncio.run(scenario())
+
+
+def test_scheduler_only_restores_owned_tasks_and_rebalances():
+    for task_id in ("t1", "t2"):
+        state_store.save_task_config(task_id, {
+            "task_id": task_id, "mode": "cron", "name": task_id,
+            "schedule": {"check_interval_minutes": 60},
+        })
+        state_store.set_task_status(task_id, "active")
+
+    owned = {"t1"}
+
+    async def scenario():
+        scheduler = ArchonScheduler()
+        scheduler.configure(task_filter=lambda task_id: task_id in owned, jobstore_suffix="w0")
+        await scheduler.start()
+        before = sorted(job["job_id"] for job in scheduler.list_jobs())
+
+        owned.clear()
+        owned.add("t2")
+        await scheduler.rebalance()
+        after = sorted(job["job_id"] for job in scheduler.list_jobs())
+        await scheduler.stop()
+        return before, after
+
+    before, after = asyncio.run(scenario())
+    assert before == ["cron_t1"]
+    assert after == ["cron_t2"]
+    assert (state_store.get_base_dir() / "scheduler.w0.db").exists()